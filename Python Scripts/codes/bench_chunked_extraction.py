@@ -0,0 +1,47 @@
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from pose_extract_batch import _initialize_worker, chunk_ranges, extract_frames
+
+# Chunked (pose_extract_batch.py --chunks) against serial extraction of one video:
+# wall-clock time, and how far the stitched angles are from the serial ones for
+# several warm-up lengths. Frames within --tolerance (radians, every angle) count as equal.
+# In static_image_mode ("static" profile) chunks reproduce serial output exactly; with
+# tracking, MediaPipe's region-of-interest feedback keeps a small memory of earlier
+# frames, so chunks settle close to, but not bit-equal with, the serial run.
+
+def extract(video_path, profile, workers, chunks, warmup_frames):
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_initialize_worker, initargs=(profile,)) as executor:
+        futures = [executor.submit(extract_frames, video_path, first_frame, last_frame, warmup_frames)
+                   for first_frame, last_frame in chunk_ranges(video_path, chunks)]
+        csv_rows = [row for future in futures for row in future.result()[1]]
+    return np.array(csv_rows), time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare chunked parallel extraction with serial extraction.")
+    parser.add_argument("--video", default="Python Scripts/origin_vids/HurryUpPun.mp4")
+    parser.add_argument("--profile", default="tracking")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--chunks", type=int, nargs="+", default=[2, 4])
+    parser.add_argument("--warmup-frames", type=int, nargs="+", default=[0, 15, 30, 60])
+    parser.add_argument("--tolerance", type=float, default=0.05)
+    args = parser.parse_args()
+
+    serial_rows, serial_seconds = extract(args.video, args.profile, 1, 1, 0)
+    print(f"{args.video}: {len(serial_rows)} frames, serial {serial_seconds:.1f} s")
+    print(f"{'chunks':>6} {'warm-up':>7} {'seconds':>8} {'speed-up':>9} {'max |d|':>8} {'mean |d|':>9} {'p99 |d|':>8} {'frames off':>11}")
+    for chunks in args.chunks:
+        for warmup_frames in args.warmup_frames:
+            rows, seconds = extract(args.video, args.profile, args.workers, chunks, warmup_frames)
+            # same frame numbers and timestamps, then compare the angles
+            assert np.array_equal(rows[:, :2], serial_rows[:, :2])
+            difference = np.abs(rows[:, 2:] - serial_rows[:, 2:])
+            frame_difference = difference.max(axis=1)
+            frames_off = int((frame_difference > args.tolerance).sum())
+            print(f"{chunks:>6} {warmup_frames:>7} {seconds:8.1f} {serial_seconds / seconds:8.2f}x {difference.max():8.4f} "
+                  f"{difference.mean():9.5f} {np.percentile(frame_difference, 99):8.4f} {frames_off:>11}")
+
+if __name__ == "__main__":
+    main()
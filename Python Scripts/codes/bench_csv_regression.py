@@ -0,0 +1,245 @@
+import argparse
+import csv
+import glob
+import io
+import os
+import sys
+import time
+import cv2
+from mediapipe.framework.formats import landmark_pb2
+from bench_relative_angles import legacy_calculate_relative_angles
+from pose_archive import find_archive, load_archive
+from pose_extAnno_csv import initialize_pose, write_csv_header
+from pose_pipeline import extract_landmark_data, iter_pose_frames, relative_angle_csv_row
+from pose_preprocess import FramePreprocessor
+from pose_profiles import create_profile_pose
+from pose_writers import BufferedCsvWriter
+
+# Regression check for the relative angle CSV of pose_extAnno_csv.py: the current
+# path (extract_landmark_data + relative_angle_csv_row + BufferedCsvWriter) against
+# the per-frame loop the extractor used to have, copied below. Exits non-zero on
+# the first difference. Without --video it needs no pose model:
+#
+#   committed  every committed results/poses CSV, read back and written again the
+#              old way (csv.writer.writerow per frame) and the new way, must come
+#              out as the committed bytes (line endings normalized: the files are
+#              checked in with \n, csv.writer writes \r\n)
+#   landmarks  the landmarks stored in a pose_archive.py archive (the committed
+#              HurryUpPun one by default) run through both loops, with some frames
+#              dropped and some landmarks zeroed so the no-pose rows and the (0, 0)
+#              fill are covered too; both CSVs must be the same bytes
+#
+# --video runs MediaPipe instead: the old loop and iter_pose_frames over the video;
+# without --profile with the extractor's own Pose (the complexity 2 model the
+# committed CSVs were extracted with), also compared with --reference.
+#
+#   python "Python Scripts/codes/bench_csv_regression.py"
+#   python "Python Scripts/codes/bench_csv_regression.py" --video "Python Scripts/origin_vids/HurryUpPun.mp4" \
+#       --reference "Python Scripts/results/poses/HurryUpPun_legacy_edit.csv"
+
+# the old pose_extAnno_csv.py loop
+def legacy_extract_landmark_data(pose_landmarks, previous_landmarks):
+    if pose_landmarks:
+        current_landmarks = []
+        for i, landmark in enumerate(pose_landmarks.landmark):
+            if landmark.x == 0 and landmark.y == 0 and previous_landmarks is not None:
+                current_landmarks.append(previous_landmarks[i])
+            else:
+                current_landmarks.append(landmark)
+        return current_landmarks
+    return None
+
+def legacy_csv_row(frame_count, timestamp, pose_landmarks, previous_landmarks):
+    """(row, previous_landmarks for the next frame) as the old loop built them."""
+    r_row = [frame_count, timestamp]
+    current_landmarks = legacy_extract_landmark_data(pose_landmarks, previous_landmarks)
+    if current_landmarks:
+        # the old loop recomputed the angles once per landmark
+        for landmark in current_landmarks:
+            arrOfRelAngles = legacy_calculate_relative_angles(current_landmarks)
+        r_row.extend(arrOfRelAngles)
+        previous_landmarks = current_landmarks
+    else:
+        r_row.extend([0.0] * 8)
+    return r_row, previous_landmarks
+
+def legacy_csv_text(frames):
+    """frames: (frame_count, timestamp, pose_landmarks or None)"""
+    csv_file = io.StringIO(newline='')
+    r_csv_writer = csv.writer(csv_file)
+    write_csv_header(r_csv_writer, 'r')
+    previous_landmarks = None
+    for frame_count, timestamp, pose_landmarks in frames:
+        r_row, previous_landmarks = legacy_csv_row(frame_count, timestamp, pose_landmarks, previous_landmarks)
+        r_csv_writer.writerow(r_row)
+    return csv_file.getvalue()
+
+def new_csv_text(frames):
+    """frames as legacy_csv_text, through the current row and writer path."""
+    csv_file = io.StringIO(newline='')
+    r_csv_writer = BufferedCsvWriter(csv_file)
+    write_csv_header(r_csv_writer, 'r')
+    previous_landmarks = None
+    for frame_count, timestamp, pose_landmarks in frames:
+        current_landmarks = extract_landmark_data(pose_landmarks, previous_landmarks)
+        if current_landmarks:
+            previous_landmarks = current_landmarks
+        r_csv_writer.writerow(relative_angle_csv_row(frame_count, timestamp, current_landmarks))
+    r_csv_writer.flush()
+    return csv_file.getvalue()
+
+def first_difference(expected, actual):
+    """(line number, expected line, actual line) of the first line that differs, None when equal."""
+    expected_lines = expected.splitlines()
+    actual_lines = actual.splitlines()
+    for line_number in range(max(len(expected_lines), len(actual_lines))):
+        expected_line = expected_lines[line_number] if line_number < len(expected_lines) else "<end of file>"
+        actual_line = actual_lines[line_number] if line_number < len(actual_lines) else "<end of file>"
+        if expected_line != actual_line:
+            return line_number + 1, expected_line, actual_line
+    return None
+
+def compare(name, expected, actual):
+    """Print OK or the first difference; returns whether they are equal."""
+    if expected == actual:
+        print(f"OK   {name}: {len(actual.encode())} bytes identical")
+        return True
+    difference = first_difference(expected, actual)
+    if difference is None:
+        # same lines, different line endings
+        print(f"FAIL {name}: same rows, different bytes ({len(expected)} vs {len(actual)} characters)")
+    else:
+        line_number, expected_line, actual_line = difference
+        print(f"FAIL {name}: first difference on line {line_number}\n  expected: {expected_line}\n  actual:   {actual_line}")
+    return False
+
+def check_committed_csv(csv_path):
+    """Rewrite a committed CSV's rows both ways and compare with the file."""
+    with open(csv_path, 'r', newline='') as csv_file:
+        committed = csv_file.read()
+    rows = [[int(row[0]), float(row[1])] + [float(value) for value in row[2:]] for row in list(csv.reader(io.StringIO(committed)))[1:]]
+
+    legacy_file = io.StringIO(newline='')
+    legacy_writer = csv.writer(legacy_file)
+    write_csv_header(legacy_writer, 'r')
+    for row in rows:
+        legacy_writer.writerow(row)
+
+    new_file = io.StringIO(newline='')
+    new_writer = BufferedCsvWriter(new_file)
+    write_csv_header(new_writer, 'r')
+    # frames without a pose go through relative_angle_csv_row, as the extractor writes them
+    new_writer.writerows(row if any(row[2:]) else relative_angle_csv_row(row[0], row[1], None) for row in rows)
+    new_writer.flush()
+
+    committed = committed.replace("\r\n", "\n")
+    name = os.path.basename(csv_path)
+    legacy_ok = compare(f"{name}, old writer vs committed", committed, legacy_file.getvalue().replace("\r\n", "\n"))
+    new_ok = compare(f"{name}, new writer vs committed", committed, new_file.getvalue().replace("\r\n", "\n"))
+    return legacy_ok and new_ok
+
+def archived_frames(archive_path, drop_every=10, zero_every=7, zeroed_landmarks=(13, 14)):
+    """
+    (frame_count, timestamp, pose_landmarks) of an archive, as Pose.process gave
+    them. Every drop_every-th frame loses its pose and every zero_every-th frame
+    has zeroed_landmarks at (0, 0), so both loops' edge cases are exercised.
+    """
+    archive = load_archive(archive_path)
+    frames = []
+    for i, (frame_count, timestamp, frame_landmarks, has_pose) in enumerate(zip(
+            archive["frame_numbers"].tolist(), archive["timestamps"].tolist(), archive["landmarks"].tolist(), archive["has_pose"].tolist())):
+        if not has_pose or (drop_every and i % drop_every == drop_every - 1):
+            frames.append((frame_count, timestamp, None))
+            continue
+        if zero_every and i % zero_every == zero_every - 1:
+            for index in zeroed_landmarks:
+                frame_landmarks[index][:2] = [0.0, 0.0]
+        frames.append((frame_count, timestamp, landmark_pb2.NormalizedLandmarkList(landmark=[
+            landmark_pb2.NormalizedLandmark(x=x, y=y, z=z, visibility=visibility) for x, y, z, visibility in frame_landmarks])))
+    return frames
+
+def check_archive(archive_path):
+    frames = archived_frames(archive_path)
+    return compare(f"{os.path.basename(archive_path)} ({len(frames)} frames), new loop vs old loop",
+                   legacy_csv_text(frames), new_csv_text(frames))
+
+def legacy_video_csv(video_path, pose):
+    """The relative angle CSV as the old per-frame loop wrote it from the video."""
+    csv_file = io.StringIO(newline='')
+    r_csv_writer = csv.writer(csv_file)
+    write_csv_header(r_csv_writer, 'r')
+    vid = cv2.VideoCapture(video_path)
+    frame_count = 0
+    previous_landmarks = None
+    while True:
+        ret, frame = vid.read()
+        if not ret:
+            break
+        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        frame_rgb.flags.writeable = False
+        results = pose.process(frame_rgb)
+        r_row, previous_landmarks = legacy_csv_row(frame_count, vid.get(cv2.CAP_PROP_POS_MSEC), results.pose_landmarks, previous_landmarks)
+        r_csv_writer.writerow(r_row)
+        frame_count += 1
+    vid.release()
+    return csv_file.getvalue()
+
+def new_video_csv(video_path, pose):
+    """The relative angle CSV as pose_extAnno_csv.py writes it now."""
+    csv_file = io.StringIO(newline='')
+    r_csv_writer = BufferedCsvWriter(csv_file)
+    write_csv_header(r_csv_writer, 'r')
+    vid = cv2.VideoCapture(video_path)
+    for frame_count, timestamp, frame, results, current_landmarks in iter_pose_frames(vid, pose, FramePreprocessor()):
+        r_csv_writer.writerow(relative_angle_csv_row(frame_count, timestamp, current_landmarks))
+    r_csv_writer.flush()
+    vid.release()
+    return csv_file.getvalue()
+
+def timed(extract, video_path, profile):
+    # a fresh Pose per run: tracking state must not carry over between the two passes
+    pose = initialize_pose() if profile is None else create_profile_pose(profile)
+    start = time.perf_counter()
+    text = extract(video_path, pose)
+    seconds = time.perf_counter() - start
+    pose.close()
+    return text, seconds
+
+def check_video(video_path, profile, reference_path):
+    legacy, legacy_seconds = timed(legacy_video_csv, video_path, profile)
+    new, new_seconds = timed(new_video_csv, video_path, profile)
+    print(f"{video_path} ({profile or 'pose_extAnno_csv'}): {len(new.splitlines()) - 1} frames, "
+          f"old loop {legacy_seconds:.1f} s, current pipeline {new_seconds:.1f} s")
+    ok = compare("current pipeline vs old loop", legacy, new)
+    if profile is None:
+        with open(reference_path, 'r', newline='') as reference_file:
+            reference = reference_file.read().replace("\r\n", "\n")
+        ok = compare(f"current pipeline vs {reference_path}", reference, new.replace("\r\n", "\n")) and ok
+    else:
+        print(f"skipped {reference_path}: it was extracted with the extractor's own Pose, not profile {profile}")
+    return ok
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that the relative angle CSV is byte-identical to the old per-frame loop.")
+    parser.add_argument("--csv", nargs="+", default=sorted(glob.glob("Python Scripts/results/poses/*.csv")), help="committed CSVs to rewrite")
+    parser.add_argument("--archives", nargs="+",
+                        default=[find_archive("Python Scripts/results/landmarks", "Python Scripts/origin_vids/HurryUpPun.mp4", "static")],
+                        help="landmark archives to run both loops over")
+    parser.add_argument("--video", help="run MediaPipe over this video instead of the checks above")
+    parser.add_argument("--reference", default="Python Scripts/results/poses/HurryUpPun_legacy_edit.csv",
+                        help="committed CSV of --video, compared when running the extractor's own Pose")
+    parser.add_argument("--profile", help="pose_profiles.py profile instead of the extractor's Pose (skips --reference)")
+    args = parser.parse_args()
+
+    if args.video:
+        ok = check_video(args.video, args.profile, args.reference)
+    else:
+        if None in args.archives:
+            parser.error("no landmark archive of HurryUpPun.mp4 in Python Scripts/results/landmarks, pass --archives")
+        results = [check_committed_csv(csv_path) for csv_path in args.csv] + [check_archive(archive_path) for archive_path in args.archives]
+        ok = all(results)
+    if not ok:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
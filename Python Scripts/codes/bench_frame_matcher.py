@@ -0,0 +1,57 @@
+import time
+import numpy as np
+from pose_matching import match_window
+from pose_reference import load_reference_angles
+
+# the pure-Python matcher socket_server_frame.py ran for every frame
+def legacy_match_window(reference_pose_sequence, current_player_pose, frame_number, frames_before, frames_after):
+    start_reference_frame = max([frame_number - frames_before, 0])
+    end_reference_frame = min([frame_number + frames_after, len(reference_pose_sequence)-1])
+    reference_window = reference_pose_sequence[start_reference_frame:end_reference_frame]
+
+    frame_correctness_list = []
+    for reference_pose in reference_window:
+        differences = []
+
+        for i in range(len(reference_pose)):
+            normalized_difference = min(abs(reference_pose[i] - current_player_pose[i]) , 1)
+            differences.append(normalized_difference)
+
+        correctness = max(0, 1 - (sum(differences) / len(differences)))
+        frame_correctness_list.append(correctness)
+    current_frame_correctness = max(frame_correctness_list)
+    return current_frame_correctness, start_reference_frame + frame_correctness_list.index(current_frame_correctness)
+
+def main():
+    reference_json_path = "Python Scripts/results/poses/WholeGarden_legacy_edit.json"
+    window_sizes = [16, 32, 64, 128, 256, 512]
+    frames_per_size = 2000
+
+    reference_angles = load_reference_angles(reference_json_path)
+    reference_lists = reference_angles.tolist()
+    rng = np.random.default_rng(0)
+    frame_numbers = rng.integers(0, len(reference_angles), frames_per_size)
+    # player poses: reference frames with noise, as the angle kernel returns them (lists of np.float64)
+    player_poses = [list(reference_angles[n] + rng.normal(0, 0.3, 8)) for n in frame_numbers]
+
+    print(f"{'window':>6} {'legacy us/frame':>16} {'numpy us/frame':>15} {'speedup':>8}")
+    for window_size in window_sizes:
+        # same 3:1 split as the default -12/+4 window
+        frames_before = window_size * 3 // 4
+        frames_after = window_size - frames_before
+
+        start = time.perf_counter()
+        legacy_results = [legacy_match_window(reference_lists, pose, int(n), frames_before, frames_after)
+                          for pose, n in zip(player_poses, frame_numbers)]
+        legacy_time = (time.perf_counter() - start) / frames_per_size
+
+        start = time.perf_counter()
+        numpy_results = [match_window(reference_angles, pose, int(n), frames_before, frames_after)
+                         for pose, n in zip(player_poses, frame_numbers)]
+        numpy_time = (time.perf_counter() - start) / frames_per_size
+
+        assert legacy_results == numpy_results, "vectorized matcher disagrees with the legacy loop"
+        print(f"{window_size:>6} {legacy_time * 1e6:16.1f} {numpy_time * 1e6:15.1f} {legacy_time / numpy_time:7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+import argparse
+import base64
+import json
+import time
+import cv2
+import numpy as np
+from bench_frames import encode_video_frames
+from server_protocol import pack_binary_frame, parse_binary_message
+
+# Bytes on the wire and server-side decode time per frame_data message:
+# base64 JPEG inside JSON versus the binary frame format of server_protocol.py.
+# "parse" is everything before cv2.imdecode; "decode" includes imdecode.
+
+def parse_json_message(message):
+    data = json.loads(message)
+    return np.frombuffer(base64.b64decode(data['image_data']), np.uint8)
+
+def parse_binary(message):
+    data = parse_binary_message(message)
+    return np.frombuffer(data['image_data'], np.uint8)
+
+def time_per_message(parse, messages, repeats, imdecode):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for message in messages:
+            nparr = parse(message)
+            if imdecode:
+                cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+        best = min(best, time.perf_counter() - start)
+    return best / len(messages) * 1e3
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the JSON and binary frame_data messages.")
+    parser.add_argument("--video", default="Python Scripts/origin_vids/HurryUpPun.mp4")
+    parser.add_argument("--frames", type=int, default=100)
+    parser.add_argument("--jpeg-quality", type=int, default=70)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    frames = encode_video_frames(args.video, args.frames, args.jpeg_quality)
+    json_messages = [json.dumps({"type": "frame_data", "frame_number": i, "image_data": base64.b64encode(jpeg).decode('ascii'), "flip": False})
+                     for i, jpeg in enumerate(frames)]
+    binary_messages = [pack_binary_frame(i, jpeg) for i, jpeg in enumerate(frames)]
+
+    # both paths must hand imdecode the same JPEG bytes
+    for json_message, binary_message in zip(json_messages, binary_messages):
+        assert np.array_equal(parse_json_message(json_message), parse_binary(binary_message))
+
+    print(f"{len(frames)} frames, JPEG quality {args.jpeg_quality}")
+    print(f"{'format':<8} {'bytes/frame':>12} {'parse ms':>9} {'decode ms':>10}")
+    for name, parse, messages in (("json", parse_json_message, json_messages), ("binary", parse_binary, binary_messages)):
+        size = sum(len(message) for message in messages) / len(messages)
+        parse_ms = time_per_message(parse, messages, args.repeats, False)
+        decode_ms = time_per_message(parse, messages, args.repeats, True)
+        print(f"{name:<8} {size:12.0f} {parse_ms:9.3f} {decode_ms:10.3f}")
+
+if __name__ == "__main__":
+    main()
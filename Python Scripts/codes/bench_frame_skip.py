@@ -0,0 +1,85 @@
+import argparse
+import time
+import cv2
+import numpy as np
+from pose_angles import calculate_relative_angles
+from pose_pipeline import InterpolatedResults, iter_pose_frames
+from pose_preprocess import FramePreprocessor
+from pose_profiles import create_profile_pose
+from pose_scoring import read_player_angles, score_sequence
+
+# Quality report for key-frame extraction (iter_pose_frames with max_skip > 1)
+# against full per-frame extraction of the same video and profile: time, share of
+# frames that ran pose, and how far the interpolated angles are from the per-frame
+# ones (radians; frames off = any angle further than --tolerance). With --player,
+# also how many of that player's frame feedbacks change when scored against the
+# key-frame extraction instead of the per-frame one.
+#
+#   python "Python Scripts/codes/bench_frame_skip.py" --video "Python Scripts/origin_vids/HurryUpPun.mp4" --profile heavy \
+#       --baseline "Python Scripts/results/poses/HurryUpPun_legacy_edit.csv"
+
+def extract(video_path, profile, max_skip=1, max_motion=0.01):
+    """(angles with zeros where there is no pose, has_pose, frames that ran pose, seconds) of one extraction."""
+    pose = create_profile_pose(profile)
+    vid = cv2.VideoCapture(video_path)
+    start = time.perf_counter()
+    angles = []
+    has_pose = []
+    inferred = 0
+    for frame_count, timestamp, frame, results, current_landmarks in iter_pose_frames(vid, pose, FramePreprocessor(), max_skip=max_skip, max_motion=max_motion):
+        angles.append(calculate_relative_angles(current_landmarks) if current_landmarks else [0.0] * 8)
+        has_pose.append(bool(current_landmarks))
+        inferred += not isinstance(results, InterpolatedResults)
+    seconds = time.perf_counter() - start
+    vid.release()
+    pose.close()
+    return np.array(angles, dtype=np.float64).reshape(-1, 8), np.array(has_pose, dtype=bool), inferred, seconds
+
+def changed_feedback(player, full_angles, angles):
+    """Share of the player's scored frames whose feedback differs between the two references."""
+    player_angles, player_has_pose, frame_numbers, _ = player
+    full_scores = score_sequence(player_angles, player_has_pose, frame_numbers, full_angles)
+    scores = score_sequence(player_angles, player_has_pose, frame_numbers, angles)
+    scored = full_scores.scored | scores.scored
+    return (full_scores.frame_feedback != scores.frame_feedback)[scored].mean() if scored.any() else 0.0
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare key-frame extraction with interpolation against per-frame extraction.")
+    parser.add_argument("--video", default="Python Scripts/origin_vids/HurryUpPun.mp4")
+    parser.add_argument("--profile", default="tracking")
+    parser.add_argument("--baseline", help="per-frame extraction of the video with this profile (.csv/.json/.pose) instead of running it")
+    parser.add_argument("--player", help="a player's extracted angles (.csv/.json/.pose) to score against both")
+    parser.add_argument("--max-skip", type=int, nargs="+", default=[2, 4, 8])
+    parser.add_argument("--max-motion", type=float, nargs="+", default=[0.005, 0.01, 0.02, float("inf")],
+                        help="inf = fixed spacing of max-skip frames")
+    parser.add_argument("--tolerance", type=float, default=0.05)
+    args = parser.parse_args()
+
+    if args.baseline:
+        full_angles, full_has_pose, _, _ = read_player_angles(args.baseline)
+        full_seconds = None
+    else:
+        full_angles, full_has_pose, _, full_seconds = extract(args.video, args.profile)
+    player = read_player_angles(args.player) if args.player else None
+    print(f"{args.video} ({args.profile}): {len(full_angles)} frames, per-frame "
+          + (f"{full_seconds:.1f} s" if full_seconds is not None else f"from {args.baseline}"))
+    print(f"{'skip':>4} {'motion':>6} {'seconds':>8} {'speed-up':>9} {'inferred':>9} {'max |d|':>8} {'mean |d|':>9} "
+          f"{'p99 |d|':>8} {'frames off':>11} {'pose diff':>10}" + (f" {'feedback diff':>14}" if player else ""))
+    for max_skip in args.max_skip:
+        for max_motion in args.max_motion:
+            angles, has_pose, inferred, seconds = extract(args.video, args.profile, max_skip, max_motion)
+            assert len(angles) == len(full_angles), "extractions cover different frame counts"
+            both = has_pose & full_has_pose
+            difference = np.abs(angles[both] - full_angles[both])
+            frame_difference = difference.max(axis=1) if len(difference) else np.zeros(1)
+            line = (f"{max_skip:>4} {max_motion:>6} {seconds:8.1f} "
+                    + (f"{full_seconds / seconds:8.2f}x" if full_seconds is not None else f"{'-':>9}")
+                    + f" {inferred / len(angles):8.1%} {frame_difference.max():8.4f} {difference.mean() if len(difference) else 0.0:9.5f} "
+                    f"{np.percentile(frame_difference, 99):8.4f} {int((frame_difference > args.tolerance).sum()):>11} "
+                    f"{int((has_pose != full_has_pose).sum()):>10}")
+            if player:
+                line += f" {changed_feedback(player, full_angles, angles):13.1%}"
+            print(line)
+
+if __name__ == "__main__":
+    main()
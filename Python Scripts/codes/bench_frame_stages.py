@@ -0,0 +1,127 @@
+import argparse
+import time
+import tracemalloc
+import cv2
+import numpy as np
+from pose_preprocess import FramePreprocessor
+from pose_profiles import create_profile_pose
+
+# Per-stage time and allocation profile of the frame pipeline, for the offline
+# extractors (video frame -> pose -> frame to draw on) and the servers
+# (JPEG -> flip -> pose). "legacy" is how the stages were written before
+# buffers were reused; "current" is pose_pipeline.py / server_inference.py.
+# Allocations are the bytes newly allocated (peak) inside a stage, from
+# tracemalloc in a separate pass so tracing does not skew the timings.
+
+def legacy_extractor(frame, jpeg, pose, preprocessor, stage):
+    with stage("convert"):
+        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        frame_rgb.flags.writeable = False
+    with stage("inference"):
+        pose.process(frame_rgb)
+    with stage("convert back"):
+        frame_rgb.flags.writeable = True
+        frame = cv2.cvtColor(frame_rgb, cv2.COLOR_RGB2BGR)
+
+def current_extractor(frame, jpeg, pose, preprocessor, stage):
+    with stage("convert"):
+        frame_rgb = preprocessor.prepare(frame)
+    with stage("inference"):
+        results = pose.process(frame_rgb)
+    with stage("restore"):
+        preprocessor.restore(results.pose_landmarks)
+
+def legacy_server(frame, jpeg, pose, preprocessor, stage):
+    with stage("decode"):
+        frame = cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_COLOR)
+    with stage("flip"):
+        frame = cv2.flip(frame, 1)
+    with stage("convert"):
+        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    with stage("inference"):
+        pose.process(frame_rgb)
+
+def current_server(frame, jpeg, pose, preprocessor, stage):
+    with stage("decode"):
+        frame = cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_COLOR)
+    with stage("flip"):
+        cv2.flip(frame, 1, dst=frame)
+    with stage("convert"):
+        frame_rgb = preprocessor.prepare(frame)
+    with stage("inference"):
+        results = pose.process(frame_rgb)
+    with stage("restore"):
+        preprocessor.restore(results.pose_landmarks)
+
+PIPELINES = [
+    ("extractor", "legacy", legacy_extractor),
+    ("extractor", "current", current_extractor),
+    ("server", "legacy", legacy_server),
+    ("server", "current", current_server),
+]
+
+
+class StageProfile:
+    def __init__(self, trace_allocations):
+        self.trace_allocations = trace_allocations
+        self.times = {}
+        self.allocations = {}
+        self.name = None
+
+    def __call__(self, name):
+        self.name = name
+        return self
+
+    def __enter__(self):
+        if self.trace_allocations:
+            tracemalloc.reset_peak()
+            self.memory_before = tracemalloc.get_traced_memory()[0]
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self.start
+        self.times.setdefault(self.name, []).append(elapsed * 1e3)
+        if self.trace_allocations:
+            self.allocations.setdefault(self.name, []).append(tracemalloc.get_traced_memory()[1] - self.memory_before)
+
+
+def run(pipeline, frames, jpegs, trace_allocations):
+    pose = create_profile_pose("tracking")
+    preprocessor = FramePreprocessor()
+    profile = StageProfile(trace_allocations)
+    if trace_allocations:
+        tracemalloc.start()
+    for frame, jpeg in zip(frames, jpegs):
+        pipeline(frame, jpeg, pose, preprocessor, profile)
+    if trace_allocations:
+        tracemalloc.stop()
+    pose.close()
+    return profile
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-stage time and allocation profile of the frame pipeline.")
+    parser.add_argument("--video", default="Python Scripts/origin_vids/HurryUpPun.mp4")
+    parser.add_argument("--frames", type=int, default=60)
+    args = parser.parse_args()
+
+    frames = []
+    vid = cv2.VideoCapture(args.video)
+    while len(frames) < args.frames:
+        ret, frame = vid.read()
+        if not ret:
+            break
+        frames.append(frame)
+    vid.release()
+    jpegs = [cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 70])[1].tobytes() for frame in frames]
+
+    print(f"{len(frames)} frames of {frames[0].shape[1]}x{frames[0].shape[0]}, first 5 skipped as warm-up")
+    print(f"{'path':<10} {'version':<8} {'stage':<13} {'ms/frame':>9} {'KiB/frame':>10}")
+    for path, version, pipeline in PIPELINES:
+        timed = run(pipeline, frames, jpegs, False)
+        traced = run(pipeline, frames, jpegs, True)
+        for stage, times in timed.times.items():
+            allocated = np.mean(traced.allocations[stage][5:]) / 1024
+            print(f"{path:<10} {version:<8} {stage:<13} {np.mean(times[5:]):9.2f} {allocated:10.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,20 @@
+import base64
+import cv2
+
+# Client-side frames shared by the server benchmarks.
+
+def encode_video_frames(video_path, frame_limit, jpeg_quality, as_base64=False):
+    """
+    The first frame_limit frames of the video as JPEG bytes, or with as_base64
+    as the base64 text a JSON frame_data message carries in image_data.
+    """
+    frames = []
+    vid = cv2.VideoCapture(video_path)
+    while len(frames) < frame_limit:
+        ret, frame = vid.read()
+        if not ret:
+            break
+        ok, jpeg = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality])
+        frames.append(base64.b64encode(jpeg.tobytes()).decode('ascii') if as_base64 else jpeg.tobytes())
+    vid.release()
+    return frames
@@ -0,0 +1,53 @@
+import argparse
+import asyncio
+import functools
+import time
+from bench_frames import encode_video_frames
+from pose_profiles import create_profile_pose
+from server_inference import InferenceExecutor
+
+# Sustained frames/sec of the inference executor on this machine. Several sessions
+# stream JPEG frames at once so every worker stays busy.
+
+async def stream_session(inference, session_id, frames, stage_totals):
+    for image_data in frames:
+        _, timings = await inference.infer(session_id, image_data, False)
+        for stage, value in timings.items():
+            stage_totals[stage] = stage_totals.get(stage, 0.0) + value
+    await inference.release(session_id)
+
+async def measure(profile, mode, workers, sessions, frames):
+    # a partial of a module-level function, so process workers can unpickle it
+    inference = InferenceExecutor(functools.partial(create_profile_pose, profile), mode=mode, workers=workers, max_pending=workers * 2)
+    # warm-up: load the model in every worker before timing
+    await asyncio.gather(*[stream_session(inference, -1 - i, frames[:2], {}) for i in range(workers)])
+
+    stage_totals = {}
+    start = time.perf_counter()
+    await asyncio.gather(*[stream_session(inference, i, frames, stage_totals) for i in range(sessions)])
+    elapsed = time.perf_counter() - start
+    inference.shutdown()
+
+    frame_total = sessions * len(frames)
+    return frame_total / elapsed, {stage: total / frame_total for stage, total in stage_totals.items()}
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the MediaPipe inference worker pool.")
+    parser.add_argument("--video", default="Python Scripts/origin_vids/HurryUpPun.mp4")
+    parser.add_argument("--frames", type=int, default=60, help="frames streamed by each session")
+    parser.add_argument("--sessions", type=int, default=4)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--modes", nargs="+", default=["thread", "process"])
+    parser.add_argument("--profile", default="tracking", help="pose profile from pose_profiles.py (socket_server_DTW.py runs tracking)")
+    args = parser.parse_args()
+
+    frames = encode_video_frames(args.video, args.frames, 70)
+    print(f"{'mode':<8} {'workers':>7} {'frames/s':>9} {'queue ms':>9} {'decode ms':>10} {'convert ms':>11} {'infer ms':>9}")
+    for mode in args.modes:
+        for workers in args.workers:
+            fps, stages = asyncio.run(measure(args.profile, mode, workers, args.sessions, frames))
+            print(f"{mode:<8} {workers:>7} {fps:9.1f} {stages['queue_ms']:9.2f} {stages['decode_ms']:10.2f} "
+                  f"{stages['convert_ms']:11.2f} {stages['inference_ms']:9.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+import argparse
+import json
+import os
+import tempfile
+import time
+import cv2
+from pose_pipeline import iter_pose_frames, relative_angle_json_frame
+from pose_preprocess import FramePreprocessor
+from pose_profiles import create_profile_pose
+from pose_writers import PoseJsonWriter, finalize_jsonl
+
+# Writer-only timing on frames copied from a committed reference, then end-to-end
+# extraction (decode, pose, JSON) of the first seconds of a committed video with
+# the old per-frame writer and the streaming one: seconds of extraction per minute
+# of video stay flat with the streaming writer and grow with the old one.
+#
+#   python "Python Scripts/codes/bench_json_writer.py" --video "Python Scripts/origin_vids/HurryUpPun.mp4" --seconds 5 10 21
+
+# the old per-frame writer from pose_extAnno_Json.py, kept here for comparison
+def legacy_initialize_json_file(json_file_path):
+    with open(json_file_path, 'w') as json_file:
+        json.dump([], json_file)
+
+def legacy_append_to_json_file(json_file_path, data):
+    with open(json_file_path, 'r+') as json_file:
+        file_data = json.load(json_file)
+        file_data.append(data)
+        json_file.seek(0)
+        json.dump(file_data, json_file, indent=2)
+
+def make_frames(reference_frames, frame_total):
+    frames = []
+    for i in range(frame_total):
+        frame = dict(reference_frames[i % len(reference_frames)])
+        frame["frame_number"] = i
+        frames.append(frame)
+    return frames
+
+def time_legacy(frames, output_path):
+    start = time.perf_counter()
+    legacy_initialize_json_file(output_path)
+    for frame in frames:
+        legacy_append_to_json_file(output_path, frame)
+    return time.perf_counter() - start
+
+def time_streaming(frames, output_path, jsonl=False):
+    start = time.perf_counter()
+    with PoseJsonWriter(output_path + "l" if jsonl else output_path, jsonl=jsonl) as writer:
+        for frame in frames:
+            writer.write(frame)
+    if jsonl:
+        finalize_jsonl(output_path + "l", output_path)
+    return time.perf_counter() - start
+
+def time_extraction(video_path, profile, frame_limit, output_path, legacy):
+    """(frames extracted, seconds) of pose_extAnno_Json.py's loop over the video's first frame_limit frames."""
+    pose = create_profile_pose(profile)
+    vid = cv2.VideoCapture(video_path)
+    start = time.perf_counter()
+    if legacy:
+        legacy_initialize_json_file(output_path)
+    else:
+        json_writer = PoseJsonWriter(output_path)
+    frame_total = 0
+    previous_landmarks = None
+    for frame_count, timestamp, frame, results, current_landmarks in iter_pose_frames(vid, pose, FramePreprocessor(), frame_ranges=[(0, frame_limit)]):
+        json_frame = relative_angle_json_frame(frame_count, timestamp, current_landmarks, previous_landmarks)
+        if legacy:
+            legacy_append_to_json_file(output_path, json_frame)
+        else:
+            json_writer.write(json_frame)
+        if current_landmarks:
+            previous_landmarks = current_landmarks
+        frame_total += 1
+    if not legacy:
+        json_writer.close()
+    seconds = time.perf_counter() - start
+    vid.release()
+    pose.close()
+    return frame_total, seconds
+
+def time_video(video_path, profile, video_seconds, tmp_dir):
+    fps = cv2.VideoCapture(video_path).get(cv2.CAP_PROP_FPS) or 30.0
+    print(f"\n{video_path} ({profile}), end to end")
+    print(f"{'video s':>8} {'frames':>7} {'legacy s':>9} {'stream s':>9} {'legacy s/min':>13} {'stream s/min':>13}")
+    for length in video_seconds:
+        legacy_path = os.path.join(tmp_dir, "legacy.json")
+        stream_path = os.path.join(tmp_dir, "stream.json")
+        frame_total, legacy_time = time_extraction(video_path, profile, int(round(length * fps)), legacy_path, legacy=True)
+        _, stream_time = time_extraction(video_path, profile, int(round(length * fps)), stream_path, legacy=False)
+        with open(legacy_path, 'rb') as legacy_file, open(stream_path, 'rb') as stream_file:
+            assert legacy_file.read() == stream_file.read(), "streaming extraction differs from legacy extraction"
+        minutes = frame_total / fps / 60
+        print(f"{frame_total / fps:8.1f} {frame_total:>7} {legacy_time:9.1f} {stream_time:9.1f} "
+              f"{legacy_time / minutes:13.1f} {stream_time / minutes:13.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the streaming JSON writer against the old per-frame rewrite.")
+    parser.add_argument("--video", default="Python Scripts/origin_vids/HurryUpPun.mp4", help="committed video for the end-to-end run")
+    parser.add_argument("--profile", default="static", help="pose profile from pose_profiles.py (static gives the same landmarks every run)")
+    parser.add_argument("--seconds", type=float, nargs="+", default=[5, 10, 21], help="lengths of the video's start to extract")
+    parser.add_argument("--writer-only", action="store_true", help="skip the end-to-end run")
+    args = parser.parse_args()
+
+    # frames are copied from a committed reference so the per-frame payload is realistic
+    reference_json_path = "Python Scripts/results/poses/WholeGarden_legacy_edit.json"
+    frame_totals = [250, 500, 1000, 2000, 4000, 8000]
+    # the legacy writer is quadratic, so stop timing it past this many frames
+    legacy_max_frames = 1000
+
+    with open(reference_json_path, 'r') as file:
+        reference_frames = json.load(file)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        output_path = os.path.join(tmp_dir, "bench.json")
+        print(f"{'frames':>8} {'legacy s':>10} {'stream s':>10} {'jsonl s':>10} {'stream us/frame':>16}")
+        for frame_total in frame_totals:
+            frames = make_frames(reference_frames, frame_total)
+
+            legacy_time = time_legacy(frames, output_path) if frame_total <= legacy_max_frames else None
+            if legacy_time is not None:
+                with open(output_path, 'rb') as file:
+                    legacy_bytes = file.read()
+
+            stream_time = time_streaming(frames, output_path)
+            if legacy_time is not None:
+                with open(output_path, 'rb') as file:
+                    assert file.read() == legacy_bytes, "streaming output differs from legacy output"
+
+            jsonl_time = time_streaming(frames, output_path, jsonl=True)
+
+            legacy_text = f"{legacy_time:10.3f}" if legacy_time is not None else f"{'-':>10}"
+            print(f"{frame_total:>8} {legacy_text} {stream_time:10.3f} {jsonl_time:10.3f} {stream_time / frame_total * 1e6:16.1f}")
+
+        if not args.writer_only:
+            time_video(args.video, args.profile, args.seconds, tmp_dir)
+
+if __name__ == "__main__":
+    main()
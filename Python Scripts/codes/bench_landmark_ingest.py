@@ -0,0 +1,74 @@
+import argparse
+import asyncio
+import importlib
+import json
+import shutil
+import numpy as np
+from bench_frames import encode_video_frames
+from bench_multi_client import frame_message, make_app_path, run_clients
+from server_inference import InferenceExecutor
+from server_protocol import pack_binary_landmarks
+
+# Throughput of a running scoring server fed JPEG frames (frame_data) versus
+# landmarks computed on the client (landmark_data). The landmarks are extracted
+# here with the server's own Pose settings, so both paths must give the same replies.
+#   python "Python Scripts/codes/socket_server_frame.py"
+#   python "Python Scripts/codes/bench_landmark_ingest.py" --server frame --clients 1 4
+
+async def extract_landmarks(create_pose, frames):
+    # one session in order, like the server's tracker for a single client
+    inference = InferenceExecutor(create_pose, mode="thread", workers=1)
+    landmarks = []
+    for image_data in frames:
+        frame_landmarks, _ = await inference.infer(0, image_data, False)
+        landmarks.append(frame_landmarks)
+    await inference.release(0)
+    inference.shutdown()
+    return landmarks
+
+def landmark_message(frame_number, landmarks, binary):
+    if binary:
+        return pack_binary_landmarks(frame_number, landmarks)
+    return json.dumps({"type": "landmark_data", "frame_number": frame_number,
+                       "landmarks": None if landmarks is None else landmarks.tolist()})
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare image and landmark ingest on a running scoring server.")
+    parser.add_argument("--url", default="ws://localhost:8139")
+    parser.add_argument("--server", choices=["frame", "DTW"], default="frame", help="which server is running, for its Pose settings")
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--video", default="Python Scripts/origin_vids/HurryUpPun.mp4")
+    parser.add_argument("--reference", default="Python Scripts/results/poses/HurryUpPun_legacy_edit.json")
+    parser.add_argument("--frames", type=int, default=150)
+    parser.add_argument("--jpeg-quality", type=int, default=70)
+    parser.add_argument("--binary", action="store_true", help="use binary messages for both paths")
+    args = parser.parse_args()
+
+    song_name = "HurryUpPun"
+    server = importlib.import_module(f"socket_server_{args.server}")
+    frames = encode_video_frames(args.video, args.frames, args.jpeg_quality, as_base64=True)
+    landmarks = asyncio.run(extract_landmarks(server.create_pose, frames))
+    paths = {
+        "image": [frame_message(i, image_data, args.binary) for i, image_data in enumerate(frames)],
+        "landmark": [landmark_message(i, frame_landmarks, args.binary) for i, frame_landmarks in enumerate(landmarks)]
+    }
+    app_path = make_app_path(args.reference, song_name)
+
+    try:
+        print(f"{'path':<9} {'clients':>7} {'frames/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'bytes/frame':>12}")
+        replies = {}
+        for path, messages in paths.items():
+            size = np.mean([len(message) for message in messages])
+            for client_count in args.clients:
+                results, elapsed = asyncio.run(run_clients(args.url, app_path, song_name, messages, client_count))
+                latencies = np.concatenate([client_latencies for _, client_latencies in results]) * 1e3
+                replies.setdefault(path, results[0][0])
+                print(f"{path:<9} {client_count:>7} {client_count * len(messages) / elapsed:9.1f} {np.percentile(latencies, 50):8.2f} "
+                      f"{np.percentile(latencies, 95):8.2f} {size:12.0f}")
+        # float32 binary landmarks round the coordinates, so only JSON is expected to match exactly
+        print(f"replies agree: {replies['image'] == replies['landmark']}")
+    finally:
+        shutil.rmtree(app_path)
+
+if __name__ == "__main__":
+    main()
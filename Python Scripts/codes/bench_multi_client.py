@@ -0,0 +1,83 @@
+import argparse
+import asyncio
+import base64
+import json
+import os
+import shutil
+import tempfile
+import time
+import numpy as np
+import websockets
+from bench_frames import encode_video_frames
+from server_protocol import pack_binary_frame
+
+# Load test for the per-connection sessions: N clients stream the same video at a
+# running server at once, then every client's replies are compared with a single
+# client run. Start the server first, e.g.
+#   python "Python Scripts/codes/socket_server_frame.py"
+#   python "Python Scripts/codes/bench_multi_client.py" --clients 1 2 4
+# --binary sends frames in the binary format of server_protocol.py instead of base64 JSON.
+
+def make_app_path(reference_path, song_name):
+    # the servers read {app_path}/PoseFiles/{song}.json, like the Unity build does
+    app_path = tempfile.mkdtemp()
+    os.makedirs(os.path.join(app_path, "PoseFiles"))
+    shutil.copy(reference_path, os.path.join(app_path, "PoseFiles", song_name + ".json"))
+    return app_path
+
+def frame_message(frame_number, image_data, binary):
+    if binary:
+        return pack_binary_frame(frame_number, base64.b64decode(image_data))
+    return json.dumps({"type": "frame_data", "frame_number": frame_number, "image_data": image_data, "flip": False})
+
+async def run_client(url, app_path, song_name, messages):
+    replies = []
+    latencies = []
+    async with websockets.connect(url, max_size=None) as websocket:
+        await websocket.send(json.dumps({"type": "song_selection", "song_name": song_name, "app_path": app_path}))
+        for message in messages:
+            start = time.perf_counter()
+            await websocket.send(message)
+            # both servers answer every frame_data message with exactly one reply
+            replies.append(json.loads(await websocket.recv()))
+            latencies.append(time.perf_counter() - start)
+    return replies, latencies
+
+async def run_clients(url, app_path, song_name, messages, client_count):
+    start = time.perf_counter()
+    results = await asyncio.gather(*[run_client(url, app_path, song_name, messages) for _ in range(client_count)])
+    return results, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate several Unity clients against one scoring server.")
+    parser.add_argument("--url", default="ws://localhost:8139")
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--video", default="Python Scripts/origin_vids/HurryUpPun.mp4")
+    parser.add_argument("--reference", default="Python Scripts/results/poses/HurryUpPun_legacy_edit.json")
+    parser.add_argument("--frames", type=int, default=150)
+    parser.add_argument("--jpeg-quality", type=int, default=70)
+    parser.add_argument("--binary", action="store_true", help="send binary frame messages instead of JSON")
+    args = parser.parse_args()
+
+    song_name = "HurryUpPun"
+    frames = encode_video_frames(args.video, args.frames, args.jpeg_quality, as_base64=True)
+    messages = [frame_message(frame_number, image_data, args.binary) for frame_number, image_data in enumerate(frames)]
+    app_path = make_app_path(args.reference, song_name)
+
+    try:
+        (baseline_results,), _ = asyncio.run(run_clients(args.url, app_path, song_name, messages, 1))
+        baseline_replies = baseline_results[0]
+
+        print(f"{'clients':>7} {'frames/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'isolated':>9}")
+        for client_count in args.clients:
+            results, elapsed = asyncio.run(run_clients(args.url, app_path, song_name, messages, client_count))
+            latencies = np.concatenate([client_latencies for _, client_latencies in results]) * 1e3
+            # with isolated sessions every client sees exactly what a lone client sees
+            isolated = all(replies == baseline_replies for replies, _ in results)
+            print(f"{client_count:>7} {client_count * len(messages) / elapsed:9.1f} {np.percentile(latencies, 50):8.1f} "
+                  f"{np.percentile(latencies, 95):8.1f} {str(isolated):>9}")
+    finally:
+        shutil.rmtree(app_path)
+
+if __name__ == "__main__":
+    main()
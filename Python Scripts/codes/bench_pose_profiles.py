@@ -0,0 +1,78 @@
+import argparse
+import time
+import cv2
+import numpy as np
+from pose_angles import calculate_relative_angles
+from pose_matching import match_window
+from pose_profiles import POSE_PROFILES, create_profile_pose
+from pose_reference import load_reference_angles
+from pose_preprocess import downscale_frame
+
+# Inference latency of every pose profile against how closely it reproduces the
+# scores of the baseline profile. Each video is played as the player against the
+# reference and scored per frame with socket_server_frame.py's match_window.
+
+def run_profile(name, video_path, reference_angles, frame_limit):
+    pose = create_profile_pose(name)
+    max_side = POSE_PROFILES[name].input_max_side
+    vid = cv2.VideoCapture(video_path)
+    inference_ms = []
+    angles = []
+    scores = []
+    frame_number = 0
+    while frame_number < frame_limit:
+        ret, frame = vid.read()
+        if not ret:
+            break
+        start = time.perf_counter()
+        frame_rgb = cv2.cvtColor(downscale_frame(frame, max_side), cv2.COLOR_BGR2RGB)
+        results = pose.process(frame_rgb)
+        inference_ms.append((time.perf_counter() - start) * 1e3)
+
+        if results.pose_landmarks:
+            frame_angles = np.array(calculate_relative_angles(results.pose_landmarks.landmark))
+            scores.append(match_window(reference_angles, frame_angles, frame_number)[0])
+        else:
+            frame_angles = np.full(8, np.nan)
+            scores.append(0.0)
+        angles.append(frame_angles)
+        frame_number += 1
+    vid.release()
+    pose.close()
+    # the first frames load the model and warm caches
+    return np.array(inference_ms[5:]), np.array(angles), np.array(scores)
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare pose profiles: latency versus scoring agreement.")
+    parser.add_argument("--videos", nargs="+", default=["Python Scripts/origin_vids/HurryUpPun.mp4", "Python Scripts/origin_vids/HurryUpFond.mp4"])
+    parser.add_argument("--reference", default="Python Scripts/results/poses/HurryUpPun_legacy_edit.json")
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--baseline", default="legacy_frame")
+    parser.add_argument("--profiles", nargs="+", default=[name for name in POSE_PROFILES if name != "heavy"])
+    args = parser.parse_args()
+
+    reference_angles = load_reference_angles(args.reference)
+    profiles = [args.baseline] + [name for name in args.profiles if name != args.baseline]
+    print(f"baseline {args.baseline}, reference {args.reference}")
+    print(f"{'video':<16} {'profile':<14} {'ms/frame':>9} {'p95 ms':>8} {'detected':>9} {'mean score':>11} {'|d score|':>10} {'max |d|':>8} {'angle MAE':>10}")
+    for video_path in args.videos:
+        video_name = video_path.replace("\\", "/").rsplit("/", 1)[-1].rsplit(".", 1)[0]
+        baseline_angles = baseline_scores = None
+        for name in profiles:
+            try:
+                inference_ms, angles, scores = run_profile(name, video_path, reference_angles, args.frames)
+            except Exception as e:
+                print(f"{video_name:<16} {name:<14} unavailable: {e}")
+                continue
+            if baseline_scores is None:
+                baseline_angles, baseline_scores = angles, scores
+            score_difference = np.abs(scores - baseline_scores)
+            # angles are only comparable where both profiles found a pose
+            both_detected = ~np.isnan(angles[:, 0]) & ~np.isnan(baseline_angles[:, 0])
+            angle_error = np.abs(angles[both_detected] - baseline_angles[both_detected]).mean() if both_detected.any() else float("nan")
+            print(f"{video_name:<16} {name:<14} {inference_ms.mean():9.1f} {np.percentile(inference_ms, 95):8.1f} "
+                  f"{(~np.isnan(angles[:, 0])).mean():9.1%} {scores.mean():11.4f} {score_difference.mean():10.4f} "
+                  f"{score_difference.max():8.4f} {angle_error:10.4f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+import argparse
+import time
+import cv2
+import numpy as np
+from pose_pipeline import iter_pose_frames, relative_angle_csv_row
+from pose_preprocess import FramePreprocessor
+from pose_profiles import create_profile_pose
+from pose_reference import load_reference_angles
+
+# Effect of downscaling / ROI cropping (pose_preprocess.py) on the extracted
+# relative angles. Each setting extracts the video the same way pose_extAnno_csv.py
+# does; angles are compared frame by frame with the committed *_legacy_edit
+# reference of the same video and with the full-frame run of the same profile.
+
+SETTINGS = [
+    (None, None),
+    (480, None),
+    (320, None),
+    (None, 0.25),
+    (480, 0.25),
+    (None, 0.1),
+]
+
+def extract(video_path, profile, max_side, roi_margin, frame_limit):
+    pose = create_profile_pose(profile)
+    preprocessor = FramePreprocessor(max_side, roi_margin)
+    vid = cv2.VideoCapture(video_path)
+    angles = []
+    start = time.perf_counter()
+    for frame_count, timestamp, frame, results, current_landmarks in iter_pose_frames(vid, pose, preprocessor):
+        angles.append(relative_angle_csv_row(frame_count, timestamp, current_landmarks)[2:])
+        if frame_count + 1 >= frame_limit:
+            break
+    elapsed = time.perf_counter() - start
+    vid.release()
+    pose.close()
+    return np.array(angles), elapsed / len(angles) * 1e3
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure how input downscaling and ROI cropping change extracted angles.")
+    parser.add_argument("--video", default="Python Scripts/origin_vids/HurryUpPun.mp4")
+    parser.add_argument("--reference", default="Python Scripts/results/poses/HurryUpPun_legacy_edit.json")
+    parser.add_argument("--profiles", nargs="+", default=["static", "tracking"])
+    parser.add_argument("--frames", type=int, default=300)
+    args = parser.parse_args()
+
+    reference_angles = load_reference_angles(args.reference)
+    print(f"{args.video} against {args.reference}")
+    print(f"{'profile':<10} {'max side':>8} {'margin':>7} {'ms/frame':>9} {'MAE ref':>8} {'MAE full':>9} {'p99 |d| full':>13}")
+    for profile in args.profiles:
+        full_angles = None
+        for max_side, roi_margin in SETTINGS:
+            angles, ms_per_frame = extract(args.video, profile, max_side, roi_margin, args.frames)
+            if full_angles is None:
+                full_angles = angles
+            frames = min(len(angles), len(reference_angles))
+            reference_error = np.abs(angles[:frames] - reference_angles[:frames]).mean()
+            full_difference = np.abs(angles - full_angles)
+            print(f"{profile:<10} {str(max_side):>8} {str(roi_margin):>7} {ms_per_frame:9.1f} {reference_error:8.4f} "
+                  f"{full_difference.mean():9.4f} {np.percentile(full_difference, 99):13.4f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+import glob
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+import numpy as np
+from pose_reference import POSE_EXTENSION, convert_reference, load_pose_file, load_reference_angles
+
+# Load time and resident memory (RSS) of a reference song: the text files the
+# servers used to parse against the memory-mapped .pose format. RSS is measured in
+# a fresh process per load, right after loading and again after reading every
+# value once (the memory-mapped pages only become resident when they are read,
+# and then they are the file's page cache, shared by every process using it).
+
+# what the socket servers did on every song_selection before the binary format
+def legacy_load_reference_poses(json_file_path):
+    reference_pose_sequence = []
+    with open(json_file_path, 'r') as file:
+        data = json.load(file)
+        for frame_data in data:
+            reference_pose_sequence.append(list(frame_data['relative_angles'].values()))
+    return reference_pose_sequence
+
+LOADERS = {
+    "legacy_json": legacy_load_reference_poses,
+    "text": load_reference_angles,
+    "pose": lambda path: load_pose_file(path)[1],
+}
+
+def rss_kb():
+    # current resident set size; /proc is Linux only, elsewhere fall back to the peak
+    if os.path.exists("/proc/self/statm"):
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in KB on Linux, in bytes on macOS
+    return peak / 1024 if sys.platform == "darwin" else peak
+
+def rss_growth(loader_name, path):
+    """(KB of RSS a load adds, KB after reading every value too), run in a fresh process."""
+    before = rss_kb()
+    result = LOADERS[loader_name](path)
+    loaded = rss_kb()
+    float(np.sum([np.sum(row) for row in result]) if isinstance(result, list) else np.sum(result))
+    read = rss_kb()
+    return loaded - before, read - before
+
+def measure(loader_name, path, repeats, pool):
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = LOADERS[loader_name](path)
+        best = min(best, time.perf_counter() - start)
+        del result
+    return (best,) + pool.apply(rss_growth, (loader_name, path))
+
+def main():
+    reference_paths = sorted(glob.glob("Python Scripts/results/poses/*.json") + glob.glob("Python Scripts/results/poses/*.csv"))
+    repeats = 5
+
+    print(f"{'reference':<40} {'frames':>6} {'text load ms':>12} {'text RSS KB':>11} {'.pose load us':>13} "
+          f"{'.pose RSS KB':>12} {'read RSS KB':>11} {'.pose file KB':>13}")
+    # maxtasksperchild=1: every RSS measurement starts from a fresh interpreter
+    with tempfile.TemporaryDirectory() as tmp_dir, multiprocessing.get_context("spawn").Pool(1, maxtasksperchild=1) as pool:
+        for reference_path in reference_paths:
+            pose_path = os.path.join(tmp_dir, os.path.basename(reference_path) + POSE_EXTENSION)
+            convert_reference(reference_path, pose_path)
+
+            text_loader = "legacy_json" if reference_path.endswith(".json") else "text"
+            text_time, text_rss, _ = measure(text_loader, reference_path, repeats, pool)
+            pose_time, pose_rss, pose_read_rss = measure("pose", pose_path, repeats, pool)
+            frame_count = load_pose_file(pose_path)[0]["frame_count"]
+
+            print(f"{os.path.basename(reference_path):<40} {frame_count:>6} {text_time * 1e3:12.2f} {text_rss:11.0f} {pose_time * 1e6:13.1f} "
+                  f"{pose_rss:12.0f} {pose_read_rss:11.0f} {os.path.getsize(pose_path) / 1024:13.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+import time
+from types import SimpleNamespace
+import numpy as np
+from pose_angles import landmark_triplets, calculate_relative_angles, calculate_relative_angles_batch
+
+# the per-triplet loop every script used to carry its own copy of
+def legacy_calculate_relative_angles(landmarks):
+    def calculate_relative_angle(a, b, c):
+        ba = np.array([a.x - b.x, a.y - b.y])
+        bc = np.array([c.x - b.x, c.y - b.y])
+
+        cosine_angle = np.dot(ba, bc) / (np.linalg.norm(ba) * np.linalg.norm(bc))
+        angle = np.arccos(np.clip(cosine_angle, -1.0, 1.0))
+        return angle
+
+    relative_angles = []
+
+    for a, b, c in landmark_triplets:
+        angle = calculate_relative_angle(landmarks[a], landmarks[b], landmarks[c])
+        relative_angles.append(angle)
+
+    return relative_angles
+
+def main():
+    frame_total = 7584  # length of the longest committed reference (WholeGarden)
+    rng = np.random.default_rng(0)
+    landmark_array = rng.random((frame_total, 33, 2))
+    # stand-ins for MediaPipe landmark objects, which expose .x and .y
+    landmark_frames = [[SimpleNamespace(x=x, y=y) for x, y in frame] for frame in landmark_array.tolist()]
+
+    start = time.perf_counter()
+    legacy_angles = [legacy_calculate_relative_angles(frame) for frame in landmark_frames]
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    single_angles = [calculate_relative_angles(frame) for frame in landmark_frames]
+    single_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch_angles = calculate_relative_angles_batch(landmark_array)
+    batch_time = time.perf_counter() - start
+
+    assert np.array_equal(np.array(legacy_angles), np.array(single_angles))
+    assert np.array_equal(np.array(legacy_angles), batch_angles)
+
+    print(f"frames: {frame_total}")
+    print(f"legacy per-triplet loop: {legacy_time * 1e6 / frame_total:8.2f} us/frame")
+    print(f"single-frame fast path:  {single_time * 1e6 / frame_total:8.2f} us/frame")
+    print(f"batch kernel:            {batch_time * 1e6 / frame_total:8.2f} us/frame ({batch_time * 1e3:.2f} ms total)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+import argparse
+import contextlib
+import io
+import time
+import numpy as np
+from pose_reference import load_reference_angles
+from pose_scoring import FeedbackScorer, score_records, score_sequence
+
+# Whole-sequence scoring (score_sequence) against the frame-by-frame FeedbackScorer
+# loop of pose_compareVIds_csv.py. Players are the reference itself, shifted in time,
+# with angle noise and dropped poses, and running past the end of the reference;
+# every scenario must give the same per-frame records and tallies to the bit.
+
+SCENARIOS = [
+    # (name, frame shift, noise in radians, share of frames without a pose, extra frames)
+    ("identical", 0, 0.0, 0.0, 0),
+    ("noisy", 0, 0.3, 0.05, 0),
+    ("shifted", 12, 0.15, 0.1, 90),
+    ("sloppy", 5, 0.8, 0.3, 45),
+]
+
+def make_player(ref_angles, shift, noise, dropped, extra_frames, rng):
+    frame_total = len(ref_angles) + extra_frames
+    angles = ref_angles[np.clip(np.arange(frame_total) - shift, 0, len(ref_angles) - 1)]
+    angles = angles + rng.normal(0.0, noise, angles.shape) if noise else angles.copy()
+    has_pose = rng.random(frame_total) >= dropped
+    angles[~has_pose] = 0.0
+    return angles, has_pose, list(range(frame_total))
+
+def loop_scores(player_angles, has_pose, frame_numbers, ref_relative_angles_data):
+    scorer = FeedbackScorer(ref_relative_angles_data)
+    records = []
+    # frames past the reference print a line each
+    with contextlib.redirect_stdout(io.StringIO()):
+        for relative_angles_array, pose_found, frame_count in zip(player_angles.tolist(), has_pose, frame_numbers):
+            scorer.update(frame_count, relative_angles_array if pose_found else None)
+            records.append(scorer.frame_record(frame_count, 0.0))
+    return records, scorer.total_feedbacks
+
+def best_time(function, repeats):
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark whole-sequence scoring against the per-frame loop.")
+    parser.add_argument("--reference", default="Python Scripts/results/poses/WholeGarden_legacy_edit.json")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    ref_angles = np.asarray(load_reference_angles(args.reference), dtype=np.float64)
+    ref_relative_angles_data = ref_angles.tolist()
+    rng = np.random.default_rng(args.seed)
+    print(f"{args.reference}: {len(ref_angles)} reference frames")
+    print(f"{'scenario':<10} {'frames':>7} {'loop ms':>9} {'array ms':>9} {'speed-up':>9}  same")
+    for name, shift, noise, dropped, extra_frames in SCENARIOS:
+        player_angles, has_pose, frame_numbers = make_player(ref_angles, shift, noise, dropped, extra_frames, rng)
+        (loop_records, loop_totals), loop_seconds = best_time(
+            lambda: loop_scores(player_angles, has_pose, frame_numbers, ref_relative_angles_data), args.repeats)
+        scores, array_seconds = best_time(
+            lambda: score_sequence(player_angles, has_pose, frame_numbers, ref_angles), args.repeats)
+        same = score_records(scores, frame_numbers, [0.0] * len(frame_numbers)) == loop_records and scores.total_feedbacks == loop_totals
+        print(f"{name:<10} {len(frame_numbers):>7} {loop_seconds * 1e3:9.1f} {array_seconds * 1e3:9.2f} "
+              f"{loop_seconds / array_seconds:8.0f}x  {same}")
+        assert same, f"{name}: whole-sequence scores differ from the per-frame loop"
+
+if __name__ == "__main__":
+    main()
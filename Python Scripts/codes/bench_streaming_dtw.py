@@ -0,0 +1,73 @@
+import time
+import numpy as np
+from fastdtw import fastdtw
+from pose_matching import StreamingDTW
+from pose_reference import load_reference_angles
+
+# the batch path socket_server_DTW.py ran once every 30 frames
+def mae_distance(x, y):
+    return np.mean(np.abs(np.array(x) - np.array(y)))
+
+def legacy_window_score(normalized_reference_sequence, normalized_player_sequence, start_player_frame, current_frame_number, offset=0):
+    start_reference_frame = max(0, start_player_frame - offset)
+    end_reference_frame = min(len(normalized_reference_sequence), current_frame_number + offset)
+    reference_window = normalized_reference_sequence[start_reference_frame:end_reference_frame]
+    distance, path = fastdtw(normalized_player_sequence, reference_window, dist=mae_distance)
+    return max(0, 1 - (distance / len(path)))
+
+def make_player_sequence(normalized_reference, rng, noise=0.05):
+    # the player drifts up to ~4 frames behind/ahead of the reference, plus angle noise
+    frame_total = len(normalized_reference)
+    drift = np.round(4 * np.sin(np.arange(frame_total) / 45)).astype(int)
+    source_frames = np.clip(np.arange(frame_total) + drift, 0, frame_total - 1)
+    return normalized_reference[source_frames] + rng.normal(0, noise, normalized_reference.shape)
+
+def main():
+    reference_json_path = "Python Scripts/results/poses/KonJaiNgai_legacy_edit.json"
+    buffer_size = 30
+    band = 15
+
+    normalized_reference = load_reference_angles(reference_json_path) / np.pi
+    reference_lists = normalized_reference.tolist()
+    rng = np.random.default_rng(0)
+    player = make_player_sequence(normalized_reference, rng)
+
+    legacy_frame_times = []
+    legacy_scores = []
+    player_buffer = []
+    for frame_number, angles in enumerate(player.tolist()):
+        start = time.perf_counter()
+        player_buffer.append(angles)
+        if len(player_buffer) == 1:
+            start_player_frame = frame_number
+        if len(player_buffer) == buffer_size:
+            legacy_scores.append(legacy_window_score(reference_lists, player_buffer, start_player_frame, frame_number))
+            player_buffer = []
+        legacy_frame_times.append(time.perf_counter() - start)
+
+    streaming_dtw = StreamingDTW(normalized_reference, band=band)
+    streaming_frame_times = []
+    streaming_scores = []
+    for frame_number, angles in enumerate(player.tolist()):
+        start = time.perf_counter()
+        score = streaming_dtw.update(angles, frame_number)
+        if streaming_dtw.frames == buffer_size:
+            streaming_scores.append(score)
+            streaming_dtw.reset()
+        streaming_frame_times.append(time.perf_counter() - start)
+
+    legacy_frame_times = np.array(legacy_frame_times) * 1e6
+    streaming_frame_times = np.array(streaming_frame_times) * 1e6
+    legacy_scores = np.array(legacy_scores)
+    streaming_scores = np.array(streaming_scores)
+
+    print(f"reference: {reference_json_path} ({len(normalized_reference)} frames), window {buffer_size}, band {band}")
+    print(f"{'path':<10} {'mean us':>9} {'p50 us':>9} {'p99 us':>9} {'max us':>9}")
+    for name, times in [("fastdtw", legacy_frame_times), ("streaming", streaming_frame_times)]:
+        print(f"{name:<10} {times.mean():9.1f} {np.percentile(times, 50):9.1f} {np.percentile(times, 99):9.1f} {times.max():9.1f}")
+    print(f"window scores: {len(legacy_scores)}, mean |difference| {np.abs(legacy_scores - streaming_scores).mean():.4f}, "
+          f"max |difference| {np.abs(legacy_scores - streaming_scores).max():.4f}, "
+          f"correlation {np.corrcoef(legacy_scores, streaming_scores)[0, 1]:.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,309 @@
+import argparse
+import asyncio
+import base64
+import json
+import shutil
+import time
+import cv2
+import numpy as np
+import websockets
+from bench_multi_client import make_app_path
+from server_protocol import pack_binary_frame, parse_binary_message
+
+# Headless stand-in for the Unity game, for load-testing the scoring servers
+# without Unity or a webcam. It speaks the same protocol as ClientConnectionManager.cs
+# and GameplaySceneController.SendFrame: one song_selection, then frame_data
+# messages holding a 640x360 JPEG (quality 70) of the player, sent on a timer and
+# numbered with the frame of the song video being shown.
+#
+#   stream  a video as if it were the webcam, at --fps (0 = next frame as soon as
+#           the previous one is answered), from 1..N clients at once
+#   record  sit between Unity and the server and save what Unity sends, e.g. start
+#           the server with port = 8140 and let Unity connect to this proxy on 8139
+#   replay  send a recording again, at its own pace (--speed 1), faster, or as fast
+#           as the server answers (--speed 0)
+#
+#   python "Python Scripts/codes/bench_unity_client.py" stream --video "Python Scripts/origin_vids/HurryUpPun.mp4" --fps 30 --clients 1 2 4
+#   python "Python Scripts/codes/bench_unity_client.py" record sessions/player1.jsonl --server ws://localhost:8140
+#   python "Python Scripts/codes/bench_unity_client.py" replay sessions/player1.jsonl --speed 0 --clients 1 4
+#
+# Recordings are JSON lines, one per client message:
+#   {"t": seconds since the first message, "frame_number": n or null, "text": "..."}
+# with "binary": base64 in place of "text" for binary frames (server_protocol.py).
+
+UNITY_FRAME_SIZE = (640, 360)
+UNITY_JPEG_QUALITY = 70
+
+
+def song_selection_message(song_name, app_path):
+    return json.dumps({"type": "song_selection", "song_name": song_name, "app_path": app_path})
+
+def video_messages(video_path, fps, jpeg_quality=UNITY_JPEG_QUALITY, size=UNITY_FRAME_SIZE, flip=False,
+                   start_frame=0, frame_limit=None, binary=False):
+    """
+    Frames of a video as the game would send them: (seconds after the first frame,
+    frame_number, message). At fps below the video's own rate, frames in between
+    are skipped and frame_number jumps the way videoPlayer.frame does; above it,
+    fps is capped at the video's rate, since replies are matched by frame_number.
+    """
+    vid = cv2.VideoCapture(video_path)
+    video_fps = vid.get(cv2.CAP_PROP_FPS) or 30.0
+    send_fps = min(fps, video_fps) if fps > 0 else video_fps
+    messages = []
+    frame_count = 0
+    while frame_limit is None or len(messages) < frame_limit:
+        ret, frame = vid.read()
+        if not ret:
+            break
+        # the frame on screen when the k-th message is due
+        due_frame = start_frame + int(round(len(messages) * video_fps / send_fps))
+        if frame_count == due_frame:
+            frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+            ok, jpeg = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality])
+            offset = len(messages) / send_fps
+            if binary:
+                message = pack_binary_frame(frame_count, jpeg.tobytes(), flip=flip)
+            else:
+                # same keys, in the same order, as the JsonConvert object in SendFrame
+                message = json.dumps({"type": "frame_data", "frame_number": frame_count,
+                                      "image_data": base64.b64encode(jpeg.tobytes()).decode('ascii'), "flip": flip})
+            messages.append((offset, frame_count, message))
+        frame_count += 1
+    vid.release()
+    return messages
+
+def message_frame_number(message):
+    """frame_number of a frame message (text or binary), None for anything else."""
+    try:
+        data = parse_binary_message(message) if isinstance(message, bytes) else json.loads(message)
+    except Exception:
+        return None
+    return data.get("frame_number") if isinstance(data, dict) and data.get("type") in ("frame_data", "landmark_data") else None
+
+def recording_line(offset, message):
+    line = {"t": offset, "frame_number": message_frame_number(message)}
+    if isinstance(message, bytes):
+        line["binary"] = base64.b64encode(message).decode('ascii')
+    else:
+        line["text"] = message
+    return json.dumps(line)
+
+def read_recording(recording_path, app_path=None):
+    """
+    Returns (song_selection message or None, [(offset, frame_number, message), ...]).
+    app_path replaces the recorded one, so a session recorded on the game machine
+    finds its references here.
+    """
+    selection = None
+    messages = []
+    with open(recording_path, 'r') as file:
+        for line in file:
+            record = json.loads(line)
+            message = base64.b64decode(record["binary"]) if "binary" in record else record["text"]
+            if record["frame_number"] is not None:
+                messages.append((record["t"], record["frame_number"], message))
+                continue
+            data = json.loads(message) if isinstance(message, str) else None
+            if isinstance(data, dict) and data.get("type") == "song_selection":
+                if app_path is not None:
+                    data["app_path"] = app_path
+                    message = json.dumps(data)
+                selection = message
+    # replays start with the first frame
+    first_offset = messages[0][0] if messages else 0.0
+    return selection, [(offset - first_offset, frame_number, message) for offset, frame_number, message in messages]
+
+
+async def run_client(url, selection, messages, speed=1.0, drain_timeout=2.0):
+    """
+    One game session: song_selection, then every frame message. With speed > 0 the
+    frames go out on their offsets divided by speed, whether or not earlier replies
+    came back (the game never waits); with speed 0 each frame waits for the
+    previous reply. Replies are matched to frames by the frame_number the servers echo.
+    """
+    result = {"sent": 0, "answered": 0, "no_pose": 0, "errors": 0, "latencies_ms": [], "server_dropped": 0, "stats": None}
+    sent_at = {}
+    last_reply = asyncio.Event()
+
+    def handle_reply(reply):
+        frame_number = reply.get("frame_number")
+        if frame_number not in sent_at:
+            # an error raised while handling a message carries no frame number
+            result["errors"] += 1
+            return
+        result["latencies_ms"].append((time.perf_counter() - sent_at.pop(frame_number)) * 1e3)
+        result["answered"] += 1
+        result["server_dropped"] = reply.get("dropped", result["server_dropped"])
+        # the DTW server says so; the frame server answers a frame without a pose with correctness 0
+        if reply.get("error") == "No pose detected" or reply.get("correctness") == 0.0:
+            result["no_pose"] += 1
+
+    async with websockets.connect(url, max_size=None) as websocket:
+        if selection is not None:
+            await websocket.send(selection)
+        start = time.perf_counter()
+
+        if speed == 0:
+            for offset, frame_number, message in messages:
+                sent_at[frame_number] = time.perf_counter()
+                await websocket.send(message)
+                result["sent"] += 1
+                handle_reply(json.loads(await websocket.recv()))
+        else:
+            async def receive():
+                while True:
+                    reply = json.loads(await websocket.recv())
+                    if "stats" in reply:
+                        return reply["stats"]
+                    handle_reply(reply)
+                    last_reply.set()
+
+            receiver = asyncio.create_task(receive())
+            for offset, frame_number, message in messages:
+                delay = start + offset / speed - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                sent_at[frame_number] = time.perf_counter()
+                await websocket.send(message)
+                result["sent"] += 1
+            # frames the server dropped are never answered: stop once replies stop coming
+            while sent_at:
+                last_reply.clear()
+                try:
+                    await asyncio.wait_for(last_reply.wait(), drain_timeout)
+                except asyncio.TimeoutError:
+                    break
+        elapsed = time.perf_counter() - start
+
+        # the server's own breakdown of where this session's time went
+        await websocket.send(json.dumps({"type": "stats"}))
+        if speed == 0:
+            while result["stats"] is None:
+                reply = json.loads(await websocket.recv())
+                result["stats"] = reply.get("stats")
+        else:
+            result["stats"] = await receiver
+    result["elapsed"] = elapsed
+    return result
+
+async def run_clients(url, selection, messages, client_count, speed, drain_timeout):
+    start = time.perf_counter()
+    results = await asyncio.gather(*[run_client(url, selection, messages, speed, drain_timeout) for _ in range(client_count)])
+    return results, time.perf_counter() - start
+
+def print_report(client_count, results, elapsed):
+    latencies = np.concatenate([result["latencies_ms"] for result in results]) if any(result["latencies_ms"] for result in results) else np.zeros(1)
+    sent = sum(result["sent"] for result in results)
+    answered = sum(result["answered"] for result in results)
+    stages = [result["stats"]["session"]["stages"] for result in results if result["stats"]]
+    inference_ms = np.mean([stage["inference"]["mean_ms"] for stage in stages if "inference" in stage]) if stages else 0.0
+    server_frame_ms = np.mean([stage["frame"]["mean_ms"] for stage in stages if "frame" in stage]) if stages else 0.0
+    p50, p90, p99 = np.percentile(latencies, [50, 90, 99])
+    print(f"{client_count:>7} {sent:>6} {answered:>8} {sent - answered:>8} {sum(result['no_pose'] for result in results):>7} "
+          f"{sum(result['errors'] for result in results):>6} {answered / elapsed:9.1f} {p50:8.1f} {p90:8.1f} {p99:8.1f} "
+          f"{latencies.max():8.1f} {server_frame_ms:10.1f} {inference_ms:9.1f}")
+
+def print_header():
+    print(f"{'clients':>7} {'sent':>6} {'answered':>8} {'dropped':>8} {'no pose':>7} {'errors':>6} {'replies/s':>9} "
+          f"{'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'max ms':>8} {'server ms':>10} {'infer ms':>9}")
+
+
+async def record_proxy(recording_path, listen_port, server_url):
+    """Forward one game at a time to the server while writing what it sends to recording_path."""
+    async def relay(client, path):
+        start = None
+        async with websockets.connect(server_url, max_size=None) as server:
+            with open(recording_path, 'a') as recording:
+                async def client_to_server():
+                    nonlocal start
+                    async for message in client:
+                        now = time.perf_counter()
+                        if start is None:
+                            start = now
+                        recording.write(recording_line(now - start, message) + "\n")
+                        await server.send(message)
+
+                async def server_to_client():
+                    async for message in server:
+                        await client.send(message)
+
+                tasks = [asyncio.create_task(client_to_server()), asyncio.create_task(server_to_client())]
+                try:
+                    await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                finally:
+                    for task in tasks:
+                        task.cancel()
+        print(f"session from {client.remote_address} appended to {recording_path}")
+
+    async with websockets.serve(relay, "localhost", listen_port, max_size=None):
+        print(f"Recording ws://localhost:{listen_port} -> {server_url} into {recording_path}")
+        await asyncio.Future()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Synthetic Unity client: stream, record and replay game sessions against a scoring server.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    load_options = argparse.ArgumentParser(add_help=False)
+    load_options.add_argument("--url", default="ws://localhost:8139")
+    load_options.add_argument("--clients", type=int, nargs="+", default=[1])
+    load_options.add_argument("--song", default="HurryUpPun", help="song_name sent in song_selection")
+    load_options.add_argument("--reference", default="Python Scripts/results/poses/HurryUpPun_legacy_edit.json",
+                              help="reference copied into a temporary {app_path}/PoseFiles/{song}.json")
+    load_options.add_argument("--drain-timeout", type=float, default=2.0, help="seconds to wait for replies after the last frame")
+
+    stream = commands.add_parser("stream", parents=[load_options], help="stream a video as the player's webcam")
+    stream.add_argument("--video", default="Python Scripts/origin_vids/HurryUpPun.mp4")
+    stream.add_argument("--fps", type=float, default=30.0, help="frames sent per second (0 = as fast as replies come back)")
+    stream.add_argument("--frames", type=int, default=300)
+    stream.add_argument("--start-frame", type=int, default=0)
+    stream.add_argument("--jpeg-quality", type=int, default=UNITY_JPEG_QUALITY)
+    stream.add_argument("--size", type=int, nargs=2, default=list(UNITY_FRAME_SIZE), metavar=("WIDTH", "HEIGHT"))
+    stream.add_argument("--flip", action="store_true")
+    stream.add_argument("--binary", action="store_true", help="send binary frames (server_protocol.py) instead of base64 JSON")
+    stream.add_argument("--record", help="also save the generated session here for replay")
+
+    record = commands.add_parser("record", help="record game sessions through a proxy")
+    record.add_argument("recording")
+    record.add_argument("--listen-port", type=int, default=8139)
+    record.add_argument("--server", default="ws://localhost:8140")
+
+    replay = commands.add_parser("replay", parents=[load_options], help="replay a recorded session")
+    replay.add_argument("recording")
+    replay.add_argument("--speed", type=float, default=0.0, help="1 = recorded pace, 0 = as fast as replies come back")
+    replay.add_argument("--app-path", help="replace the recorded app_path (default: a temporary one holding --reference)")
+    args = parser.parse_args()
+
+    if args.command == "record":
+        asyncio.run(record_proxy(args.recording, args.listen_port, args.server))
+        return
+
+    app_path = make_app_path(args.reference, args.song)
+    try:
+        if args.command == "stream":
+            messages = video_messages(args.video, args.fps, args.jpeg_quality, tuple(args.size), args.flip,
+                                      args.start_frame, args.frames, args.binary)
+            selection = song_selection_message(args.song, app_path)
+            speed = 1.0 if args.fps > 0 else 0.0
+            if args.record:
+                with open(args.record, 'w') as recording:
+                    recording.write(recording_line(0.0, selection) + "\n")
+                    for offset, frame_number, message in messages:
+                        recording.write(recording_line(offset, message) + "\n")
+            print(f"{args.video}: {len(messages)} frames at {args.fps:g} fps to {args.url}")
+        else:
+            selection, messages = read_recording(args.recording, args.app_path or app_path)
+            if selection is None:
+                selection = song_selection_message(args.song, app_path)
+            speed = args.speed
+            print(f"{args.recording}: {len(messages)} frames at speed {speed:g} to {args.url}")
+
+        print_header()
+        for client_count in args.clients:
+            results, elapsed = asyncio.run(run_clients(args.url, selection, messages, client_count, speed, args.drain_timeout))
+            print_report(client_count, results, elapsed)
+    finally:
+        shutil.rmtree(app_path)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+import argparse
+import os
+import tempfile
+import time
+import cv2
+from pose_extAnno_csv import annotate_frame, initialize_video_writer
+from pose_pipeline import iter_pose_frames, relative_angle_csv_row
+from pose_profiles import create_profile_pose
+from pose_writers import ThreadedVideoWriter
+
+# End-to-end frames/sec of the extractor loop (decode -> pose -> angles -> annotate
+# + encode), serial versus decoder / writer threads, with the annotated video
+# written or skipped. Overlap only pays off with more than one core free.
+
+def run(video_path, profile, frame_limit, read_ahead, threaded_writer, write_video, output_path):
+    pose = create_profile_pose(profile)
+    vid = cv2.VideoCapture(video_path)
+    vid_writer = None
+    if write_video:
+        vid_writer = initialize_video_writer(vid, output_path)
+        if threaded_writer:
+            vid_writer = ThreadedVideoWriter(vid_writer, annotate_frame)
+
+    frame_total = 0
+    start = time.perf_counter()
+    for frame_count, timestamp, frame, results, current_landmarks in iter_pose_frames(vid, pose, read_ahead=read_ahead):
+        relative_angle_csv_row(frame_count, timestamp, current_landmarks)
+        if vid_writer is not None:
+            if threaded_writer:
+                vid_writer.write(frame, results.pose_landmarks, frame_count, timestamp)
+            else:
+                annotate_frame(frame, results.pose_landmarks, frame_count, timestamp)
+                vid_writer.write(frame)
+        frame_total += 1
+        if frame_total >= frame_limit:
+            break
+    if vid_writer is not None:
+        vid_writer.release()
+    elapsed = time.perf_counter() - start
+    vid.release()
+    pose.close()
+    return frame_total / elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the threaded decode / pose / annotate+encode pipeline.")
+    parser.add_argument("--video", default="Python Scripts/origin_vids/HurryUpPun.mp4")
+    parser.add_argument("--profile", default="tracking")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--read-ahead", type=int, default=8)
+    args = parser.parse_args()
+
+    output_path = os.path.join(tempfile.mkdtemp(), "annotated.mp4")
+    print(f"{args.video}, {args.frames} frames, {os.cpu_count()} CPUs")
+    print(f"{'pipeline':<10} {'video out':>9} {'frames/s':>9}")
+    try:
+        for write_video in (True, False):
+            for name, read_ahead, threaded_writer in (("serial", 0, False), ("threaded", args.read_ahead, True)):
+                fps = run(args.video, args.profile, args.frames, read_ahead, threaded_writer, write_video, output_path)
+                print(f"{name:<10} {str(write_video):>9} {fps:9.1f}")
+    finally:
+        if os.path.exists(output_path):
+            os.remove(output_path)
+        os.rmdir(os.path.dirname(output_path))
+
+if __name__ == "__main__":
+    main()
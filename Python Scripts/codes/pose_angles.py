@@ -0,0 +1,87 @@
+import numpy as np
+
+# (a, b, c): the relative angle is measured at landmark b between b->a and b->c
+landmark_triplets = [
+    (11, 13, 15), (12, 14, 16),
+    (13, 11, 23), (11, 23, 25), (23, 25, 27),
+    (14, 12, 24), (12, 24, 26), (24, 26, 28)
+]
+
+_triplet_index = np.array(landmark_triplets)
+
+# (a, b): the 26 body segments of MediaPipe's POSE_CONNECTIONS (landmarks 11-32),
+# one per G / A column of write_csv_header's 'g' and 'a' feature families
+body_connections = [
+    (11, 12), (11, 13), (11, 23), (12, 14), (12, 24), (13, 15), (14, 16),
+    (15, 17), (15, 19), (15, 21), (16, 18), (16, 20), (16, 22), (17, 19), (18, 20),
+    (23, 24), (23, 25), (24, 26), (25, 27), (26, 28),
+    (27, 29), (27, 31), (28, 30), (28, 32), (29, 31), (30, 32)
+]
+
+_connection_index = np.array(body_connections)
+
+# the single-frame path only reads the landmarks the triplets touch
+_used_landmarks = sorted({i for triplet in landmark_triplets for i in triplet})
+_used_triplet_index = np.array([[_used_landmarks.index(i) for i in triplet] for triplet in landmark_triplets])
+
+
+def landmarks_to_array(landmarks):
+    """Convert a sequence of MediaPipe landmarks into a (33, 2) array of x, y."""
+    return np.array([(landmark.x, landmark.y) for landmark in landmarks], dtype=np.float64)
+
+
+def calculate_relative_angles_batch(landmark_array, triplets=None):
+    """
+    Relative angles for many frames in one pass.
+
+    landmark_array: (N, 33, 2+) array of landmark coordinates (only x, y are used)
+    returns: (N, len(triplets)) array of angles in radians
+    """
+    index = _triplet_index if triplets is None else np.asarray(triplets)
+    points = np.asarray(landmark_array, dtype=np.float64)[..., :2]
+
+    a = points[:, index[:, 0]]
+    b = points[:, index[:, 1]]
+    c = points[:, index[:, 2]]
+    ba = a - b
+    bc = c - b
+
+    # stacked matmul rounds the same way as the old per-triplet np.dot / np.linalg.norm
+    ba_row = ba[..., np.newaxis, :]
+    dot = (ba_row @ bc[..., np.newaxis])[..., 0, 0]
+    norm_ba = np.sqrt((ba_row @ ba[..., np.newaxis])[..., 0, 0])
+    norm_bc = np.sqrt((bc[..., np.newaxis, :] @ bc[..., np.newaxis])[..., 0, 0])
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cosine_angle = dot / (norm_ba * norm_bc)
+    return np.arccos(np.clip(cosine_angle, -1.0, 1.0))
+
+
+def calculate_relative_angles(landmarks):
+    """Single-frame fast path: MediaPipe landmarks in, list of 8 angles out."""
+    points = np.array([(landmarks[i].x, landmarks[i].y) for i in _used_landmarks], dtype=np.float64)
+    return list(calculate_relative_angles_batch(points[np.newaxis], _used_triplet_index)[0])
+
+
+def calculate_relative_angles_array(landmark_array):
+    """Single-frame path for landmarks already in an array: (33, 2+) in, list of 8 angles out."""
+    points = np.asarray(landmark_array, dtype=np.float64)[_used_landmarks, :2]
+    return list(calculate_relative_angles_batch(points[np.newaxis], _used_triplet_index)[0])
+
+
+def _segment_deltas(landmark_array, connections):
+    index = _connection_index if connections is None else np.asarray(connections)
+    points = np.asarray(landmark_array, dtype=np.float64)[..., :2]
+    delta = points[:, index[:, 1]] - points[:, index[:, 0]]
+    return delta[..., 0], delta[..., 1]
+
+def calculate_gradients_batch(landmark_array, connections=None):
+    """(N, 33, 2+) landmarks in, (N, len(connections)) slopes dy / dx of the segments a -> b (inf when vertical)."""
+    dx, dy = _segment_deltas(landmark_array, connections)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return dy / dx
+
+def calculate_absolute_angles_batch(landmark_array, connections=None):
+    """(N, 33, 2+) landmarks in, (N, len(connections)) directions of the segments a -> b in radians, from the image x axis."""
+    dx, dy = _segment_deltas(landmark_array, connections)
+    return np.arctan2(dy, dx)
@@ -0,0 +1,134 @@
+import hashlib
+import json
+import os
+import numpy as np
+
+# Raw landmark archive: everything pose inference found in a video, so feature
+# sets can be derived again (pose_features.py) without re-running MediaPipe.
+# One compressed .npz per video, named by the SHA-256 of the video file's bytes
+# (plus an optional tag for the pose settings), holding
+#
+#   landmarks      float32 (frames, 33, 4)  x, y, z, visibility as MediaPipe returned them,
+#                                           zeros for frames without a pose
+#   has_pose       bool    (frames,)
+#   frame_numbers  int64   (frames,)
+#   timestamps     float64 (frames,)        ms, as the extractors write them
+#   metadata       JSON text: version, source video, content hash and pose settings
+#
+# MediaPipe keeps landmark coordinates as float32, so the archive loses nothing.
+
+ARCHIVE_VERSION = 1
+ARCHIVE_EXTENSION = ".npz"
+LANDMARK_COUNT = 33
+
+
+def video_content_hash(video_path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(video_path, 'rb') as file:
+        for chunk in iter(lambda: file.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def archive_path(archive_dir, content_hash, tag=""):
+    return os.path.join(archive_dir, content_hash + (f"_{tag}" if tag else "") + ARCHIVE_EXTENSION)
+
+def archive_tag(path):
+    """The tag an archive was written with (see archive_path), "" without one."""
+    # content hashes are hex digits, so the first underscore starts the tag
+    return os.path.basename(path)[:-len(ARCHIVE_EXTENSION)].partition("_")[2]
+
+def find_archive(archive_dir, video_path, tag=""):
+    """Archive of this video's content, or None when it was never archived."""
+    path = archive_path(archive_dir, video_content_hash(video_path), tag)
+    return path if os.path.exists(path) else None
+
+def pose_landmarks_array(pose_landmarks):
+    """(33, 4) float32 x, y, z, visibility of MediaPipe pose landmarks; zeros without a pose."""
+    if not pose_landmarks:
+        return np.zeros((LANDMARK_COUNT, 4), dtype=np.float32)
+    return np.array([(landmark.x, landmark.y, landmark.z, landmark.visibility) for landmark in pose_landmarks.landmark], dtype=np.float32)
+
+
+class LandmarkRecorder:
+    """Collects one video's raw landmarks frame by frame for write_archive."""
+
+    def __init__(self):
+        self.landmarks = []
+        self.has_pose = []
+        self.frame_numbers = []
+        self.timestamps = []
+
+    def append(self, frame_count, timestamp, pose_landmarks):
+        self.landmarks.append(pose_landmarks_array(pose_landmarks))
+        self.has_pose.append(bool(pose_landmarks))
+        self.frame_numbers.append(frame_count)
+        self.timestamps.append(timestamp)
+
+    def arrays(self):
+        """(landmarks, has_pose, frame_numbers, timestamps) as write_archive takes them."""
+        return (np.array(self.landmarks, dtype=np.float32).reshape(-1, LANDMARK_COUNT, 4),
+                np.array(self.has_pose, dtype=bool),
+                np.array(self.frame_numbers, dtype=np.int64),
+                np.array(self.timestamps, dtype=np.float64))
+
+
+def write_archive(archive_dir, video_path, landmarks, has_pose, frame_numbers, timestamps, tag="", content_hash=None, **settings):
+    """Write a video's archive into archive_dir and return its path. settings (profile, ...) go into the metadata."""
+    if content_hash is None:
+        content_hash = video_content_hash(video_path)
+    metadata = {
+        "version": ARCHIVE_VERSION,
+        "source": os.path.basename(video_path),
+        "content_hash": content_hash,
+        "frame_count": int(len(frame_numbers)),
+        "settings": settings
+    }
+    os.makedirs(archive_dir, exist_ok=True)
+    path = archive_path(archive_dir, content_hash, tag)
+    # np.savez would add .npz to a temporary name, so it writes through a file object
+    with open(path + ".tmp", 'wb') as file:
+        np.savez_compressed(
+            file,
+            landmarks=np.asarray(landmarks, dtype=np.float32).reshape(-1, LANDMARK_COUNT, 4),
+            has_pose=np.asarray(has_pose, dtype=bool),
+            frame_numbers=np.asarray(frame_numbers, dtype=np.int64),
+            timestamps=np.asarray(timestamps, dtype=np.float64),
+            metadata=np.array(json.dumps(metadata))
+        )
+    os.replace(path + ".tmp", path)
+    return path
+
+def load_archive(path):
+    """Returns a dict of the archive's arrays, with "metadata" parsed back into a dict."""
+    with np.load(path, allow_pickle=False) as archive:
+        data = {name: archive[name] for name in archive.files}
+    data["metadata"] = json.loads(str(data["metadata"]))
+    if data["metadata"]["version"] != ARCHIVE_VERSION:
+        raise ValueError(f"{path} is archive version {data['metadata']['version']}, expected {ARCHIVE_VERSION}")
+    return data
+
+def fill_missing_landmarks(landmarks, has_pose):
+    """
+    The landmarks the extractors compute features from, for every frame at once:
+    in frames with a pose, a landmark that came back as (0, 0) takes its value from
+    the previous frame with a pose, as extract_landmark_data in pose_pipeline.py
+    does one frame at a time. Frames without a pose are left as they are.
+    """
+    landmarks = np.asarray(landmarks)
+    frame_total = len(landmarks)
+    pose_frames = np.nonzero(has_pose)[0]
+    if len(pose_frames) == 0:
+        return landmarks.copy()
+
+    # a landmark is its own source unless it is (0, 0) after an earlier pose frame;
+    # otherwise it carries whatever the previous pose frame ended up with
+    keeps_own = (landmarks[..., 0] != 0) | (landmarks[..., 1] != 0)
+    keeps_own[pose_frames[0]] = True
+    keeps_own &= np.asarray(has_pose, dtype=bool)[:, np.newaxis]
+    source = np.where(keeps_own, np.arange(frame_total)[:, np.newaxis], -1)
+    source = np.maximum.accumulate(source, axis=0)
+
+    filled = landmarks.copy()
+    rows = pose_frames[:, np.newaxis]
+    filled[pose_frames] = landmarks[source[rows, np.arange(landmarks.shape[1])], np.arange(landmarks.shape[1])]
+    return filled
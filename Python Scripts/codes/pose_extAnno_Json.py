@@ -1,10 +1,12 @@
 import cv2
 import json
-import sys
 import mediapipe as mp
-import numpy as np
-from mediapipe.python.solutions.pose import PoseLandmark
 import time
+from pose_writers import PoseJsonWriter, ThreadedVideoWriter, finalize_jsonl
+from pose_pipeline import iter_pose_frames, relative_angle_json_frame
+from pose_preprocess import FramePreprocessor
+from pose_archive import LandmarkRecorder, write_archive
+from pose_reference import load_song_data, scored_frame_range
 
 def initialize_pose():
     return mp.solutions.pose.Pose(
@@ -24,15 +26,6 @@ def initialize_video_writer(video_capture, output_path):
     return cv2.VideoWriter(output_path, fourcc, fps, (frame_width, frame_height))
 
 
-def process_frame(frame, pose, frame_count, timestamp):
-    frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-    frame_rgb.flags.writeable = False
-    results = pose.process(frame_rgb)
-    frame_rgb.flags.writeable = True
-    frame_bgr = cv2.cvtColor(frame_rgb, cv2.COLOR_RGB2BGR)
-    
-    return frame_bgr, results
-
 def draw_pose_landmarks(frame, pose_landmarks):
     mp.solutions.drawing_utils.draw_landmarks(
         frame, 
@@ -52,50 +45,10 @@ def add_text_into_vid_frame(frame, frame_count, timestamp):
         cv2.LINE_4
     ) 
 
-def extract_landmark_data(pose_landmarks, previous_landmarks):
+def annotate_frame(frame, pose_landmarks, frame_count, timestamp):
     if pose_landmarks:
-        current_landmarks = []
-        for i, landmark in enumerate(pose_landmarks.landmark):
-            if landmark.x == 0 and landmark.y == 0 and previous_landmarks is not None:
-                current_landmarks.append(previous_landmarks[i])
-            else:
-                current_landmarks.append(landmark)
-        return current_landmarks
-    return None
-
-def calculate_metrics(landmarks):
-    def calculate_relative_angle(a, b, c):        
-        ba = np.array([a.x - b.x, a.y - b.y])
-        bc = np.array([c.x - b.x, c.y - b.y])
-        
-        cosine_angle = np.dot(ba, bc) / (np.linalg.norm(ba) * np.linalg.norm(bc))
-        angle = np.arccos(np.clip(cosine_angle, -1.0, 1.0))
-        return angle
-    
-    landmark_triplets = [
-        (11, 13, 15), (12, 14, 16),
-        (13, 11, 23), (11, 23, 25), (23, 25, 27),
-        (14, 12, 24), (12, 24, 26), (24, 26, 28)
-    ]
-
-    relative_angles = []
-
-    for a, b, c in landmark_triplets:
-        angle = calculate_relative_angle(landmarks[a], landmarks[b], landmarks[c])
-        relative_angles.append(angle)
-
-    return relative_angles
-
-def initialize_json_file(json_file_path):
-    with open(json_file_path, 'w') as json_file:
-        json.dump([], json_file)
-
-def append_to_json_file(json_file_path, data):
-    with open(json_file_path, 'r+') as json_file:
-        file_data = json.load(json_file)
-        file_data.append(data)
-        json_file.seek(0)
-        json.dump(file_data, json_file, indent=2)
+        draw_pose_landmarks(frame, pose_landmarks)
+    add_text_into_vid_frame(frame, frame_count, timestamp)
 
 def main():
     # change the input path here ("file path" + "video name")
@@ -107,58 +60,69 @@ def main():
     output_video_path = f"Python Scripts/results/videos/{input_vid_name}_" + "legacy.mp4"
     # r = relative angle
     output_json_path = f"Python Scripts/results/poses/{input_vid_name}_" + "legacy_edit.json"
+    # True = stream one frame per line to a .jsonl file, converted to the JSON array at the end
+    write_jsonl = False
+    output_jsonl_path = f"Python Scripts/results/poses/{input_vid_name}_" + "legacy_edit.jsonl"
+
+    # shrink what pose sees: longest side in pixels, and crop margin around the last pose (None = off)
+    input_max_side = None
+    roi_margin = None
+    # False = only write the JSON, no annotated video
+    write_video = True
+    # frames decoded ahead on a separate thread while pose runs (0 = decode inline)
+    read_ahead = 8
+    # run pose on every frame (1), or only on key frames up to max_skip frames apart and
+    # interpolate the landmarks between them; the spacing shrinks back to every frame
+    # when a body landmark would move more than max_motion (normalized) between key frames
+    max_skip = 1
+    max_motion = 0.01
+    # Unity's song data JSON: run pose only on the frames the game scores for this song;
+    # earlier frames are written as frames without a pose and the output ends after them (None = every frame)
+    song_data_path = None
+    # also keep every frame's raw landmarks (pose_archive.py) in this directory (None = off)
+    landmark_archive_dir = None
 
     pose = initialize_pose()
     vid = cv2.VideoCapture(input_vid_path)
-    vid_writer = initialize_video_writer(vid, output_video_path)
+    # annotation and encoding run on the writer's own thread
+    vid_writer = ThreadedVideoWriter(initialize_video_writer(vid, output_video_path), annotate_frame) if write_video else None
+    preprocessor = FramePreprocessor(input_max_side, roi_margin)
+    recorder = LandmarkRecorder() if landmark_archive_dir is not None else None
+    frame_ranges = [scored_frame_range(load_song_data(song_data_path)[input_vid_name], warmup_frames=30)] if song_data_path else None
 
-    initialize_json_file(output_json_path)
+    json_writer = PoseJsonWriter(output_jsonl_path if write_jsonl else output_json_path, jsonl=write_jsonl)
 
-    frame_count = 0
     previous_landmarks = None
 
-    while True:
-        ret, frame = vid.read()
-        if not ret:
-            break
-        
-        # annotate video
-        frame, results = process_frame(frame, pose, frame_count, vid.get(cv2.CAP_PROP_POS_MSEC))
-        
-        if results.pose_landmarks:
-            draw_pose_landmarks(frame, results.pose_landmarks)
-        
-        # add text to the frame, then write it on output video
-        add_text_into_vid_frame(frame, frame_count, vid.get(cv2.CAP_PROP_POS_MSEC))
-        vid_writer.write(frame)
-
-        json_data = {
-            "frame_number": frame_count,
-            "timestamp": vid.get(cv2.CAP_PROP_POS_MSEC)
-        }
-
-        current_landmarks = extract_landmark_data(results.pose_landmarks, previous_landmarks)
-        
+    for frame_count, timestamp, frame, results, current_landmarks in iter_pose_frames(vid, pose, preprocessor, read_ahead=read_ahead, max_skip=max_skip,
+                                                                                          max_motion=max_motion, frame_ranges=frame_ranges):
+
+        # annotate video and write it on output video
+        if vid_writer is not None and frame is not None:
+            vid_writer.write(frame, results.pose_landmarks, frame_count, timestamp)
+
+        # frames without a pose repeat the last detected one
+        json_writer.write(relative_angle_json_frame(frame_count, timestamp, current_landmarks, previous_landmarks))
+        if recorder is not None:
+            recorder.append(frame_count, timestamp, results.pose_landmarks)
         if current_landmarks:
-            # other metrics
-            arr_of_rel_angles = calculate_metrics(current_landmarks)
-            json_data["relative_angles"] = {f"R{i}": angle for i, angle in enumerate(arr_of_rel_angles)}
             previous_landmarks = current_landmarks
-        else:
-            if previous_landmarks:
-                current_landmarks = previous_landmarks
-                arr_of_rel_angles = calculate_metrics(current_landmarks)
-                json_data["relative_angles"] = {f"R{i}": angle for i, angle in enumerate(arr_of_rel_angles)}
-            else:    
-                json_data["relative_angles"] = {f"R{i}": 0.0 for i in range(10)}
 
-        append_to_json_file(output_json_path, json_data)
+    json_writer.close()
+    if write_jsonl:
+        finalize_jsonl(output_jsonl_path, output_json_path)
 
-        frame_count += 1
+    if recorder is not None:
+        # same tag suffixes as pose_extract_batch.py: a key-frame or scored-frames-only
+        # archive never replaces the per-frame one
+        tag = ((f"_skip{max_skip}_motion{max_motion:g}" if max_skip > 1 else "") + ("_scored" if frame_ranges else "")).lstrip("_")
+        write_archive(landmark_archive_dir, input_vid_path, *recorder.arrays(), tag=tag, input_max_side=input_max_side, roi_margin=roi_margin,
+                      max_skip=max_skip, max_motion=max_motion, frame_ranges=frame_ranges)
 
     pose.close()
     vid.release()
-    vid_writer.release()
+    if vid_writer is not None:
+        vid_writer.release()
 
 if __name__ == "__main__":
     start_time = time.time()
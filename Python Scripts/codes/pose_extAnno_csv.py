@@ -1,9 +1,11 @@
 import cv2
-import csv
-import sys
 import mediapipe as mp
-import numpy as np
 from mediapipe.python.solutions.pose import PoseLandmark
+from pose_pipeline import iter_pose_frames, relative_angle_csv_row
+from pose_writers import BufferedCsvWriter, ThreadedVideoWriter
+from pose_preprocess import FramePreprocessor
+from pose_archive import LandmarkRecorder, write_archive
+from pose_reference import load_song_data, scored_frame_range
 
 def initialize_pose():
     return mp.solutions.pose.Pose(
@@ -49,15 +51,6 @@ def write_csv_header(csv_writer, csvType):
             header.append(f"R{i}")
         csv_writer.writerow(header)
 
-def process_frame(frame, pose, frame_count, timestamp):
-    frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-    frame_rgb.flags.writeable = False
-    results = pose.process(frame_rgb)
-    frame_rgb.flags.writeable = True
-    frame_bgr = cv2.cvtColor(frame_rgb, cv2.COLOR_RGB2BGR)
-    
-    return frame_bgr, results
-
 def draw_pose_landmarks(frame, pose_landmarks):
     mp.solutions.drawing_utils.draw_landmarks(
         frame, 
@@ -77,39 +70,10 @@ def add_text_into_vid_frame(frame, frame_count, timestamp):
         cv2.LINE_4
     ) 
 
-def extract_landmark_data(pose_landmarks, previous_landmarks):
+def annotate_frame(frame, pose_landmarks, frame_count, timestamp):
     if pose_landmarks:
-        current_landmarks = []
-        for i, landmark in enumerate(pose_landmarks.landmark):
-            if landmark.x == 0 and landmark.y == 0 and previous_landmarks is not None:
-                current_landmarks.append(previous_landmarks[i])
-            else:
-                current_landmarks.append(landmark)
-        return current_landmarks
-    return None
-
-def calculate_metrics(landmarks):
-    def calculate_relative_angle(a, b, c):        
-        ba = np.array([a.x - b.x, a.y - b.y])
-        bc = np.array([c.x - b.x, c.y - b.y])
-        
-        cosine_angle = np.dot(ba, bc) / (np.linalg.norm(ba) * np.linalg.norm(bc))
-        angle = np.arccos(np.clip(cosine_angle, -1.0, 1.0))
-        return angle
-    
-    landmark_triplets = [
-        (11, 13, 15), (12, 14, 16),
-        (13, 11, 23), (11, 23, 25), (23, 25, 27),
-        (14, 12, 24), (12, 24, 26), (24, 26, 28)
-    ]
-
-    relative_angles = []
-
-    for a, b, c in landmark_triplets:
-        angle = calculate_relative_angle(landmarks[a], landmarks[b], landmarks[c])
-        relative_angles.append(angle)
-
-    return relative_angles
+        draw_pose_landmarks(frame, pose_landmarks)
+    add_text_into_vid_frame(frame, frame_count, timestamp)
 
 def main():
     # change the input path here ("file path" + "video name")
@@ -122,59 +86,64 @@ def main():
     # r = relative angle
     output_r_csv_path = f"Python Scripts/results/poses/{input_vid_name}_"      + "legacy_edit.csv"
 
+    # shrink what pose sees: longest side in pixels, and crop margin around the last pose (None = off)
+    input_max_side = None
+    roi_margin = None
+    # False = only write the csv, no annotated video
+    write_video = True
+    # frames decoded ahead on a separate thread while pose runs (0 = decode inline)
+    read_ahead = 8
+    # run pose on every frame (1), or only on key frames up to max_skip frames apart and
+    # interpolate the landmarks between them; the spacing shrinks back to every frame
+    # when a body landmark would move more than max_motion (normalized) between key frames
+    max_skip = 1
+    max_motion = 0.01
+    # Unity's song data JSON: run pose only on the frames the game scores for this song;
+    # earlier frames are written as frames without a pose and the output ends after them (None = every frame)
+    song_data_path = None
+    # also keep every frame's raw landmarks (pose_archive.py) in this directory (None = off)
+    landmark_archive_dir = None
+
     pose = initialize_pose()
     vid = cv2.VideoCapture(input_vid_path)
-    vid_writer = initialize_video_writer(vid, output_video_path)
+    # annotation and encoding run on the writer's own thread
+    vid_writer = ThreadedVideoWriter(initialize_video_writer(vid, output_video_path), annotate_frame) if write_video else None
+    preprocessor = FramePreprocessor(input_max_side, roi_margin)
+    recorder = LandmarkRecorder() if landmark_archive_dir is not None else None
+    frame_ranges = [scored_frame_range(load_song_data(song_data_path)[input_vid_name], warmup_frames=30)] if song_data_path else None
 
     with open(output_r_csv_path, 'w', newline='') as r_csvfile:
         
-        r_csv_writer = csv.writer(r_csvfile)
+        r_csv_writer = BufferedCsvWriter(r_csvfile)
         
         # write header to csv file
         write_csv_header(r_csv_writer,'r')
 
-        frame_count = 0
-        previous_landmarks = None
-
-        while True:
-            ret, frame = vid.read()
-            if not ret:
-                break
-            
-            # annotate video
-            frame, results = process_frame(frame, pose, frame_count, vid.get(cv2.CAP_PROP_POS_MSEC))
-            
-            if results.pose_landmarks:
-                draw_pose_landmarks(frame, results.pose_landmarks)
-            
-            # add text to the frame, then write it on output video
-            add_text_into_vid_frame(frame, frame_count, vid.get(cv2.CAP_PROP_POS_MSEC))
-            vid_writer.write(frame)
-
-            row_starter = [frame_count, vid.get(cv2.CAP_PROP_POS_MSEC)]
-            r_row = row_starter.copy()
-
-            current_landmarks = extract_landmark_data(results.pose_landmarks, previous_landmarks)
-            
-            if current_landmarks:
-                
-                # other metrics
-                for landmark in current_landmarks:
-                    arrOfRelAngles = calculate_metrics(current_landmarks)
-                r_row.extend(arrOfRelAngles)
-
-                previous_landmarks = current_landmarks
-            else:
-                r_row.extend([0.0] * 8)
-
-            r_csv_writer.writerow(r_row)
-
-
-            frame_count += 1
+        # one decode + inference + angle computation per frame
+        for frame_count, timestamp, frame, results, current_landmarks in iter_pose_frames(vid, pose, preprocessor, read_ahead=read_ahead, max_skip=max_skip,
+                                                                                              max_motion=max_motion, frame_ranges=frame_ranges):
+
+            # annotate video and write it on output video
+            if vid_writer is not None and frame is not None:
+                vid_writer.write(frame, results.pose_landmarks, frame_count, timestamp)
+
+            r_csv_writer.writerow(relative_angle_csv_row(frame_count, timestamp, current_landmarks))
+            if recorder is not None:
+                recorder.append(frame_count, timestamp, results.pose_landmarks)
+
+        r_csv_writer.flush()
+
+    if recorder is not None:
+        # same tag suffixes as pose_extract_batch.py: a key-frame or scored-frames-only
+        # archive never replaces the per-frame one
+        tag = ((f"_skip{max_skip}_motion{max_motion:g}" if max_skip > 1 else "") + ("_scored" if frame_ranges else "")).lstrip("_")
+        write_archive(landmark_archive_dir, input_vid_path, *recorder.arrays(), tag=tag, input_max_side=input_max_side, roi_margin=roi_margin,
+                      max_skip=max_skip, max_motion=max_motion, frame_ranges=frame_ranges)
 
     pose.close()
     vid.release()
-    vid_writer.release()
+    if vid_writer is not None:
+        vid_writer.release()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
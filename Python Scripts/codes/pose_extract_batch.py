@@ -0,0 +1,256 @@
+import argparse
+import glob
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import cv2
+import numpy as np
+from pose_archive import LandmarkRecorder, write_archive
+from pose_extAnno_csv import write_csv_header
+from pose_pipeline import iter_pose_frames, relative_angle_csv_row, relative_angle_json_frame
+from pose_preprocess import FramePreprocessor
+from pose_profiles import create_profile_pose
+from pose_reference import FEATURE_COLUMNS, estimate_fps, load_song_data, scored_frame_range, write_pose_file
+from pose_writers import BufferedCsvWriter, PoseJsonWriter
+
+# Batch reference extraction: every video runs once through MediaPipe and writes
+#   {output_dir}/{video}{suffix}.json   (same records as pose_extAnno_Json.py)
+#   {output_dir}/{video}{suffix}.csv    (same rows as pose_extAnno_csv.py)
+#   {output_dir}/{video}{suffix}.pose   (pose_reference.py binary format)
+# Any --profile but the default adds _{profile} to the names, --max-skip > 1
+# _skip{k}_motion{m} and --song-data _scored (output_suffix).
+# Videos are spread over a process pool with one Pose per worker. With --chunks N
+# each video is also split into N time chunks extracted in parallel and stitched
+# back together; every chunk warms MediaPipe up on the frames before it first.
+#
+#   python "Python Scripts/codes/pose_extract_batch.py" "Python Scripts/origin_vids" --workers 4
+#   python "Python Scripts/codes/pose_extract_batch.py" "Python Scripts/origin_vids/WholeGarden.mp4" --chunks 8
+#
+# --archive-dir also keeps every frame's raw landmarks (pose_archive.py), so other
+# features can be derived later with pose_features.py without extracting again.
+# --song-data (Unity's song JSON) limits pose to the frames the game scores for the
+# video's song; the frames before them are written as frames without a pose and the
+# outputs end after them, so rows stay indexed by frame number.
+
+VIDEO_EXTENSIONS = (".mp4", ".mov", ".avi", ".mkv")
+
+# the offline extractors' model; its outputs keep the plain {video}{suffix} names
+DEFAULT_PROFILE = "heavy"
+
+# the worker process's Pose, reused (and reset) for every video it extracts
+_worker_pose = None
+
+def _initialize_worker(profile):
+    global _worker_pose
+    _worker_pose = create_profile_pose(profile)
+
+def find_videos(inputs):
+    video_paths = []
+    for pattern in inputs:
+        if os.path.isdir(pattern):
+            matches = [os.path.join(pattern, name) for name in os.listdir(pattern) if name.lower().endswith(VIDEO_EXTENSIONS)]
+        else:
+            matches = glob.glob(pattern)
+        for video_path in sorted(matches):
+            if video_path not in video_paths:
+                video_paths.append(video_path)
+    return video_paths
+
+def output_suffix(suffix, profile, max_skip=1, max_motion=0.01, scored=False):
+    """
+    suffix plus the settings that set a run apart from per-frame extraction with
+    DEFAULT_PROFILE, so one kind of run never overwrites the outputs of another,
+    or counts them as up to date.
+    """
+    parts = [suffix]
+    if profile != DEFAULT_PROFILE:
+        parts.append(profile)
+    if max_skip > 1:
+        parts.append(f"skip{max_skip}_motion{max_motion:g}")
+    if scored:
+        parts.append("scored")
+    return "_".join(parts)
+
+def output_paths(video_path, output_dir, suffix):
+    base_path = os.path.join(output_dir, os.path.splitext(os.path.basename(video_path))[0] + suffix)
+    return {"json": base_path + ".json", "csv": base_path + ".csv", "pose": base_path + ".pose"}
+
+def is_up_to_date(video_path, paths):
+    source_mtime = os.path.getmtime(video_path)
+    return all(os.path.exists(path) and os.path.getmtime(path) > source_mtime for path in paths.values())
+
+def open_video_at(video_path, start_frame):
+    vid = cv2.VideoCapture(video_path)
+    if start_frame:
+        vid.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+        if int(vid.get(cv2.CAP_PROP_POS_FRAMES)) != start_frame:
+            # the backend could not seek exactly: decode up to the chunk instead
+            vid.release()
+            vid = cv2.VideoCapture(video_path)
+            for _ in range(start_frame):
+                vid.grab()
+    return vid
+
+def extract_frames(video_path, first_frame=0, last_frame=None, warmup_frames=0, input_max_side=None, roi_margin=None, keep_landmarks=False,
+                   max_skip=1, max_motion=0.01, frame_ranges=None):
+    """
+    Runs in a pool worker. Extracts frames [first_frame, last_frame) of a video
+    (last_frame None = to the end) and returns (json records, csv rows, seconds,
+    raw landmarks), the last being LandmarkRecorder.arrays() with keep_landmarks
+    and None without. max_skip > 1 runs pose on key frames only and interpolates
+    the frames between, and frame_ranges limits pose to those frames (iter_pose_frames).
+
+    A chunk that does not start at frame 0 first runs pose over the warmup_frames
+    frames before it and throws those results away, so MediaPipe's tracking and
+    smoothing, and the last-detected-pose fallbacks, carry in the state a serial
+    run would have had.
+    """
+    start = time.perf_counter()
+    pose = _worker_pose
+    # a fresh tracking / smoothing state, as if this worker had just started
+    pose.reset()
+    start_frame = max(first_frame - warmup_frames, 0)
+    vid = open_video_at(video_path, start_frame)
+
+    json_frames = []
+    csv_rows = []
+    recorder = LandmarkRecorder() if keep_landmarks else None
+    previous_landmarks = None
+    for frame_count, timestamp, frame, results, current_landmarks in iter_pose_frames(vid, pose, FramePreprocessor(input_max_side, roi_margin), start_frame,
+                                                                                          max_skip=max_skip, max_motion=max_motion, frame_ranges=frame_ranges):
+        if last_frame is not None and frame_count >= last_frame:
+            break
+        if frame_count >= first_frame:
+            json_frames.append(relative_angle_json_frame(frame_count, timestamp, current_landmarks, previous_landmarks))
+            csv_rows.append(relative_angle_csv_row(frame_count, timestamp, current_landmarks))
+            if recorder is not None:
+                recorder.append(frame_count, timestamp, results.pose_landmarks)
+        if current_landmarks:
+            previous_landmarks = current_landmarks
+    vid.release()
+    return json_frames, csv_rows, time.perf_counter() - start, recorder.arrays() if recorder is not None else None
+
+def write_outputs(video_path, paths, json_frames, csv_rows):
+    song = os.path.splitext(os.path.basename(video_path))[0]
+    # outputs are written under temporary names so an interrupted run is never taken as up to date
+    temporary_paths = {kind: path + ".tmp" for kind, path in paths.items()}
+
+    with PoseJsonWriter(temporary_paths["json"]) as json_writer:
+        for json_data in json_frames:
+            json_writer.write(json_data)
+    with open(temporary_paths["csv"], 'w', newline='') as csv_file:
+        csv_writer = BufferedCsvWriter(csv_file)
+        write_csv_header(csv_writer, 'r')
+        csv_writer.writerows(csv_rows)
+        csv_writer.flush()
+
+    # the .pose file holds the JSON reference, as pose_reference.py would convert it
+    angles = [[json_data["relative_angles"][column] for column in FEATURE_COLUMNS] for json_data in json_frames]
+    timestamps = [json_data["timestamp"] for json_data in json_frames]
+    write_pose_file(
+        temporary_paths["pose"],
+        np.array(angles, dtype=np.float64).reshape(-1, len(FEATURE_COLUMNS)),
+        song=song,
+        fps=estimate_fps(timestamps),
+        timestamp_offset=timestamps[0] if timestamps else 0.0,
+        source=os.path.basename(paths["json"])
+    )
+    for kind, path in paths.items():
+        os.replace(temporary_paths[kind], path)
+
+def chunk_ranges(video_path, chunks, frame_range=None):
+    """
+    Split a video's frames into `chunks` consecutive [first, last) ranges; the last one runs to the end.
+    With frame_range (first, last) the chunks split that range evenly instead, the first one still starting at 0.
+    """
+    vid = cv2.VideoCapture(video_path)
+    frame_total = int(vid.get(cv2.CAP_PROP_FRAME_COUNT))
+    vid.release()
+    first, last = frame_range if frame_range is not None else (0, frame_total)
+    last = min(last, frame_total)
+    chunks = max(min(chunks, last - first), 1)
+    bounds = [first + (last - first) * i // chunks for i in range(chunks)] + [None]
+    bounds[0] = 0
+    return list(zip(bounds[:-1], bounds[1:]))
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract JSON, CSV and .pose references from many videos in parallel.")
+    parser.add_argument("inputs", nargs="*", default=["Python Scripts/origin_vids"], help="video files, directories or globs")
+    parser.add_argument("--output-dir", default="Python Scripts/results/poses")
+    parser.add_argument("--suffix", default="_legacy_edit",
+                        help="appended to the video name for every output file, followed by _{profile} for other profiles than " + DEFAULT_PROFILE)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--profile", default=DEFAULT_PROFILE, help="pose profile from pose_profiles.py")
+    parser.add_argument("--input-max-side", type=int, default=None)
+    parser.add_argument("--roi-margin", type=float, default=None)
+    parser.add_argument("--chunks", type=int, default=1, help="split every video into this many chunks extracted in parallel")
+    parser.add_argument("--warmup-frames", type=int, default=30, help="frames each chunk runs before its first kept frame")
+    parser.add_argument("--max-skip", type=int, default=1, help="run pose on key frames up to this many frames apart and interpolate between")
+    parser.add_argument("--max-motion", type=float, default=0.01,
+                        help="largest body landmark movement (normalized) allowed between key frames before the spacing shrinks")
+    parser.add_argument("--song-data", default=None,
+                        help="Unity song data JSON: only extract the frames the game scores for each video's song (by file name)")
+    parser.add_argument("--archive-dir", default=None, help="also write raw landmark archives (pose_archive.py) here")
+    parser.add_argument("--force", action="store_true", help="extract even when the outputs are newer than the video")
+    args = parser.parse_args()
+
+    songs = load_song_data(args.song_data) if args.song_data else {}
+    jobs = []
+    frame_ranges = {}
+    for video_path in find_videos(args.inputs):
+        song = songs.get(os.path.splitext(os.path.basename(video_path))[0])
+        if args.song_data and song is None:
+            print(f"no song data for {video_path}, extracting every frame")
+        frame_range = scored_frame_range(song, warmup_frames=args.warmup_frames) if song is not None else None
+        frame_ranges[video_path] = [frame_range] if frame_range is not None else None
+        paths = output_paths(video_path, args.output_dir, output_suffix(args.suffix, args.profile, args.max_skip, args.max_motion,
+                                                                        scored=frame_range is not None))
+        if not args.force and is_up_to_date(video_path, paths):
+            print(f"up to date: {video_path}")
+            continue
+        jobs.append((video_path, paths))
+    if not jobs:
+        print("nothing to extract")
+        return
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    start = time.perf_counter()
+    failed = 0
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=_initialize_worker, initargs=(args.profile,)) as executor:
+        futures = {}
+        for video_path, paths in jobs:
+            frame_range = frame_ranges[video_path][0] if frame_ranges[video_path] else None
+            futures[video_path] = [executor.submit(extract_frames, video_path, first_frame, last_frame, args.warmup_frames, args.input_max_side, args.roi_margin,
+                                                   args.archive_dir is not None, args.max_skip, args.max_motion, frame_ranges[video_path])
+                                   for first_frame, last_frame in chunk_ranges(video_path, args.chunks, frame_range)]
+        for video_path, paths in jobs:
+            try:
+                # chunks come back in frame order, so stitching is concatenation
+                json_frames = []
+                csv_rows = []
+                landmark_chunks = []
+                worker_seconds = 0.0
+                for future in futures[video_path]:
+                    chunk_json_frames, chunk_csv_rows, seconds, chunk_landmarks = future.result()
+                    json_frames.extend(chunk_json_frames)
+                    csv_rows.extend(chunk_csv_rows)
+                    landmark_chunks.append(chunk_landmarks)
+                    worker_seconds += seconds
+                write_outputs(video_path, paths, json_frames, csv_rows)
+                if args.archive_dir is not None:
+                    # interpolated or partial landmarks are kept apart from per-frame ones
+                    tag = args.profile + (f"_skip{args.max_skip}_motion{args.max_motion:g}" if args.max_skip > 1 else "") + ("_scored" if frame_ranges[video_path] else "")
+                    write_archive(args.archive_dir, video_path, *(np.concatenate(arrays) for arrays in zip(*landmark_chunks)),
+                                  tag=tag, profile=args.profile, input_max_side=args.input_max_side,
+                                  roi_margin=args.roi_margin, chunks=args.chunks, warmup_frames=args.warmup_frames,
+                                  max_skip=args.max_skip, max_motion=args.max_motion, frame_ranges=frame_ranges[video_path])
+            except Exception as e:
+                failed += 1
+                print(f"failed: {video_path}: {e}")
+                continue
+            print(f"{video_path}: {len(json_frames)} frames, {worker_seconds:.1f} s in workers, "
+                  f"done after {time.perf_counter() - start:.1f} s")
+    print(f"{len(jobs) - failed}/{len(jobs)} videos extracted in {time.perf_counter() - start:.1f} s with {args.workers} workers")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+import argparse
+import glob
+import os
+import time
+import numpy as np
+from mediapipe.python.solutions.pose import PoseLandmark
+from pose_angles import calculate_absolute_angles_batch, calculate_gradients_batch, calculate_relative_angles_batch, landmark_triplets
+from pose_archive import ARCHIVE_EXTENSION, archive_tag, fill_missing_landmarks, load_archive
+from pose_reference import estimate_fps, write_pose_file
+from pose_writers import BufferedCsvWriter, PoseJsonWriter
+
+# Derive feature files from raw landmark archives (pose_archive.py) instead of
+# running MediaPipe again: one vectorized pass per video over all its frames.
+#
+#   r      relative angles R0.. (landmark_triplets, or --triplets "a,b,c a,b,c ...")
+#   coord  x, y, visibility of every landmark
+#   g      gradients G0-G25 of the body segments in pose_angles.body_connections
+#   a      absolute angles A0-A25 of the same segments
+#
+# CSV rows match pose_extAnno_csv.py (frames without a pose are zeros); "r" can also
+# be written as the JSON of pose_extAnno_Json.py or as a .pose reference.
+#
+#   python "Python Scripts/codes/pose_features.py" "Python Scripts/results/landmarks" --family r --format json
+#   python "Python Scripts/codes/pose_features.py" "Python Scripts/results/landmarks" --family r --triplets "11,13,15 12,14,16 23,25,27"
+
+FAMILIES = ("r", "coord", "g", "a")
+
+
+def derive_features(landmarks, has_pose, family="r", triplets=None):
+    """Returns (column names, (frames, features) float64 array with zeros where there is no pose)."""
+    filled = fill_missing_landmarks(landmarks, has_pose)
+    pose_landmarks = filled[has_pose].astype(np.float64)
+    if family == "r":
+        triplets = landmark_triplets if triplets is None else triplets
+        names = [f"R{i}" for i in range(len(triplets))]
+        values = calculate_relative_angles_batch(pose_landmarks, triplets)
+    elif family == "g":
+        values = calculate_gradients_batch(pose_landmarks)
+        names = [f"G{i}" for i in range(values.shape[1])]
+    elif family == "a":
+        values = calculate_absolute_angles_batch(pose_landmarks)
+        names = [f"A{i}" for i in range(values.shape[1])]
+    elif family == "coord":
+        names = [f"{landmark.name}_{axis}" for landmark in PoseLandmark for axis in ("x", "y", "visibility")]
+        values = pose_landmarks[..., [0, 1, 3]].reshape(len(pose_landmarks), -1)
+    else:
+        raise ValueError(f"unknown feature family {family}")
+
+    features = np.zeros((len(has_pose), len(names)), dtype=np.float64)
+    features[has_pose] = values
+    return names, features
+
+def write_features_csv(output_path, names, features, frame_numbers, timestamps):
+    with open(output_path, 'w', newline='') as csv_file:
+        csv_writer = BufferedCsvWriter(csv_file)
+        csv_writer.writerow(['frame_number', 'timestamp'] + names)
+        csv_writer.writerows([frame_count, timestamp] + row
+                             for frame_count, timestamp, row in zip(frame_numbers.tolist(), timestamps.tolist(), features.tolist()))
+        csv_writer.flush()
+
+def last_pose_frames(has_pose):
+    """Index of the latest frame with a pose at or before each frame (-1 before the first)."""
+    return np.maximum.accumulate(np.where(has_pose, np.arange(len(has_pose)), -1))
+
+def write_features_json(output_path, names, features, has_pose, frame_numbers, timestamps):
+    # like relative_angle_json_frame: frames without a pose repeat the last pose, or 10 zeros before the first
+    zeros = {f"R{i}": 0.0 for i in range(10)}
+    with PoseJsonWriter(output_path) as json_writer:
+        for frame_count, timestamp, source in zip(frame_numbers.tolist(), timestamps.tolist(), last_pose_frames(has_pose).tolist()):
+            relative_angles = dict(zip(names, features[source].tolist())) if source >= 0 else zeros
+            json_writer.write({"frame_number": frame_count, "timestamp": timestamp, "relative_angles": relative_angles})
+
+def find_archives(inputs):
+    archive_paths = []
+    for pattern in inputs:
+        if os.path.isdir(pattern):
+            matches = [os.path.join(pattern, name) for name in os.listdir(pattern) if name.endswith(ARCHIVE_EXTENSION)]
+        else:
+            matches = glob.glob(pattern)
+        for archive_path in sorted(matches):
+            if archive_path not in archive_paths:
+                archive_paths.append(archive_path)
+    return archive_paths
+
+def parse_triplets(text):
+    """"11,13,15 12,14,16" -> [(11, 13, 15), (12, 14, 16)]"""
+    triplets = [tuple(int(index) for index in triplet.split(",")) for triplet in text.split()]
+    if any(len(triplet) != 3 or not all(0 <= index < len(PoseLandmark) for index in triplet) for triplet in triplets):
+        raise ValueError(f"triplets must be a,b,c landmark indices (0-{len(PoseLandmark) - 1}): {text}")
+    return triplets
+
+def main():
+    parser = argparse.ArgumentParser(description="Derive feature files from raw landmark archives without re-running pose.")
+    parser.add_argument("inputs", nargs="*", default=["Python Scripts/results/landmarks"], help="archive files, directories or globs")
+    parser.add_argument("--family", choices=FAMILIES, default="r")
+    parser.add_argument("--triplets", help='relative angle triplets for family r, e.g. "11,13,15 12,14,16"')
+    parser.add_argument("--format", choices=["csv", "json", "pose"], default="csv", help="json and pose are for family r")
+    parser.add_argument("--output-dir", default="Python Scripts/results/poses/derived")
+    parser.add_argument("--suffix", default="_legacy_edit", help="appended to the source video name, followed by _{tag} for tagged archives")
+    args = parser.parse_args()
+
+    if args.format != "csv" and args.family != "r":
+        parser.error("--format json / pose only hold relative angles (--family r)")
+    if args.format == "pose" and args.triplets:
+        parser.error("--format pose is a scoring reference of the standard 8 angles, without --triplets")
+    triplets = parse_triplets(args.triplets) if args.triplets else None
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    start = time.perf_counter()
+    archive_paths = find_archives(args.inputs)
+    frame_total = 0
+    for archive_path in archive_paths:
+        archive = load_archive(archive_path)
+        has_pose = archive["has_pose"]
+        names, features = derive_features(archive["landmarks"], has_pose, args.family, triplets)
+
+        song = os.path.splitext(archive["metadata"]["source"])[0]
+        # archives of the same video with other settings (tag) must not overwrite each other's features
+        tag = archive_tag(archive_path)
+        output_path = os.path.join(args.output_dir, song + args.suffix + (f"_{tag}" if tag else "") + "." + args.format)
+        if args.format == "csv":
+            write_features_csv(output_path, names, features, archive["frame_numbers"], archive["timestamps"])
+        elif args.format == "json":
+            write_features_json(output_path, names, features, has_pose, archive["frame_numbers"], archive["timestamps"])
+        else:
+            # the reference pose_extract_batch.py converts from the JSON: frames without a pose repeat the last one
+            last_pose = last_pose_frames(has_pose)
+            reference_angles = np.where((last_pose >= 0)[:, np.newaxis], features[last_pose], 0.0)
+            timestamps = archive["timestamps"].tolist()
+            write_pose_file(output_path, reference_angles, song=song, fps=estimate_fps(timestamps),
+                            frame_offset=int(archive["frame_numbers"][0]) if len(timestamps) else 0,
+                            timestamp_offset=timestamps[0] if timestamps else 0.0, source=os.path.basename(archive_path))
+        frame_total += len(has_pose)
+        print(f"{archive_path} -> {output_path}")
+    print(f"{len(archive_paths)} archives, {frame_total} frames in {time.perf_counter() - start:.1f} s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+import numpy as np
+
+
+def match_window(reference_angles, player_angles, frame_number, frames_before=12, frames_after=4, difference_clip=1.0):
+    """
+    Score one player frame against the reference frames around frame_number.
+
+    The window is reference_angles[frame_number - frames_before : frame_number + frames_after]
+    (clamped the same way socket_server_frame.py always has), taken as a view of the
+    preloaded array. Each reference row scores 1 - mean(min(|ref - player|, clip)),
+    floored at 0.
+
+    Returns (best correctness, reference frame index of the best match).
+    """
+    start_reference_frame = max(frame_number - frames_before, 0)
+    end_reference_frame = min(frame_number + frames_after, len(reference_angles) - 1)
+    reference_window = reference_angles[start_reference_frame:end_reference_frame]
+    if len(reference_window) == 0:
+        raise ValueError(f"no reference frames to compare with frame {frame_number}")
+
+    differences = np.minimum(np.abs(reference_window - np.asarray(player_angles, dtype=np.float64)), difference_clip)
+    # cumsum adds the angles left to right like the old per-row sum(), so scores match bit for bit
+    mean_differences = differences.cumsum(axis=1)[:, -1] / differences.shape[1]
+    correctness = 1 - mean_differences
+    # max(0, x) semantics: NaN scores count as 0
+    correctness = np.where(correctness > 0, correctness, 0.0)
+
+    best = int(np.argmax(correctness))
+    return float(correctness[best]), start_reference_frame + best
+
+
+class StreamingDTW:
+    """
+    Open-begin / open-end DTW that takes one player frame at a time.
+
+    Each player frame is only aligned with reference frames within `band` of its
+    own frame number (a Sakoe-Chiba band around the expected reference frame),
+    so every update costs O(band) and only the previous cost row is kept.
+    Local cost is the mean absolute difference of the (normalized) angles, the
+    same as the mae_distance the fastdtw path used.
+
+    Frame numbers may skip (Unity sends about one frame a second and the intake
+    drops frames): cells are kept by offset from each frame's own number, so the
+    alignment carries over a gap as if the reference moved on as far as the
+    player did. A frame number that does not move forward (a replay or seek
+    back) starts the alignment over.
+
+    update() returns the running score max(0, 1 - cost / path length) of the best
+    alignment ending on the current frame; reset() starts a new alignment.
+    """
+
+    def __init__(self, reference_angles, band=15):
+        self.reference_angles = np.asarray(reference_angles)
+        self.band = band
+        self.offsets = np.arange(-band, band + 1)
+        self.reset()
+
+    def reset(self):
+        self.frames = 0
+        self.previous_frame_number = None
+        self.previous_cost = None
+        self.previous_length = None
+        self.distance = 0.0
+        self.path_length = 0
+        self.score = 0.0
+        self.best_reference_frame = None
+
+    def update(self, player_angles, frame_number):
+        reference_frames = frame_number + self.offsets
+        valid = (reference_frames >= 0) & (reference_frames < len(self.reference_angles))
+        if not valid.any():
+            raise ValueError(f"no reference frames within {self.band} of frame {frame_number}")
+        first, last = np.flatnonzero(valid)[[0, -1]]
+        valid_frames = reference_frames[first:last + 1]
+
+        local_cost = np.mean(np.abs(self.reference_angles[valid_frames] - np.asarray(player_angles, dtype=np.float64)), axis=1)
+        # a missing angle (NaN) counts as the largest normalized difference
+        local_cost = np.nan_to_num(local_cost, nan=1.0)
+
+        # best predecessor from the previous player frame; cells are indexed by
+        # offset from the expected reference frame, so offset k -> k is the diagonal
+        # step and k + 1 -> k holds the reference frame while the player moves on
+        if self.previous_frame_number is not None and frame_number <= self.previous_frame_number:
+            self.previous_cost = None
+            self.previous_length = None
+
+        if self.previous_cost is None:
+            entry_cost = local_cost
+            entry_length = np.ones(len(local_cost), dtype=np.int64)
+        else:
+            diagonal_cost = self.previous_cost[first:last + 1]
+            diagonal_length = self.previous_length[first:last + 1]
+            hold_cost = np.append(self.previous_cost[1:], np.inf)[first:last + 1]
+            hold_length = np.append(self.previous_length[1:], 0)[first:last + 1]
+            use_diagonal = diagonal_cost <= hold_cost
+            predecessor_cost = np.where(use_diagonal, diagonal_cost, hold_cost)
+            predecessor_length = np.where(use_diagonal, diagonal_length, hold_length)
+            if np.isinf(predecessor_cost).all():
+                # the band lost the old alignment completely (e.g. a seek), start over here
+                predecessor_cost = np.zeros(len(local_cost))
+                predecessor_length = np.zeros(len(local_cost), dtype=np.int64)
+            entry_cost = local_cost + predecessor_cost
+            entry_length = predecessor_length + 1
+
+        # horizontal steps (reference moves on, player frame held) within this row:
+        # cost[j] = min over k <= j of entry_cost[k] + local_cost[k+1..j]
+        cumulative = np.cumsum(local_cost)
+        candidates = entry_cost - cumulative
+        running_min = np.minimum.accumulate(candidates)
+        row_cost = cumulative + running_min
+        positions = np.arange(len(local_cost))
+        start_of_run = np.maximum.accumulate(np.where(candidates <= running_min, positions, 0))
+        row_length = entry_length[start_of_run] + (positions - start_of_run)
+
+        cost = np.full(len(self.offsets), np.inf)
+        length = np.zeros(len(self.offsets), dtype=np.int64)
+        cost[first:last + 1] = row_cost
+        length[first:last + 1] = row_length
+        self.previous_cost = cost
+        self.previous_length = length
+        self.previous_frame_number = frame_number
+        self.frames += 1
+
+        normalized_cost = row_cost / row_length
+        best = int(np.argmin(normalized_cost))
+        self.distance = float(row_cost[best])
+        self.path_length = int(row_length[best])
+        self.best_reference_frame = int(valid_frames[best])
+        self.score = max(0.0, 1 - float(normalized_cost[best]))
+        return self.score
@@ -0,0 +1,278 @@
+import queue
+import threading
+from collections import namedtuple
+import cv2
+import numpy as np
+from mediapipe.framework.formats import landmark_pb2
+from pose_angles import calculate_relative_angles
+from pose_preprocess import FramePreprocessor
+
+# stands in for Pose.process results on frames whose landmarks were interpolated
+InterpolatedResults = namedtuple("InterpolatedResults", ["pose_landmarks"])
+# ... and on frames outside the extracted frame ranges
+SkippedResults = namedtuple("SkippedResults", ["pose_landmarks"])
+SKIPPED_RESULTS = SkippedResults(None)
+
+# landmarks whose motion sets the key frame spacing: shoulders down (11-32), not the face
+MOTION_LANDMARKS = slice(11, 33)
+
+
+def process_frame(frame, pose, frame_count, timestamp, preprocessor=None):
+    # pose reads an RGB copy; the BGR frame is returned untouched, ready to draw on
+    if preprocessor is None:
+        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        frame_rgb.flags.writeable = False
+        results = pose.process(frame_rgb)
+    else:
+        # RGB (cropped / downscaled) image in the preprocessor's reused buffers;
+        # landmarks come back in full-frame coordinates
+        results = pose.process(preprocessor.prepare(frame))
+        preprocessor.restore(results.pose_landmarks)
+
+    return frame, results
+
+def extract_landmark_data(pose_landmarks, previous_landmarks):
+    if pose_landmarks:
+        current_landmarks = []
+        for i, landmark in enumerate(pose_landmarks.landmark):
+            if landmark.x == 0 and landmark.y == 0 and previous_landmarks is not None:
+                current_landmarks.append(previous_landmarks[i])
+            else:
+                current_landmarks.append(landmark)
+        return current_landmarks
+    return None
+
+def _video_frames(vid):
+    while True:
+        ret, frame = vid.read()
+        if not ret:
+            return
+        yield frame, vid.get(cv2.CAP_PROP_POS_MSEC)
+
+def _range_frames(vid, first_frame, frame_ranges):
+    frame_count = first_frame
+    for range_first, range_last in frame_ranges:
+        # outside the ranges: grab() moves past the frame without converting it to an image
+        while frame_count < range_first:
+            if not vid.grab():
+                return
+            yield frame_count, None, vid.get(cv2.CAP_PROP_POS_MSEC)
+            frame_count += 1
+        while range_last is None or frame_count < range_last:
+            ret, frame = vid.read()
+            if not ret:
+                return
+            yield frame_count, frame, vid.get(cv2.CAP_PROP_POS_MSEC)
+            frame_count += 1
+
+def _decode_frames(source, frames, stop):
+    # decoder thread: reads ahead into the bounded queue, None marks the end of the video
+    try:
+        for item in source:
+            if stop.is_set():
+                break
+            while not stop.is_set():
+                try:
+                    frames.put(item, timeout=0.1)
+                    break
+                except queue.Full:
+                    pass
+    finally:
+        while not stop.is_set():
+            try:
+                frames.put(None, timeout=0.1)
+                break
+            except queue.Full:
+                pass
+
+def _read_ahead(source, read_ahead):
+    if read_ahead <= 0:
+        yield from source
+        return
+
+    frames = queue.Queue(read_ahead)
+    stop = threading.Event()
+    decoder = threading.Thread(target=_decode_frames, args=(source, frames, stop), daemon=True)
+    decoder.start()
+    try:
+        while True:
+            item = frames.get()
+            if item is None:
+                return
+            yield item
+    finally:
+        stop.set()
+        decoder.join()
+
+def read_frames(vid, read_ahead=0):
+    """
+    Yields (frame, timestamp) for every frame left in vid. With read_ahead > 0 a
+    decoder thread keeps up to that many frames decoded ahead of the caller, so
+    video decoding overlaps with whatever the caller does per frame.
+    """
+    yield from _read_ahead(_video_frames(vid), read_ahead)
+
+def read_frame_ranges(vid, frame_ranges, first_frame=0, read_ahead=0):
+    """
+    Yields (frame_count, frame, timestamp) for the frames left in vid, numbered
+    from first_frame, up to the end of the last of frame_ranges (sorted, disjoint
+    [first, last) frame numbers; last None = to the end of the video). Frames
+    before or between the ranges are only grab()bed and come with frame None.
+    read_ahead as in read_frames.
+    """
+    yield from _read_ahead(_range_frames(vid, first_frame, frame_ranges), read_ahead)
+
+def _numbered_frames(vid, first_frame, read_ahead, frame_ranges):
+    if frame_ranges is not None:
+        return read_frame_ranges(vid, frame_ranges, first_frame, read_ahead)
+    return ((frame_count, frame, timestamp) for frame_count, (frame, timestamp) in enumerate(read_frames(vid, read_ahead), first_frame))
+
+def iter_pose_frames(vid, pose, preprocessor=None, first_frame=0, read_ahead=0, max_skip=1, max_motion=0.01, frame_ranges=None):
+    """
+    Single pass over a video: decode, run pose once, and fill landmarks that
+    came back as (0, 0) from the previous detected frame.
+
+    Yields (frame_count, timestamp, frame, results, current_landmarks) where
+    current_landmarks is None when no pose was detected in the frame.
+    An optional FramePreprocessor crops / downscales what pose sees; without
+    one, a plain preprocessor still reuses its RGB buffer across frames.
+    first_frame numbers the frames of a capture already positioned past the start.
+    read_ahead > 0 decodes frames on a separate thread (see read_frames).
+    max_skip > 1 runs pose only on key frames and interpolates the frames
+    between them (see iter_interpolated_pose_frames).
+    With frame_ranges (see read_frame_ranges) pose only runs inside the ranges;
+    the frames outside them are still yielded, in order, as (frame_count,
+    timestamp, None, SKIPPED_RESULTS, None): like frames without a pose.
+    """
+    if max_skip > 1:
+        yield from iter_interpolated_pose_frames(vid, pose, preprocessor, first_frame, read_ahead, max_skip, max_motion, frame_ranges)
+        return
+
+    previous_landmarks = None
+    if preprocessor is None:
+        preprocessor = FramePreprocessor()
+
+    for frame_count, frame, timestamp in _numbered_frames(vid, first_frame, read_ahead, frame_ranges):
+        if frame is None:
+            yield frame_count, timestamp, None, SKIPPED_RESULTS, None
+            continue
+        frame, results = process_frame(frame, pose, frame_count, timestamp, preprocessor)
+
+        current_landmarks = extract_landmark_data(results.pose_landmarks, previous_landmarks)
+        if current_landmarks:
+            previous_landmarks = current_landmarks
+
+        yield frame_count, timestamp, frame, results, current_landmarks
+
+def _landmark_array(landmarks):
+    return np.array([(landmark.x, landmark.y, landmark.z, landmark.visibility) for landmark in landmarks], dtype=np.float64)
+
+def _landmark_list(landmark_array):
+    """NormalizedLandmarkList of a (33, 4) x, y, z, visibility array, as Pose.process gives pose_landmarks."""
+    return landmark_pb2.NormalizedLandmarkList(landmark=[
+        landmark_pb2.NormalizedLandmark(x=x, y=y, z=z, visibility=visibility) for x, y, z, visibility in landmark_array.tolist()])
+
+def next_key_step(previous_key, key, frames_apart, max_skip, max_motion):
+    """
+    Frames until the next key frame: as many as keep every body landmark within
+    max_motion (normalized image units) of the last key frame at the speed measured
+    between the last two, between 1 and max_skip. 1 whenever either had no pose.
+    """
+    if previous_key is None or key is None:
+        return 1
+    speed = np.abs(key[MOTION_LANDMARKS, :2] - previous_key[MOTION_LANDMARKS, :2]).max() / frames_apart
+    if speed * max_skip <= max_motion:
+        return max_skip
+    return int(min(max(max_motion / speed, 1), max_skip))
+
+def iter_interpolated_pose_frames(vid, pose, preprocessor=None, first_frame=0, read_ahead=0, max_skip=4, max_motion=0.01, frame_ranges=None):
+    """
+    iter_pose_frames with pose run only on key frames, at most max_skip frames
+    apart. The frames between two key frames get landmarks linearly interpolated
+    between them (after the (0, 0) fill), or, when either key frame has no pose,
+    those of the nearer key frame. The spacing adapts after every key frame (see
+    next_key_step): fast movement brings it down to every frame, slow steady
+    movement spreads it out to max_skip. The last frame, and the last frame of
+    each of frame_ranges, is always a key frame.
+
+    Every frame is still decoded and yielded in order, a few frames late. Frames
+    that were interpolated come with an InterpolatedResults instead of Pose results.
+    """
+    previous_landmarks = None
+    if preprocessor is None:
+        preprocessor = FramePreprocessor()
+
+    # key frame landmarks ((33, 4) array, None without a pose) and number
+    previous_key = None
+    previous_key_frame = None
+    step = 1
+    # (frame_count, timestamp, frame) decoded since the last key frame
+    pending = []
+
+    def infer_key_frame(key_frame, key_frame_count, key_timestamp):
+        nonlocal previous_landmarks, previous_key, previous_key_frame, step
+        key_frame, results = process_frame(key_frame, pose, key_frame_count, key_timestamp, preprocessor)
+        key_landmarks = extract_landmark_data(results.pose_landmarks, previous_landmarks)
+        key = _landmark_array(key_landmarks) if key_landmarks else None
+
+        for i, (frame_count_between, timestamp_between, frame_between) in enumerate(pending, 1):
+            fraction = i / (len(pending) + 1)
+            if previous_key is not None and key is not None:
+                landmarks = _landmark_list(previous_key + (key - previous_key) * fraction)
+            else:
+                nearer = previous_key if fraction < 0.5 else key
+                landmarks = _landmark_list(nearer) if nearer is not None else None
+            current_landmarks = extract_landmark_data(landmarks, previous_landmarks)
+            if current_landmarks:
+                previous_landmarks = current_landmarks
+            yield frame_count_between, timestamp_between, frame_between, InterpolatedResults(landmarks), current_landmarks
+        pending.clear()
+
+        if key_landmarks:
+            previous_landmarks = key_landmarks
+        if previous_key_frame is not None:
+            step = next_key_step(previous_key, key, key_frame_count - previous_key_frame, max_skip, max_motion)
+        previous_key, previous_key_frame = key, key_frame_count
+        yield key_frame_count, key_timestamp, key_frame, results, key_landmarks
+
+    def flush():
+        if pending:
+            last_frame_count, last_timestamp, last_frame = pending.pop()
+            yield from infer_key_frame(last_frame, last_frame_count, last_timestamp)
+
+    for frame_count, frame, timestamp in _numbered_frames(vid, first_frame, read_ahead, frame_ranges):
+        if frame is None:
+            # outside frame_ranges: nothing to interpolate across, start over after it
+            yield from flush()
+            previous_key = previous_key_frame = None
+            step = 1
+            yield frame_count, timestamp, None, SKIPPED_RESULTS, None
+        elif previous_key_frame is not None and frame_count - previous_key_frame < step:
+            pending.append((frame_count, timestamp, frame))
+        else:
+            yield from infer_key_frame(frame, frame_count, timestamp)
+
+    yield from flush()
+
+def relative_angle_csv_row(frame_count, timestamp, current_landmarks):
+    # frames without a detected pose are written as zeros
+    row = [frame_count, timestamp]
+    if current_landmarks:
+        row.extend(calculate_relative_angles(current_landmarks))
+    else:
+        row.extend([0.0] * 8)
+    return row
+
+def relative_angle_json_frame(frame_count, timestamp, current_landmarks, previous_landmarks):
+    # same frame record pose_extAnno_Json.py writes: frames without a detected pose
+    # repeat the last detected pose, or 10 zeros (R0-R9) before any pose was seen
+    json_data = {
+        "frame_number": frame_count,
+        "timestamp": timestamp
+    }
+    landmarks = current_landmarks or previous_landmarks
+    if landmarks:
+        json_data["relative_angles"] = {f"R{i}": angle for i, angle in enumerate(calculate_relative_angles(landmarks))}
+    else:
+        json_data["relative_angles"] = {f"R{i}": 0.0 for i in range(10)}
+    return json_data
@@ -0,0 +1,108 @@
+import cv2
+import numpy as np
+
+def downscale_frame(frame, max_side, dst=None):
+    """
+    Shrink frame so its longer side is at most max_side pixels; smaller frames are returned as is.
+    dst is reused for the result when it already has the right shape.
+    """
+    height, width = frame.shape[:2]
+    if max_side is None or max(height, width) <= max_side:
+        return frame
+    scale = max_side / max(height, width)
+    size = (round(width * scale), round(height * scale))
+    if dst is None or dst.shape[:2] != (size[1], size[0]) or dst.shape[2:] != frame.shape[2:]:
+        dst = np.empty((size[1], size[0]) + frame.shape[2:], frame.dtype)
+    return cv2.resize(frame, size, dst=dst, interpolation=cv2.INTER_AREA)
+
+
+class FramePreprocessor:
+    """
+    Shrinks the image MediaPipe Pose sees, for one video or one player.
+
+    With roi_margin set, each frame is cropped to the bounding box of the previous
+    frame's landmarks, grown by roi_margin times the box's longer side on every
+    edge; the full frame is used again whenever no pose was found. The (cropped)
+    image is then downscaled so its longer side is at most max_side pixels.
+    With neither set the frame is only converted to RGB.
+
+    prepare() gives the read-only RGB image to run inference on. It is written
+    into buffers kept between frames, so it is only valid until the next call,
+    and the BGR frame itself is never modified. restore() maps the landmarks
+    found in it back to normalized coordinates of the full frame, in place, so
+    angles, drawing and the next crop all work as if the full frame had been used.
+    """
+
+    # crops smaller than this (pixels) are not trusted and the full frame is used instead
+    min_roi_side = 32
+
+    def __init__(self, max_side=None, roi_margin=None):
+        self.max_side = max_side
+        self.roi_margin = roi_margin
+        self.roi = None
+        self.crop = None
+        self.frame_size = None
+        self.resized = None
+        self.rgb = None
+
+    def reset(self):
+        self.roi = None
+
+    def prepare(self, frame):
+        height, width = frame.shape[:2]
+        if self.frame_size != (width, height):
+            self.frame_size = (width, height)
+            self.roi = None
+        self.crop = self.roi
+        if self.crop is not None:
+            x0, y0, x1, y1 = self.crop
+            frame = frame[y0:y1, x0:x1]
+        resized = downscale_frame(frame, self.max_side, self.resized)
+        if resized is not frame:
+            self.resized = resized
+        return self._to_rgb(resized)
+
+    def _to_rgb(self, frame):
+        # one conversion, straight into the buffer MediaPipe reads from
+        if self.rgb is None or self.rgb.shape != frame.shape:
+            self.rgb = np.empty(frame.shape, frame.dtype)
+        else:
+            self.rgb.flags.writeable = True
+        cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=self.rgb)
+        self.rgb.flags.writeable = False
+        return self.rgb
+
+    def restore(self, pose_landmarks):
+        if not pose_landmarks:
+            # tracking lost: look at the whole frame next time
+            self.roi = None
+            return
+        width, height = self.frame_size
+        if self.crop is not None:
+            x0, y0, x1, y1 = self.crop
+            crop_width = x1 - x0
+            crop_height = y1 - y0
+            for landmark in pose_landmarks.landmark:
+                # (0, 0) marks a missing landmark for extract_landmark_data; keep it that way
+                if landmark.x == 0 and landmark.y == 0:
+                    continue
+                landmark.x = (x0 + landmark.x * crop_width) / width
+                landmark.y = (y0 + landmark.y * crop_height) / height
+                landmark.z = landmark.z * crop_width / width
+        if self.roi_margin is not None:
+            self.roi = self._landmark_roi(pose_landmarks)
+
+    def _landmark_roi(self, pose_landmarks):
+        width, height = self.frame_size
+        xs = [min(max(landmark.x, 0.0), 1.0) * width for landmark in pose_landmarks.landmark]
+        ys = [min(max(landmark.y, 0.0), 1.0) * height for landmark in pose_landmarks.landmark]
+        margin = self.roi_margin * max(max(xs) - min(xs), max(ys) - min(ys))
+        x0 = max(int(min(xs) - margin), 0)
+        y0 = max(int(min(ys) - margin), 0)
+        x1 = min(int(max(xs) + margin) + 1, width)
+        y1 = min(int(max(ys) + margin) + 1, height)
+        if x1 - x0 < self.min_roi_side or y1 - y0 < self.min_roi_side:
+            return None
+        if (x0, y0, x1, y1) == (0, 0, width, height):
+            return None
+        return x0, y0, x1, y1
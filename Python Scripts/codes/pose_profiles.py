@@ -0,0 +1,48 @@
+from collections import namedtuple
+import mediapipe as mp
+
+# Named MediaPipe Pose settings the servers and benchmarks can pick by name.
+# input_max_side downscales frames so their longer side is at most this many
+# pixels before inference (None keeps the size the client sent). Landmarks are
+# normalized to the image, so downscaling does not change their coordinate space.
+PoseProfile = namedtuple("PoseProfile", [
+    "model_complexity",
+    "enable_segmentation",
+    "smooth_segmentation",
+    "static_image_mode",
+    "smooth_landmarks",
+    "input_max_side"
+])
+
+POSE_PROFILES = {
+    # what socket_server_frame.py used to run: every frame detected from scratch
+    "legacy_frame": PoseProfile(1, True, True, True, True, None),
+    # what socket_server_DTW.py used to run
+    "legacy_dtw": PoseProfile(1, True, True, False, True, None),
+    # no segmentation mask (nothing reads it)
+    "static": PoseProfile(1, False, False, True, True, None),
+    # ... and tracking between frames
+    "tracking": PoseProfile(1, False, False, False, True, None),
+    "tracking_480": PoseProfile(1, False, False, False, True, 480),
+    "lite": PoseProfile(0, False, False, False, True, None),
+    "lite_320": PoseProfile(0, False, False, False, True, 320),
+    # the offline extractors' model; its weights are downloaded on first use
+    "heavy": PoseProfile(2, False, False, False, True, None),
+}
+
+def get_pose_profile(name):
+    try:
+        return POSE_PROFILES[name]
+    except KeyError:
+        raise ValueError(f"unknown pose profile {name}, expected one of {', '.join(POSE_PROFILES)}") from None
+
+def create_profile_pose(name):
+    profile = get_pose_profile(name)
+    return mp.solutions.pose.Pose(
+        static_image_mode=profile.static_image_mode,
+        min_detection_confidence=0.8,
+        min_tracking_confidence=0.8,
+        model_complexity=profile.model_complexity,
+        enable_segmentation=profile.enable_segmentation,
+        smooth_segmentation=profile.smooth_segmentation,
+        smooth_landmarks=profile.smooth_landmarks)
@@ -0,0 +1,270 @@
+import csv
+import glob
+import json
+import os
+import struct
+import sys
+from collections import OrderedDict, namedtuple
+import numpy as np
+
+# Binary reference pose format (.pose)
+#
+#   8 bytes   magic b"DGPOSE\x00\x01"
+#   4 bytes   little-endian uint32 length of the JSON header
+#   n bytes   UTF-8 JSON header, space padded so the data starts on a 64-byte boundary
+#   rest      float32 array of shape (frame_count, feature_count), C order
+#
+# The header carries the song name, fps, frame_offset (frame_number of row 0),
+# timestamp_offset (ms of row 0), the column names and the source file name.
+# load_reference_angles indexes rows by frame number, so a file that starts
+# after frame 0 gets zero rows (no pose) in front.
+
+POSE_MAGIC = b"DGPOSE\x00\x01"
+POSE_EXTENSION = ".pose"
+FORMAT_VERSION = 1
+DATA_ALIGNMENT = 64
+FEATURE_COLUMNS = [f"R{i}" for i in range(8)]
+
+
+def read_reference_json(json_file_path):
+    with open(json_file_path, 'r') as file:
+        data = json.load(file)
+
+    # frames written before a pose was ever detected hold 10 zero angles (R0-R9), keep R0-R7
+    angles = np.array([[frame_data['relative_angles'][column] for column in FEATURE_COLUMNS] for frame_data in data], dtype=np.float64)
+    frame_numbers = [frame_data['frame_number'] for frame_data in data]
+    timestamps = [frame_data['timestamp'] for frame_data in data]
+    return angles, frame_numbers, timestamps
+
+def read_reference_csv(csv_file_path):
+    angles = []
+    frame_numbers = []
+    timestamps = []
+    with open(csv_file_path, 'r') as csvfile:
+        csv_reader = csv.reader(csvfile)
+        next(csv_reader)
+        for row in csv_reader:
+            frame_numbers.append(int(row[0]))
+            timestamps.append(float(row[1]))
+            angles.append([float(value) for value in row[2:2 + len(FEATURE_COLUMNS)]])
+    return np.array(angles, dtype=np.float64).reshape(-1, len(FEATURE_COLUMNS)), frame_numbers, timestamps
+
+def estimate_fps(timestamps):
+    if len(timestamps) < 2 or timestamps[-1] <= timestamps[0]:
+        return 0.0
+    return 1000.0 * (len(timestamps) - 1) / (timestamps[-1] - timestamps[0])
+
+def write_pose_file(output_path, angles, song="", fps=0.0, frame_offset=0, timestamp_offset=0.0, source=""):
+    angles = np.ascontiguousarray(angles, dtype=np.float32)
+    header = {
+        "version": FORMAT_VERSION,
+        "song": song,
+        "fps": fps,
+        "frame_count": int(angles.shape[0]),
+        "feature_count": int(angles.shape[1]),
+        "frame_offset": int(frame_offset),
+        "timestamp_offset": float(timestamp_offset),
+        "columns": FEATURE_COLUMNS[:angles.shape[1]],
+        "source": source
+    }
+    header_bytes = json.dumps(header).encode('utf-8')
+    prefix_size = len(POSE_MAGIC) + 4
+    padding = -(prefix_size + len(header_bytes)) % DATA_ALIGNMENT
+    header_bytes += b" " * padding
+
+    with open(output_path, 'wb') as file:
+        file.write(POSE_MAGIC)
+        file.write(struct.pack("<I", len(header_bytes)))
+        file.write(header_bytes)
+        file.write(angles.tobytes())
+    return output_path
+
+def read_pose_header(pose_file_path):
+    """Returns (header dict, byte offset of the angle data)."""
+    with open(pose_file_path, 'rb') as file:
+        magic = file.read(len(POSE_MAGIC))
+        if magic != POSE_MAGIC:
+            raise ValueError(f"{pose_file_path} is not a .pose reference file")
+        (header_size,) = struct.unpack("<I", file.read(4))
+        header = json.loads(file.read(header_size).decode('utf-8'))
+    return header, len(POSE_MAGIC) + 4 + header_size
+
+def load_pose_file(pose_file_path):
+    """Memory-map a .pose file. Returns (header, read-only float32 array of shape (frames, features))."""
+    header, data_offset = read_pose_header(pose_file_path)
+    shape = (header["frame_count"], header["feature_count"])
+    if header["frame_count"] == 0:
+        return header, np.zeros(shape, dtype=np.float32)
+    angles = np.memmap(pose_file_path, dtype=np.float32, mode='r', offset=data_offset, shape=shape)
+    return header, angles
+
+def _from_frame_zero(angles, first_frame):
+    # the servers look reference rows up by frame number
+    if first_frame <= 0:
+        return angles
+    return np.concatenate([np.zeros((first_frame, angles.shape[1]), dtype=angles.dtype), angles])
+
+def load_reference_angles(reference_file_path):
+    """
+    Load the (frames, 8) reference angle array from a .pose, .json or .csv file,
+    row i holding frame i (see _from_frame_zero). A .pose file starting at frame 0
+    stays memory-mapped.
+    """
+    extension = os.path.splitext(reference_file_path)[1].lower()
+    if extension == POSE_EXTENSION:
+        header, angles = load_pose_file(reference_file_path)
+        return _from_frame_zero(angles, header["frame_offset"])
+    if extension == ".csv":
+        angles, frame_numbers, _ = read_reference_csv(reference_file_path)
+    else:
+        angles, frame_numbers, _ = read_reference_json(reference_file_path)
+    return _from_frame_zero(angles, frame_numbers[0] if frame_numbers else 0)
+
+def find_reference_file(pose_dir, song_name):
+    """
+    Prefer the binary reference next to the JSON one, unless the JSON is newer
+    (re-exported since the .pose was converted); fall back to the JSON file.
+    """
+    pose_file_path = os.path.join(pose_dir, song_name + POSE_EXTENSION)
+    json_file_path = os.path.join(pose_dir, song_name + ".json")
+    if os.path.exists(pose_file_path) and (not os.path.exists(json_file_path)
+                                           or os.path.getmtime(pose_file_path) >= os.path.getmtime(json_file_path)):
+        return pose_file_path
+    return json_file_path
+
+CachedReference = namedtuple('CachedReference', ['path', 'angles', 'normalized_angles', 'nbytes'])
+
+class ReferenceCache:
+    """
+    In-process LRU cache of loaded reference songs.
+
+    Entries are keyed by (app_path, song_name, mtime of the reference file), so an
+    edited file is picked up on the next selection. Each entry holds the raw angle
+    array and the angles already normalized by pi, as the DTW server uses them.
+    """
+
+    def __init__(self, max_entries=8, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, app_path, song_name):
+        reference_file_path = find_reference_file(app_path + "/PoseFiles/", song_name)
+        key = (app_path, song_name, os.path.getmtime(reference_file_path))
+
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+        self.misses += 1
+        angles = load_reference_angles(reference_file_path)
+        normalized_angles = np.asarray(angles, dtype=np.float64) / np.pi
+        # entries are shared by every session playing the song, so nobody may modify them
+        angles.flags.writeable = False
+        normalized_angles.flags.writeable = False
+        entry = CachedReference(reference_file_path, angles, normalized_angles, angles.nbytes + normalized_angles.nbytes)
+
+        # an older version of the same song can never be hit again
+        for stale_key in [k for k in self.entries if k[:2] == key[:2]]:
+            self._remove(stale_key)
+        self.entries[key] = entry
+        self.total_bytes += entry.nbytes
+        self._evict()
+        return entry
+
+    def _remove(self, key):
+        entry = self.entries.pop(key)
+        self.total_bytes -= entry.nbytes
+
+    def _evict(self):
+        # always keep the entry that was just added, even if it alone is over max_bytes
+        while len(self.entries) > 1 and (len(self.entries) > self.max_entries or self.total_bytes > self.max_bytes):
+            self._remove(next(iter(self.entries)))
+            self.evictions += 1
+
+    def clear(self):
+        self.entries.clear()
+        self.total_bytes = 0
+
+    def stats(self):
+        return {
+            "entries": len(self.entries),
+            "bytes": self.total_bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions
+        }
+
+# Reference frames the servers can compare a sent frame with: socket_server_frame.py's
+# match window is [frame - 12, frame + 4) and socket_server_DTW.py's band is 15 each side.
+SCORED_FRAMES_BEFORE = 15
+SCORED_FRAMES_AFTER = 15
+
+def load_song_data(song_data_path):
+    """
+    Read Unity's song data JSON ({codename: {Song_name, Artist, Start_frame, End_frame}},
+    SongManager's jsonSongData) into {codename: song}, with field names lower-cased
+    since Json.NET matches them case-insensitively.
+    """
+    with open(song_data_path, 'r', encoding='utf-8') as file:
+        data = json.load(file)
+    return {codename: {key.lower(): value for key, value in song.items()} for codename, song in data.items()}
+
+def scored_frame_range(song, frames_before=SCORED_FRAMES_BEFORE, frames_after=SCORED_FRAMES_AFTER, warmup_frames=0):
+    """
+    [first, last) reference frames a song is ever scored against: gameplay sends
+    frames start_frame..end_frame (GameplaySceneController.SendFramesPeriodically)
+    and the servers look up to frames_before / frames_after around each. It starts
+    warmup_frames earlier so pose tracking has settled by the first scored frame.
+    """
+    first = max(song["start_frame"] - frames_before - warmup_frames, 0)
+    return first, song["end_frame"] + frames_after + 1
+
+def convert_reference(input_path, output_path=None, song=None):
+    """Convert a results/poses JSON or CSV file into the binary .pose format."""
+    base_path, extension = os.path.splitext(input_path)
+    if extension.lower() == ".csv":
+        angles, frame_numbers, timestamps = read_reference_csv(input_path)
+    else:
+        angles, frame_numbers, timestamps = read_reference_json(input_path)
+
+    if output_path is None:
+        output_path = base_path + POSE_EXTENSION
+    if song is None:
+        song = os.path.basename(base_path)
+
+    return write_pose_file(
+        output_path,
+        angles,
+        song=song,
+        fps=estimate_fps(timestamps),
+        frame_offset=frame_numbers[0] if frame_numbers else 0,
+        timestamp_offset=timestamps[0] if timestamps else 0.0,
+        source=os.path.basename(input_path)
+    )
+
+def main():
+    # usage: python pose_reference.py [file or glob ...]  (default: every reference in results/poses)
+    input_patterns = sys.argv[1:] or ["Python Scripts/results/poses/*.json", "Python Scripts/results/poses/*.csv"]
+    converted = set()
+    for pattern in input_patterns:
+        for input_path in sorted(glob.glob(pattern)):
+            output_path = os.path.splitext(input_path)[0] + POSE_EXTENSION
+            if output_path in converted:
+                # a song with both .json and .csv keeps the one converted first
+                print(f"skipping {input_path}, {output_path} already written")
+                continue
+            convert_reference(input_path, output_path)
+            converted.add(output_path)
+            print(f"{input_path} -> {output_path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+import argparse
+import os
+import time
+import cv2
+import numpy as np
+from pose_angles import calculate_relative_angles
+from pose_extract_batch import VIDEO_EXTENSIONS
+from pose_pipeline import iter_pose_frames
+from pose_preprocess import FramePreprocessor
+from pose_profiles import create_profile_pose
+from pose_reference import FEATURE_COLUMNS, load_reference_angles
+from pose_scoring import read_player_angles, read_ref_poses_csv, score_pose_sequence, write_scores
+
+# Headless scoring: the same per-frame correctness and 'frame' / 'average' / 'mode'
+# feedback tallies pose_compareVIds_csv.py shows in its overlay, without drawing or
+# writing video. Players are videos (run through pose first) or pose files already
+# extracted with pose_extAnno_csv.py / pose_extract_batch.py (.csv, .json or .pose),
+# which are scored directly. Scores go to {output_dir}/{player}_scores.{format}.
+#
+#   python "Python Scripts/codes/pose_score.py" "Python Scripts/results/poses/wholeGarden_tabletCUT_legacy_edit.csv" \
+#       --reference "Python Scripts/results/poses/wholeGarden_webcamCUT_legacy_edit.csv"
+
+def read_reference(reference_path):
+    if reference_path.lower().endswith(".csv"):
+        return np.array(read_ref_poses_csv(reference_path), dtype=np.float64)
+    return np.asarray(load_reference_angles(reference_path), dtype=np.float64)
+
+def read_video_angles(video_path, pose, input_max_side=None, roi_margin=None):
+    """Run pose over a video, returning what read_player_angles returns for a pose file."""
+    player_angles = []
+    has_pose = []
+    frame_numbers = []
+    timestamps = []
+    vid = cv2.VideoCapture(video_path)
+    for frame_count, timestamp, frame, results, current_landmarks in iter_pose_frames(vid, pose, FramePreprocessor(input_max_side, roi_margin)):
+        player_angles.append(calculate_relative_angles(current_landmarks) if current_landmarks else [0.0] * len(FEATURE_COLUMNS))
+        has_pose.append(bool(current_landmarks))
+        frame_numbers.append(frame_count)
+        timestamps.append(timestamp)
+    vid.release()
+    return np.array(player_angles, dtype=np.float64).reshape(-1, len(FEATURE_COLUMNS)), np.array(has_pose, dtype=bool), frame_numbers, timestamps
+
+def main():
+    parser = argparse.ArgumentParser(description="Score player videos or pose files against a reference without rendering video.")
+    parser.add_argument("players", nargs="+", help="player videos or .csv / .json / .pose files")
+    parser.add_argument("--reference", required=True, help="reference .csv (as pose_compareVIds_csv.py reads it), .json or .pose")
+    parser.add_argument("--output-dir", default="Python Scripts/results/scores")
+    parser.add_argument("--format", choices=["json", "csv"], default="json")
+    parser.add_argument("--profile", default="heavy", help="pose profile from pose_profiles.py, for video players")
+    parser.add_argument("--input-max-side", type=int, default=None)
+    parser.add_argument("--roi-margin", type=float, default=None)
+    args = parser.parse_args()
+
+    ref_relative_angles_data = read_reference(args.reference)
+    os.makedirs(args.output_dir, exist_ok=True)
+    pose = None
+    for player_path in args.players:
+        start = time.perf_counter()
+        if player_path.lower().endswith(VIDEO_EXTENSIONS):
+            if pose is None:
+                pose = create_profile_pose(args.profile)
+            # every video starts from a fresh tracking state, as a separate run would
+            pose.reset()
+            player_angles, has_pose, frame_numbers, timestamps = read_video_angles(player_path, pose, args.input_max_side, args.roi_margin)
+        else:
+            player_angles, has_pose, frame_numbers, timestamps = read_player_angles(player_path)
+        records, total_feedbacks = score_pose_sequence(player_angles, has_pose, frame_numbers, timestamps, ref_relative_angles_data)
+
+        output_path = os.path.join(args.output_dir, os.path.splitext(os.path.basename(player_path))[0] + "_scores." + args.format)
+        write_scores(output_path, records, total_feedbacks, player_path, args.reference)
+        print(f"{player_path}: {len(records)} frames in {time.perf_counter() - start:.2f} s -> {output_path}")
+        for kind, counts in total_feedbacks.items():
+            print(f"  {kind:<8} " + "  ".join(f"{name}: {count}" for name, count in counts.items()))
+    if pose is not None:
+        pose.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+import csv
+import json
+import os
+from collections import namedtuple
+from statistics import mode
+import numpy as np
+from pose_reference import POSE_EXTENSION, load_pose_file, read_reference_csv, read_reference_json
+
+# Feedback scoring shared by pose_compareVIds_csv.py and pose_score.py: per-frame
+# correctness against a reference, feedback averaged over 30-frame windows, and
+# the most common frame feedback of each window.
+
+FEEDBACK_NAMES = ['perfect', 'cool', 'passable', 'not good enough']
+FEEDBACK_WINDOW = 30
+
+def get_feedback_scores(correctness_percentage):
+    if correctness_percentage >= 80: return "perfect"
+    elif correctness_percentage >= 60: return "cool"
+    elif correctness_percentage >= 40: return "passable"
+    return "not good enough"
+
+def get_correctness_percentage(correctness):
+    return correctness * 100
+
+def compare_values(current_values, ref_values):
+    if sum(ref_values) == 0:
+        return None  # if there are no reference values at all.
+    comparison_result = []
+    for i in range(len(current_values)):
+        difference = abs(current_values[i] - ref_values[i])
+        comparison_result.append(difference)
+    if len(comparison_result) == 0:
+        print(ref_values)
+        return None
+    correctness = 1 - (sum(comparison_result) / len(comparison_result))
+    return correctness
+
+def read_ref_poses_csv(relative_angle_csv_path):
+    ref_relative_angles_data = []
+
+    with open(relative_angle_csv_path, 'r') as csvfile:
+        csv_reader = csv.reader(csvfile)
+        header = next(csv_reader)
+        for row in csv_reader:
+            ref_relative_angles_data.append([float(value) for value in row[2:]])  # Assuming first two columns are frame_number and timestamp
+
+    return ref_relative_angles_data
+
+def get_mode_feedback(feedback_list):
+    if len(feedback_list) == 0:
+        return "none"
+    try:
+        return mode(feedback_list)
+    except:
+        # Handle case where there are multiple modes by picking the first one
+        return feedback_list[0]
+
+def get_average_feedback(correctnessList):
+    if len(correctnessList) == 0:
+        return 0.0
+    return sum(correctnessList) / len(correctnessList)
+
+
+class FeedbackScorer:
+    """
+    Frame-by-frame scoring state of pose_compareVIds_csv.py. Call update() once per
+    frame, in order, with the frame's relative angles (None = no pose detected); the
+    attributes then hold what that frame's overlay shows.
+    """
+    def __init__(self, ref_relative_angles_data, comparison_type='RelativeAngles'):
+        self.ref_relative_angles_data = ref_relative_angles_data
+        self.comparison_type = comparison_type
+        self.value_count = 8 if comparison_type == 'RelativeAngles' else 26
+        self.total_feedbacks = {name: dict.fromkeys(FEEDBACK_NAMES, 0) for name in ('frame', 'average', 'mode')}
+        self.feedbackList = []
+        self.correctnessList = []
+        self.mode_feedback = 'unclear'
+        self.average_feedback = 'unclear'
+        self.current_values = [0] * self.value_count
+        self.ref_values = [0] * self.value_count
+        self.correctness = None
+        self.frame_feedback = "none"
+
+    def update(self, frame_count, relative_angles_array):
+        if relative_angles_array is not None:
+            if frame_count < len(self.ref_relative_angles_data):
+                if self.comparison_type == 'RelativeAngles':
+                    self.current_values = relative_angles_array
+                    self.ref_values = self.ref_relative_angles_data[frame_count]
+
+                if(self.ref_values is not None):
+                    self.correctness = compare_values(self.current_values, self.ref_values)
+                    if self.correctness is not None:
+                        correctness_percentage = get_correctness_percentage(self.correctness)
+                        self.correctnessList.append(correctness_percentage)
+                        # calculate average feedback
+                        if(frame_count % FEEDBACK_WINDOW == 0):
+                            average_feedback_percentage = get_average_feedback(self.correctnessList)
+                            self.average_feedback = get_feedback_scores(average_feedback_percentage)
+                            self.correctnessList.clear()
+                            self.total_feedbacks['average'][self.average_feedback] += 1
+                        self.frame_feedback = get_feedback_scores(correctness_percentage)
+                        self.total_feedbacks['frame'][self.frame_feedback] += 1
+                    else:
+                        self.frame_feedback = "none"
+            else:
+                print(f"No comparison data available for frame #{frame_count}")
+                self.frame_feedback = "none"
+                self.correctness = None
+                self.ref_values = [0] * self.value_count
+
+        else:
+            self.frame_feedback = "none"
+            self.correctness = None
+            self.ref_values = [0] * self.value_count
+            self.current_values = [0] * self.value_count
+
+        # calculate mode feedback
+        if(self.frame_feedback != "none"):
+            self.feedbackList.append(self.frame_feedback)
+        if((frame_count) % FEEDBACK_WINDOW == 0):
+            self.mode_feedback = get_mode_feedback(self.feedbackList)
+            self.feedbackList.clear()
+            # a window without any frame feedback is tallied as "none"
+            self.total_feedbacks['mode'][self.mode_feedback] = self.total_feedbacks['mode'].get(self.mode_feedback, 0) + 1
+
+    def frame_record(self, frame_count, timestamp):
+        return {
+            "frame_number": frame_count,
+            "timestamp": timestamp,
+            "correctness": None if self.correctness is None else float(self.correctness),
+            "feedback": self.frame_feedback,
+            "average_feedback": self.average_feedback,
+            "mode_feedback": self.mode_feedback
+        }
+
+
+def read_player_angles(player_file_path):
+    """
+    Load a player's extracted angles from a .csv, .json or .pose file as
+    (float64 angles, has_pose, frame numbers, timestamps). Frames whose angles are
+    all zero are taken as frames without a detected pose, which is how the CSV
+    extractor writes them (the JSON one repeats the last pose instead).
+    """
+    extension = os.path.splitext(player_file_path)[1].lower()
+    if extension == POSE_EXTENSION:
+        header, angles = load_pose_file(player_file_path)
+        frame_numbers = [header["frame_offset"] + i for i in range(len(angles))]
+        frame_time = 1000.0 / header["fps"] if header["fps"] else 0.0
+        timestamps = [header["timestamp_offset"] + i * frame_time for i in range(len(angles))]
+        angles = np.asarray(angles, dtype=np.float64)
+    elif extension == ".csv":
+        angles, frame_numbers, timestamps = read_reference_csv(player_file_path)
+    else:
+        angles, frame_numbers, timestamps = read_reference_json(player_file_path)
+    return angles, angles.any(axis=1), frame_numbers, timestamps
+
+
+# Whole-sequence scoring. Feedback is carried as codes: an index into FEEDBACK_LABELS.
+FEEDBACK_LABELS = FEEDBACK_NAMES + ['none', 'unclear']
+NO_FEEDBACK = FEEDBACK_LABELS.index('none')
+UNCLEAR_FEEDBACK = FEEDBACK_LABELS.index('unclear')
+
+SequenceScores = namedtuple("SequenceScores", [
+    "scored",            # (N,) bool, frames that got a correctness (compare_values did not return None)
+    "correctness",       # (N,) float64, NaN where not scored
+    "frame_feedback",    # (N,) feedback code of each frame, NO_FEEDBACK where not scored
+    "average_feedback",  # (N,) average feedback code shown at each frame, UNCLEAR_FEEDBACK before the first
+    "mode_feedback",     # (N,) mode feedback code shown at each frame, UNCLEAR_FEEDBACK before the first
+    "total_feedbacks"    # the 'frame' / 'average' / 'mode' tallies, as FeedbackScorer keeps them
+])
+
+def _sequential_row_sum(values):
+    # left to right like the builtin sum(); np.sum adds pairwise and can round differently
+    total = np.zeros(len(values))
+    for column in range(values.shape[1]):
+        total = total + values[:, column]
+    return total
+
+def _segment_sums(values, segments, segment_count):
+    """Builtin-sum() of values grouped by their (non-decreasing) segment number."""
+    lengths = np.bincount(segments, minlength=segment_count)
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    total = np.zeros(segment_count)
+    for position in range(lengths.max() if segment_count else 0):
+        rows = np.nonzero(lengths > position)[0]
+        total[rows] = total[rows] + values[starts[rows] + position]
+    return total, lengths
+
+def feedback_codes(correctness_percentages):
+    """get_feedback_scores for a whole array (NaN falls through to 'not good enough' too)."""
+    percentages = np.asarray(correctness_percentages)
+    return np.select([percentages >= 80, percentages >= 60, percentages >= 40], [0, 1, 2], 3)
+
+def _windows(triggers):
+    # window number of every frame: how many trigger frames came before it, so a
+    # trigger frame closes the window it belongs to
+    return np.cumsum(triggers) - triggers, int(triggers.sum())
+
+def _forward_fill(triggers, window_codes):
+    shown = np.cumsum(triggers) - 1
+    return np.where(shown >= 0, np.append(window_codes, UNCLEAR_FEEDBACK)[shown], UNCLEAR_FEEDBACK)
+
+def score_sequence(player_angles, has_pose, frame_numbers, ref_angles):
+    """
+    FeedbackScorer.update over a whole sequence in array operations, with the same
+    results to the bit. player_angles (N, F) and has_pose (N,) per player frame,
+    frame_numbers index the (M, F+) reference rows.
+
+    - a frame is scored when it has a pose, a reference row and that row does not sum to 0
+    - the average feedback is taken at scored frames whose frame number is a multiple
+      of 30, over the scored frames since the previous one
+    - the mode feedback is taken at every frame number that is a multiple of 30, over
+      the frame feedbacks since the previous one; like statistics.mode, a tie goes to
+      the feedback seen first, and a window without feedback gives "none"
+    """
+    player_angles = np.asarray(player_angles, dtype=np.float64).reshape(len(has_pose), -1)
+    has_pose = np.asarray(has_pose, dtype=bool)
+    frame_numbers = np.asarray(frame_numbers, dtype=np.int64)
+    ref_angles = np.asarray(ref_angles, dtype=np.float64).reshape(len(ref_angles), -1)
+    frame_total, value_count = player_angles.shape
+
+    in_reference = has_pose & (frame_numbers < len(ref_angles))
+    ref_rows = ref_angles[np.where(in_reference, frame_numbers, 0)] if len(ref_angles) else np.zeros((frame_total, value_count))
+    scored = in_reference & (_sequential_row_sum(ref_rows) != 0)
+    with np.errstate(invalid='ignore'):
+        correctness = 1 - (_sequential_row_sum(np.abs(player_angles - ref_rows[:, :value_count])) / value_count)
+    correctness = np.where(scored, correctness, np.nan)
+    percentages = correctness * 100
+    frame_feedback = np.where(scored, feedback_codes(percentages), NO_FEEDBACK)
+
+    # average feedback windows close on scored frames only
+    average_triggers = scored & (frame_numbers % FEEDBACK_WINDOW == 0)
+    windows, window_count = _windows(average_triggers)
+    kept = scored & (windows < window_count)
+    totals, lengths = _segment_sums(percentages[kept], windows[kept], window_count)
+    average_codes = feedback_codes(totals / np.maximum(lengths, 1))
+
+    # mode feedback windows close on every multiple of 30
+    mode_triggers = frame_numbers % FEEDBACK_WINDOW == 0
+    windows, window_count = _windows(mode_triggers)
+    kept = scored & (windows < window_count)
+    codes = frame_feedback[kept]
+    counts = np.bincount(windows[kept] * len(FEEDBACK_NAMES) + codes, minlength=window_count * len(FEEDBACK_NAMES))
+    counts = counts.reshape(window_count, len(FEEDBACK_NAMES))
+    first_seen = np.full((window_count, len(FEEDBACK_NAMES)), frame_total)
+    np.minimum.at(first_seen, (windows[kept], codes), np.nonzero(kept)[0])
+    mode_codes = np.argmax(counts * (frame_total + 1) - first_seen, axis=1)
+    mode_codes = np.where(counts.any(axis=1), mode_codes, NO_FEEDBACK)
+
+    total_feedbacks = {
+        'frame': dict(zip(FEEDBACK_NAMES, np.bincount(frame_feedback[scored], minlength=4).tolist())),
+        'average': dict(zip(FEEDBACK_NAMES, np.bincount(average_codes, minlength=4).tolist())),
+        'mode': dict(zip(FEEDBACK_NAMES, np.bincount(mode_codes, minlength=5)[:4].tolist()))
+    }
+    if (mode_codes == NO_FEEDBACK).any():
+        total_feedbacks['mode']['none'] = int((mode_codes == NO_FEEDBACK).sum())
+    return SequenceScores(scored, correctness, frame_feedback,
+                          _forward_fill(average_triggers, average_codes), _forward_fill(mode_triggers, mode_codes), total_feedbacks)
+
+def score_records(scores, frame_numbers, timestamps):
+    """The per-frame records FeedbackScorer.frame_record gives, from score_sequence results."""
+    return [{
+        "frame_number": int(frame_count),
+        "timestamp": timestamp,
+        "correctness": float(correctness) if scored else None,
+        "feedback": FEEDBACK_LABELS[frame_feedback],
+        "average_feedback": FEEDBACK_LABELS[average_feedback],
+        "mode_feedback": FEEDBACK_LABELS[mode_feedback]
+    } for frame_count, timestamp, scored, correctness, frame_feedback, average_feedback, mode_feedback in zip(
+        frame_numbers, timestamps, scores.scored, scores.correctness.tolist(), scores.frame_feedback.tolist(),
+        scores.average_feedback.tolist(), scores.mode_feedback.tolist())]
+
+def score_pose_sequence(player_angles, has_pose, frame_numbers, timestamps, ref_relative_angles_data):
+    """Score a whole player sequence. Returns (per-frame records, total_feedbacks)."""
+    scores = score_sequence(player_angles, has_pose, frame_numbers, ref_relative_angles_data)
+    return score_records(scores, frame_numbers, timestamps), scores.total_feedbacks
+
+def write_scores(output_path, records, total_feedbacks, player="", reference=""):
+    """
+    Write a scoring run as JSON ({"player", "reference", "total_feedbacks", "frames"}),
+    or, for a .csv path, one row per frame plus the tallies in {name}_feedbacks.csv.
+    """
+    if os.path.splitext(output_path)[1].lower() != ".csv":
+        with open(output_path, 'w') as file:
+            json.dump({"player": player, "reference": reference, "total_feedbacks": total_feedbacks, "frames": records}, file, indent=4)
+        return
+
+    columns = ["frame_number", "timestamp", "correctness", "feedback", "average_feedback", "mode_feedback"]
+    with open(output_path, 'w', newline='') as csv_file:
+        csv_writer = csv.writer(csv_file)
+        csv_writer.writerow(columns)
+        for record in records:
+            csv_writer.writerow(["" if record[column] is None else record[column] for column in columns])
+    with open(os.path.splitext(output_path)[0] + "_feedbacks.csv", 'w', newline='') as csv_file:
+        csv_writer = csv.writer(csv_file)
+        csv_writer.writerow(["feedback"] + list(total_feedbacks))
+        for name in total_feedbacks['mode']:
+            csv_writer.writerow([name] + [total_feedbacks[kind].get(name, 0) for kind in total_feedbacks])
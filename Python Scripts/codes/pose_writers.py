@@ -0,0 +1,131 @@
+import csv
+import json
+import queue
+import threading
+
+
+def _format_json_array_item(data):
+    # same layout json.dump(list, indent=2) gives each element of the array
+    return "  " + json.dumps(data, indent=2).replace("\n", "\n  ")
+
+
+class PoseJsonWriter:
+    """
+    Streams per-frame pose data to disk, writing every frame exactly once.
+
+    With jsonl=False the output is the same indented JSON array the old
+    append_to_json_file produced (and the socket servers load). With jsonl=True
+    every frame is one compact line; use finalize_jsonl to turn it into the array.
+    """
+
+    def __init__(self, output_path, jsonl=False):
+        self.output_path = output_path
+        self.jsonl = jsonl
+        self.frames_written = 0
+        self.file = open(output_path, 'w')
+        if not jsonl:
+            self.file.write("[")
+
+    def write(self, data):
+        if self.jsonl:
+            self.file.write(json.dumps(data) + "\n")
+        else:
+            separator = ",\n" if self.frames_written else "\n"
+            self.file.write(separator + _format_json_array_item(data))
+        self.frames_written += 1
+
+    def close(self):
+        if self.file.closed:
+            return
+        if not self.jsonl:
+            self.file.write("\n]" if self.frames_written else "]")
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.close()
+
+
+def finalize_jsonl(jsonl_path, json_path):
+    """Convert a JSON Lines pose file into the JSON array format the servers load."""
+    with open(jsonl_path, 'r') as jsonl_file, PoseJsonWriter(json_path) as writer:
+        for line in jsonl_file:
+            if line.strip():
+                writer.write(json.loads(line))
+    return json_path
+
+
+class BufferedCsvWriter:
+    """
+    csv.writer that collects rows and writes them with writerows in batches
+    instead of one writerow call per frame. The bytes written are the same.
+    """
+
+    def __init__(self, csv_file, batch_size=500):
+        self.csv_writer = csv.writer(csv_file)
+        self.batch_size = batch_size
+        self.rows = []
+
+    def writerow(self, row):
+        self.rows.append(row)
+        if len(self.rows) >= self.batch_size:
+            self.flush()
+
+    def writerows(self, rows):
+        for row in rows:
+            self.writerow(row)
+
+    def flush(self):
+        if self.rows:
+            self.csv_writer.writerows(self.rows)
+            self.rows = []
+
+
+class ThreadedVideoWriter:
+    """
+    Annotates and encodes output video frames on a background thread.
+
+    write(frame, *annotate_args) queues the frame, waiting while `queue_size`
+    frames are already queued; the thread calls annotate(frame, *annotate_args)
+    and then video_writer.write(frame), in order. A queued frame belongs to the
+    writer, so pass copies of anything the caller changes afterwards.
+    """
+
+    def __init__(self, video_writer, annotate=None, queue_size=8):
+        self.video_writer = video_writer
+        self.annotate = annotate
+        self.frames = queue.Queue(queue_size)
+        self.error = None
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while True:
+            item = self.frames.get()
+            if item is None:
+                break
+            if self.error is not None:
+                # keep draining so write() never blocks after a failure
+                continue
+            frame, annotate_args = item
+            try:
+                if self.annotate is not None:
+                    self.annotate(frame, *annotate_args)
+                self.video_writer.write(frame)
+            except Exception as e:
+                self.error = e
+
+    def write(self, frame, *annotate_args):
+        if self.error is not None:
+            raise self.error
+        self.frames.put((frame, annotate_args))
+
+    def release(self):
+        if self.thread.is_alive():
+            self.frames.put(None)
+            self.thread.join()
+        self.video_writer.release()
+        if self.error is not None:
+            raise self.error
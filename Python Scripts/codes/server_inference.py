@@ -0,0 +1,144 @@
+import asyncio
+import base64
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import cv2
+import numpy as np
+from pose_preprocess import FramePreprocessor
+
+# Pose trackers and frame preprocessors living in this worker (thread or process), keyed by session id.
+# Sessions are pinned to one worker, so a tracker only ever sees its own player's frames.
+_worker_poses = {}
+_worker_preprocessors = {}
+_worker_create_pose = None
+
+def _initialize_worker(create_pose):
+    global _worker_create_pose
+    _worker_create_pose = create_pose
+
+def _infer_frame(session_id, image_data, flip, submitted_at, input_max_side=None, roi_margin=None):
+    timings = {"queue_ms": (time.perf_counter() - submitted_at) * 1e3}
+
+    if isinstance(image_data, str):
+        start = time.perf_counter()
+        image_data = base64.b64decode(image_data)
+        timings["base64_ms"] = (time.perf_counter() - start) * 1e3
+
+    start = time.perf_counter()
+    nparr = np.frombuffer(image_data, np.uint8)
+    frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+    if frame is None:
+        raise ValueError("could not decode image_data")
+    timings["decode_ms"] = (time.perf_counter() - start) * 1e3
+
+    preprocessor = _worker_preprocessors.get(session_id)
+    if preprocessor is None:
+        preprocessor = _worker_preprocessors[session_id] = FramePreprocessor(input_max_side, roi_margin)
+
+    start = time.perf_counter()
+    if flip:
+        # the decoded frame is ours, so mirror it in place instead of allocating another
+        cv2.flip(frame, 1, dst=frame)
+    frame_rgb = preprocessor.prepare(frame)
+    timings["convert_ms"] = (time.perf_counter() - start) * 1e3
+
+    pose = _worker_poses.get(session_id)
+    if pose is None:
+        pose = _worker_poses[session_id] = _worker_create_pose()
+
+    start = time.perf_counter()
+    results = pose.process(frame_rgb)
+    timings["inference_ms"] = (time.perf_counter() - start) * 1e3
+    preprocessor.restore(results.pose_landmarks)
+
+    if not results.pose_landmarks:
+        return None, timings
+    # a plain array pickles cheaply back from a worker process
+    landmarks = np.array([(landmark.x, landmark.y, landmark.z, landmark.visibility) for landmark in results.pose_landmarks.landmark])
+    return landmarks, timings
+
+def _release_session(session_id):
+    _worker_preprocessors.pop(session_id, None)
+    pose = _worker_poses.pop(session_id, None)
+    if pose is not None:
+        pose.close()
+
+
+class InferenceExecutor:
+    """
+    Runs image decode + MediaPipe Pose off the asyncio event loop.
+
+    mode is "thread" or "process"; each of the `workers` workers keeps one Pose
+    tracker per session it serves, and a session always goes to the same worker.
+    At most `max_pending` frames are in flight at once; further callers wait,
+    which pushes back on the WebSocket read loops instead of queueing without bound.
+    Frames are cropped around the player's last pose when `roi_margin` is set and
+    downscaled to `input_max_side` before inference (see pose_preprocess.py).
+    """
+
+    def __init__(self, create_pose, mode="thread", workers=2, max_pending=8, input_max_side=None, roi_margin=None):
+        if mode not in ("thread", "process"):
+            raise ValueError(f"unknown inference mode {mode}")
+        executor_class = ThreadPoolExecutor if mode == "thread" else ProcessPoolExecutor
+        self.mode = mode
+        self.executors = [executor_class(max_workers=1, initializer=_initialize_worker, initargs=(create_pose,))
+                          for _ in range(workers)]
+        self.max_pending = max_pending
+        self.input_max_side = input_max_side
+        self.roi_margin = roi_margin
+        self.pending = 0
+        self.max_pending_seen = 0
+        self.slots = asyncio.Semaphore(max_pending)
+        self.worker_sessions = [set() for _ in range(workers)]
+        self.session_workers = {}
+
+    def _worker_for(self, session_id):
+        worker = self.session_workers.get(session_id)
+        if worker is None:
+            # pin new sessions to the worker serving the fewest sessions
+            worker = min(range(len(self.executors)), key=lambda i: len(self.worker_sessions[i]))
+            self.session_workers[session_id] = worker
+            self.worker_sessions[worker].add(session_id)
+        return worker
+
+    async def infer(self, session_id, image_data, flip):
+        """
+        image_data is base64 text (JSON messages) or raw image bytes (binary messages).
+        Returns (landmark array of shape (33, 4) or None, stage timings in ms).
+        """
+        loop = asyncio.get_running_loop()
+        if self.mode == "process" and isinstance(image_data, memoryview):
+            # binary frames arrive as a view into the message; a worker process needs its own copy
+            image_data = image_data.tobytes()
+        submitted_at = time.perf_counter()
+        async with self.slots:
+            self.pending += 1
+            self.max_pending_seen = max(self.max_pending_seen, self.pending)
+            try:
+                executor = self.executors[self._worker_for(session_id)]
+                landmarks, timings = await loop.run_in_executor(executor, _infer_frame, session_id, image_data, flip, submitted_at, self.input_max_side, self.roi_margin)
+            finally:
+                self.pending -= 1
+        timings["total_ms"] = (time.perf_counter() - submitted_at) * 1e3
+        return landmarks, timings
+
+    async def release(self, session_id):
+        worker = self.session_workers.pop(session_id, None)
+        if worker is None:
+            return
+        self.worker_sessions[worker].discard(session_id)
+        await asyncio.get_running_loop().run_in_executor(self.executors[worker], _release_session, session_id)
+
+    def stats(self):
+        return {
+            "mode": self.mode,
+            "workers": len(self.executors),
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            "max_pending_seen": self.max_pending_seen,
+            "sessions_per_worker": [len(sessions) for sessions in self.worker_sessions]
+        }
+
+    def shutdown(self):
+        for executor in self.executors:
+            executor.shutdown(wait=True)
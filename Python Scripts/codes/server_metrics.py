@@ -0,0 +1,158 @@
+import asyncio
+import bisect
+import json
+import time
+from collections import deque
+
+# Upper bounds (ms) of the latency histogram buckets, roughly 1-2-5 per decade;
+# anything slower lands in a last, open-ended bucket.
+LATENCY_BUCKETS_MS = [0.05, 0.1, 0.2, 0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000]
+
+
+class LatencyHistogram:
+    """Fixed-bucket histogram of one stage's latencies in ms."""
+
+    def __init__(self, bounds=LATENCY_BUCKETS_MS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, ms):
+        self.counts[bisect.bisect_left(self.bounds, ms)] += 1
+        self.count += 1
+        self.total += ms
+        if ms > self.max:
+            self.max = ms
+
+    def percentile(self, fraction):
+        """Upper bound of the bucket holding the given fraction of samples (the max for the last bucket)."""
+        if self.count == 0:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def stats(self):
+        return {
+            "count": self.count,
+            "mean_ms": self.total / self.count if self.count else 0.0,
+            "p50_ms": self.percentile(0.5),
+            "p90_ms": self.percentile(0.9),
+            "p99_ms": self.percentile(0.99),
+            "max_ms": self.max,
+            # bucket upper bound (ms, "inf" for the last) -> samples
+            "buckets": {str(bound): count for bound, count in zip(self.bounds + ["inf"], self.counts) if count}
+        }
+
+
+class StageTimer:
+    """Context manager timing one stage into a SessionMetrics."""
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        self.metrics.record(self.name, (time.perf_counter() - self.start) * 1e3)
+
+
+class SessionMetrics:
+    """
+    Latency and throughput of one scoring session.
+
+    Stages are recorded by name, each into its own histogram: parse, intake_wait,
+    then the inference worker's queue, base64, decode, convert, inference and total
+    (its whole round trip), then angles, match / dtw, send, and frame (from taking
+    the frame off the intake until its reply was sent).
+    Frames/sec and the pose-detection rate are given over the whole session and
+    over the last `rate_window_s` seconds.
+    """
+
+    def __init__(self, rate_window_s=10.0):
+        self.rate_window_s = rate_window_s
+        self.stages = {}
+        self.started_at = time.perf_counter()
+        self.frames = 0
+        self.poses = 0
+        # (finished at, pose detected) of the frames inside the rate window
+        self.recent_frames = deque()
+
+    def record(self, stage, ms):
+        histogram = self.stages.get(stage)
+        if histogram is None:
+            histogram = self.stages[stage] = LatencyHistogram()
+        histogram.add(ms)
+
+    def record_timings(self, timings):
+        """Record the stage timings InferenceExecutor.infer returns ({"decode_ms": ...})."""
+        for stage, ms in timings.items():
+            self.record(stage[:-3] if stage.endswith("_ms") else stage, ms)
+
+    def stage(self, name):
+        return StageTimer(self, name)
+
+    def frame_done(self, pose_detected, started_at):
+        """Count a frame that was answered; started_at is when its handling began (perf_counter)."""
+        now = time.perf_counter()
+        self.record("frame", (now - started_at) * 1e3)
+        self.frames += 1
+        self.poses += bool(pose_detected)
+        self.recent_frames.append((now, bool(pose_detected)))
+        self._expire(now)
+
+    def _expire(self, now):
+        while self.recent_frames and now - self.recent_frames[0][0] > self.rate_window_s:
+            self.recent_frames.popleft()
+
+    def stats(self):
+        now = time.perf_counter()
+        self._expire(now)
+        window_s = min(self.rate_window_s, now - self.started_at)
+        recent_poses = sum(pose_detected for _, pose_detected in self.recent_frames)
+        return {
+            "uptime_s": now - self.started_at,
+            "frames": self.frames,
+            "fps": self.frames / (now - self.started_at) if now > self.started_at else 0.0,
+            "recent_fps": len(self.recent_frames) / window_s if window_s > 0 else 0.0,
+            "pose_rate": self.poses / self.frames if self.frames else 0.0,
+            "recent_pose_rate": recent_poses / len(self.recent_frames) if self.recent_frames else 0.0,
+            "stages": {stage: histogram.stats() for stage, histogram in self.stages.items()}
+        }
+
+
+async def _serve_metrics(get_stats, reader, writer):
+    try:
+        request_line = await reader.readline()
+        # the rest of the request head is not needed
+        while (await reader.readline()).strip():
+            pass
+        parts = request_line.decode('latin-1').split()
+        if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?")[0] in ("/", "/stats", "/metrics"):
+            status, body = "200 OK", json.dumps(get_stats(), indent=2).encode('utf-8')
+        else:
+            status, body = "404 Not Found", b'{"error": "not found"}'
+        writer.write(f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+                     f"Connection: close\r\n\r\n".encode('latin-1') + body)
+        await writer.drain()
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+async def start_metrics_server(get_stats, port, host="localhost"):
+    """
+    Serve get_stats() as JSON over plain HTTP (GET /stats or /metrics) on the
+    running event loop. Bound to localhost by default; returns the asyncio server.
+    """
+    server = await asyncio.start_server(lambda reader, writer: _serve_metrics(get_stats, reader, writer), host, port)
+    print(f"Metrics on http://{host}:{port}/stats")
+    return server
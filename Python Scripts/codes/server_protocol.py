@@ -0,0 +1,80 @@
+import struct
+
+import numpy as np
+
+# Binary frame message, sent as a binary WebSocket message instead of base64-in-JSON:
+#
+#   uint8  message type      (1 = frame_data, 2 = landmark_data)
+#   uint8  flip              (0/1, mirror the image horizontally)
+#   uint8  encoding          (1 = JPEG, 2 = PNG; anything cv2.imdecode reads, 3 = float32 landmarks)
+#   uint8  reserved          (0)
+#   int64  frame_number
+#   ...    raw image bytes, or 33 rows of float32 x, y(, z, visibility); empty when no pose was found
+#
+# all fields little-endian. Text messages keep using the JSON protocol, where
+# landmark_data is {"type": "landmark_data", "frame_number": n, "landmarks": [[x, y, ...] * 33] or null}.
+
+BINARY_HEADER = struct.Struct("<BBBBq")
+BINARY_HEADER_SIZE = BINARY_HEADER.size
+
+MESSAGE_FRAME_DATA = 1
+MESSAGE_LANDMARK_DATA = 2
+ENCODING_JPEG = 1
+ENCODING_PNG = 2
+ENCODING_FLOAT32 = 3
+
+LANDMARK_COUNT = 33
+
+# messages that carry one player frame; the intake may coalesce these
+FRAME_MESSAGE_TYPES = ("frame_data", "landmark_data")
+
+def pack_binary_frame(frame_number, image_bytes, flip=False, encoding=ENCODING_JPEG):
+    return BINARY_HEADER.pack(MESSAGE_FRAME_DATA, int(bool(flip)), encoding, 0, frame_number) + bytes(image_bytes)
+
+def pack_binary_landmarks(frame_number, landmarks):
+    payload = b"" if landmarks is None else np.ascontiguousarray(landmarks, dtype='<f4').tobytes()
+    return BINARY_HEADER.pack(MESSAGE_LANDMARK_DATA, 0, ENCODING_FLOAT32, 0, frame_number) + payload
+
+def parse_landmarks(landmarks):
+    """
+    Landmarks sent by a client as an array of shape (33, 2+) with x, y first, in
+    the same normalized image coordinates MediaPipe returns. None or empty means no pose.
+    Clients mirror their own camera image; flip does not apply here.
+    """
+    if landmarks is None or len(landmarks) == 0:
+        return None
+    landmarks = np.asarray(landmarks, dtype=np.float64)
+    if landmarks.ndim != 2 or landmarks.shape[0] != LANDMARK_COUNT or landmarks.shape[1] < 2:
+        raise ValueError(f"landmarks must have shape ({LANDMARK_COUNT}, 2+), got {landmarks.shape}")
+    return landmarks
+
+def parse_binary_message(message):
+    """
+    Turn a binary WebSocket message into the same dict a JSON frame_data or landmark_data message gives.
+    For frame_data, image_data is a memoryview into the message, so the image bytes are never copied.
+    """
+    if len(message) < BINARY_HEADER_SIZE:
+        raise ValueError(f"binary message too short ({len(message)} bytes)")
+    message_type, flip, encoding, _, frame_number = BINARY_HEADER.unpack_from(message)
+    if message_type == MESSAGE_LANDMARK_DATA:
+        if encoding != ENCODING_FLOAT32:
+            raise ValueError(f"unknown landmark encoding {encoding}")
+        values = np.frombuffer(message, '<f4', offset=BINARY_HEADER_SIZE)
+        if values.size % LANDMARK_COUNT:
+            raise ValueError(f"landmark payload of {values.size} values is not {LANDMARK_COUNT} rows")
+        return {
+            "type": "landmark_data",
+            "frame_number": frame_number,
+            "flip": bool(flip),
+            "landmarks": values.reshape(LANDMARK_COUNT, -1) if values.size else None
+        }
+    if message_type != MESSAGE_FRAME_DATA:
+        raise ValueError(f"unknown binary message type {message_type}")
+    if encoding not in (ENCODING_JPEG, ENCODING_PNG):
+        raise ValueError(f"unknown image encoding {encoding}")
+    return {
+        "type": "frame_data",
+        "frame_number": frame_number,
+        "flip": bool(flip),
+        "image_data": memoryview(message)[BINARY_HEADER_SIZE:]
+    }
@@ -0,0 +1,203 @@
+import asyncio
+import itertools
+import json
+import time
+from collections import deque
+import websockets
+from server_metrics import SessionMetrics
+from server_protocol import FRAME_MESSAGE_TYPES, parse_binary_message, parse_landmarks
+
+_session_ids = itertools.count(1)
+
+
+class FrameIntake:
+    """
+    Bounded per-session intake queue where the newest frame wins.
+
+    At most `max_frames` frame messages (frame_data, landmark_data) wait at once; when another arrives
+    the oldest waiting frame is dropped. Other messages (song_selection, ...)
+    are never dropped and keep their order. Frames that waited longer than
+    `latency_budget_ms` by the time they are taken are skipped as well.
+    """
+
+    def __init__(self, max_frames=1, latency_budget_ms=None):
+        self.max_frames = max_frames
+        self.latency_budget_ms = latency_budget_ms
+        self.items = deque()
+        self.waiting_frames = 0
+        self.max_waiting_frames = 0
+        self.ready = asyncio.Event()
+        self.closed = False
+        self.received = 0
+        self.dropped_superseded = 0
+        self.dropped_late = 0
+
+    @property
+    def dropped(self):
+        return self.dropped_superseded + self.dropped_late
+
+    def put(self, data):
+        is_frame = isinstance(data, dict) and data.get('type') in FRAME_MESSAGE_TYPES
+        if is_frame:
+            self.received += 1
+            if self.waiting_frames >= self.max_frames:
+                for item in self.items:
+                    if item[2]:
+                        self.items.remove(item)
+                        break
+                self.waiting_frames -= 1
+                self.dropped_superseded += 1
+            self.waiting_frames += 1
+            self.max_waiting_frames = max(self.max_waiting_frames, self.waiting_frames)
+        self.items.append((data, time.perf_counter(), is_frame))
+        self.ready.set()
+
+    async def get(self):
+        """Next message to handle as (data, ms spent waiting), or None once the connection closed."""
+        while True:
+            while not self.items:
+                if self.closed:
+                    return None
+                self.ready.clear()
+                await self.ready.wait()
+
+            data, received_at, is_frame = self.items.popleft()
+            waited_ms = (time.perf_counter() - received_at) * 1e3
+            if is_frame:
+                self.waiting_frames -= 1
+                if self.latency_budget_ms is not None and waited_ms > self.latency_budget_ms:
+                    self.dropped_late += 1
+                    continue
+            return data, waited_ms
+
+    def close(self):
+        self.closed = True
+        self.ready.set()
+
+    def stats(self):
+        return {
+            "received": self.received,
+            "waiting": self.waiting_frames,
+            "max_waiting": self.max_waiting_frames,
+            "dropped": self.dropped,
+            "dropped_superseded": self.dropped_superseded,
+            "dropped_late": self.dropped_late
+        }
+
+
+async def read_into_intake(websocket, intake, metrics=None):
+    """
+    Reader task: parse every incoming message into the session's intake until the socket closes.
+    Text messages are JSON; binary messages use the frame format in server_protocol.py.
+    Parse times go to metrics (a SessionMetrics) when given.
+    """
+    try:
+        async for message in websocket:
+            start = time.perf_counter()
+            try:
+                if isinstance(message, bytes):
+                    data = parse_binary_message(message)
+                else:
+                    data = json.loads(message)
+            except Exception as e:
+                # handed to the processing loop, which reports it like any other bad message
+                data = e
+            if metrics is not None:
+                metrics.record("parse", (time.perf_counter() - start) * 1e3)
+            intake.put(data)
+    except websockets.exceptions.ConnectionClosed:
+        pass
+    finally:
+        intake.close()
+
+
+class ScoringSession:
+    """
+    State owned by one WebSocket connection of a scoring server.
+
+    Each session has its own song selection and its own MediaPipe Pose tracker,
+    which lives in the inference worker the session is pinned to. The reference
+    arrays come from the shared ReferenceCache and are read-only, so sessions
+    playing the same song share one copy. Servers subclass this to add their
+    own per-player buffers. Stage latencies and frame rates go to `metrics`.
+    """
+
+    def __init__(self, websocket, inference, intake_max_frames=1, latency_budget_ms=None):
+        self.session_id = next(_session_ids)
+        self.websocket = websocket
+        self.remote_address = websocket.remote_address
+        self.inference = inference
+        self.intake = FrameIntake(intake_max_frames, latency_budget_ms)
+        self.metrics = SessionMetrics()
+        self.current_song = ""
+        self.current_app_path = ""
+        self.reference = None
+
+    @property
+    def reference_pose_sequence(self):
+        return self.reference.angles if self.reference is not None else []
+
+    @property
+    def normalized_reference_sequence(self):
+        return self.reference.normalized_angles if self.reference is not None else []
+
+    def set_current_song(self, reference_cache, selected_song, app_path):
+        self.current_song = selected_song
+        self.current_app_path = app_path
+        # Reference angles come from {app_path}/PoseFiles/{song}.pose or .json, cached after first use
+        self.reference = reference_cache.get(app_path, selected_song)
+        print(f"Reference poses loaded from {self.reference.path}, cache {reference_cache.stats()}")
+
+    async def infer(self, image_data, flip):
+        """Decode and run pose inference on the session's worker; returns (landmarks or None, timings)."""
+        return await self.inference.infer(self.session_id, image_data, flip)
+
+    async def landmarks_for(self, data):
+        """
+        Landmarks for a frame message: image frames go through inference, landmark_data
+        messages already carry them. Returns (landmark array or None, stage timings in ms).
+        """
+        if data['type'] == "landmark_data":
+            return parse_landmarks(data['landmarks']), {}
+        return await self.infer(data['image_data'], data['flip'])
+
+    async def messages(self):
+        """
+        Yields (data, ms the message waited) in arrival order, coalescing stale frames.
+        data is a parsed message dict, or the exception raised while parsing it.
+        """
+        reader = asyncio.create_task(read_into_intake(self.websocket, self.intake, self.metrics))
+        try:
+            while True:
+                item = await self.intake.get()
+                if item is None:
+                    break
+                self.metrics.record("intake_wait", item[1])
+                yield item
+        finally:
+            reader.cancel()
+
+    def stats(self):
+        return {
+            "session_id": self.session_id,
+            "remote_address": str(self.remote_address),
+            "song": self.current_song,
+            "intake": self.intake.stats(),
+            **self.metrics.stats()
+        }
+
+    async def close(self):
+        await self.inference.release(self.session_id)
+
+
+# every connected session, so a server can report on all of them
+active_sessions = set()
+
+def server_stats(inference=None, reference_cache=None):
+    """Every active session's stats, plus the shared inference pool and reference cache."""
+    stats = {"sessions": [session.stats() for session in sorted(active_sessions, key=lambda session: session.session_id)]}
+    if inference is not None:
+        stats["inference"] = inference.stats()
+    if reference_cache is not None:
+        stats["cache"] = reference_cache.stats()
+    return stats
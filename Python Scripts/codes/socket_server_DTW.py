@@ -1,216 +1,162 @@
-import base64
-import cv2
-import mediapipe as mp
 import numpy as np
 import asyncio
 import websockets
 import json
-import sys
-from fastdtw import fastdtw
-from scipy.spatial.distance import euclidean
-from datetime import datetime
+import time
 import traceback
-
-reference_pose_sequence = []
-player_pose_sequence = []
-frame_numbers = []
-distances = []
-
-current_song = ""
-current_app_path = ""
-
+from pose_angles import calculate_relative_angles_array
+from pose_reference import ReferenceCache
+from pose_matching import StreamingDTW
+from server_metrics import start_metrics_server
+from server_session import ScoringSession, active_sessions, server_stats
+from server_inference import InferenceExecutor
+from pose_profiles import create_profile_pose, get_pose_profile
+
+# the running DTW score restarts after this many player frames
 buffer_size = 30
-offset = 0
+# player frames are aligned with reference frames within this many frames of their own frame number
+dtw_band = 15
+
+# loaded songs stay in memory so replaying or re-selecting a song skips the disk and normalization
+reference_cache = ReferenceCache(max_entries=8, max_bytes=64 * 1024 * 1024)
 
+# MediaPipe runs off the event loop on a "thread" or "process" pool; each session keeps its own Pose on one worker
+inference_mode = "thread"
+inference_workers = 2
+# frames allowed in flight at once before message readers wait
+inference_max_pending = 8
+# frames waiting per session before the oldest is dropped, and how old (ms) a frame may get before it is skipped
+intake_max_frames = 1
+frame_latency_budget_ms = 500
+inference = None
 
-pose = mp.solutions.pose.Pose(
-    min_detection_confidence=0.8,
-    min_tracking_confidence=0.8,
-    model_complexity=1,
-    enable_segmentation=True,
-    smooth_segmentation=True,
-    smooth_landmarks=True)
+# MediaPipe model settings by name, see pose_profiles.py (bench_pose_profiles.py compares them)
+pose_profile = "tracking"
+# crop frames to the player's last pose plus this fraction of its size (None = always the full frame)
+roi_margin = None
 
-# Function to load reference poses from a JSON file
-def load_reference_poses(json_file_path):
-    global reference_pose_sequence
 
-    # Open and load the JSON file
-    with open(json_file_path, 'r') as file:
-        data = json.load(file)
+# the Unity client connects to ws://localhost:8139
+port = 8139
 
-        # Extract the relative angles from each frame and store them in the reference_pose_sequence
-        for frame_data in data:
-            # Assuming the JSON contains a list of frames
-            relative_angles = list(frame_data['relative_angles'].values())  # Convert dict values to a list
-            reference_pose_sequence.append(relative_angles)
+# serve per-session latency / throughput stats as JSON on http://localhost:{metrics_port}/stats (None = off)
+metrics_port = None
 
-        print("Reference poses loaded successfully!")
+def create_pose():
+    return create_profile_pose(pose_profile)
 
 def normalize_angles(angles):
     return [angle / np.pi for angle in angles]
 
-def calculate_relative_angles(landmarks):
-    def calculate_relative_angle(a, b, c):
-        ba = np.array([a.x - b.x, a.y - b.y])
-        bc = np.array([c.x - b.x, c.y - b.y])
-
-        cosine_angle = np.dot(ba, bc) / (np.linalg.norm(ba) * np.linalg.norm(bc))
-        angle = np.arccos(np.clip(cosine_angle, -1.0, 1.0))
-        return angle
-
-    landmark_triplets = [
-        (11, 13, 15), (12, 14, 16),
-        (13, 11, 23), (11, 23, 25), (23, 25, 27),
-        (14, 12, 24), (12, 24, 26), (24, 26, 28)
-    ]
-
-    relative_angles = []
+class DTWSession(ScoringSession):
+    def __init__(self, websocket, inference, intake_max_frames=1, latency_budget_ms=None):
+        super().__init__(websocket, inference, intake_max_frames, latency_budget_ms)
+        self.streaming_dtw = None
+        self.frame_numbers = []
+        self.distances = []
 
-    for a, b, c in landmark_triplets:
-        angle = calculate_relative_angle(landmarks[a], landmarks[b], landmarks[c])
-        relative_angles.append(angle)
-
-    return relative_angles
-
-def validate_pose_sequence(sequence):
-    for i, angles in enumerate(sequence):
-        if len(angles) != 10:
-            print(f"Frame {i} has an incorrect number of angles: {len(angles)}")
-
-def mae_distance(x, y):
-    """
-    Calculate Mean Absolute Error between two pose angle sequences
-    """
-    return np.mean(np.abs(np.array(x) - np.array(y)))
-
-def set_current_song(selected_song, app_path):
-    global current_song, current_app_path
-    current_song = selected_song
-    current_app_path = app_path
-    # Call the function and pass the path to your JSON file
-    # load_reference_poses(f"test/{current_song}.json") # test
-    load_reference_poses(current_app_path + "/PoseFiles/" + f"{current_song}.json") # production  
+    def set_current_song(self, reference_cache, selected_song, app_path):
+        super().set_current_song(reference_cache, selected_song, app_path)
+        self.streaming_dtw = StreamingDTW(self.normalized_reference_sequence, band=dtw_band)
 
 async def process_frame_task(websocket, path):
+    # every connection gets its own tracker and buffers, so clients can't corrupt each other
+    session = DTWSession(websocket, inference, intake_max_frames, frame_latency_budget_ms)
+    active_sessions.add(session)
     try:
-        player_pose_sequence.clear()
-        async for message in websocket:
+        # a reader task fills the session's intake; stale frames are coalesced so we always score the newest
+        async for data, waited_ms in session.messages():
             try:
-                data = json.loads(message)
+                if isinstance(data, Exception):
+                    raise data
                 dataType = data['type']
-                if(dataType == "frame_data"):
+                if(dataType == "frame_data" or dataType == "landmark_data"):
                     
-                    # Decode and process the image with MediaPipe
-                    img_data = base64.b64decode(data['image_data'])
                     current_frame_number = data["frame_number"]
-                    nparr = np.frombuffer(img_data, np.uint8)
-                    frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-                    # print("received frame", current_frame_number)
-                    # Process the frame to get pose landmarks
-                    flipWebcam = data["flip"]
-                    if (flipWebcam):
-                        frame = cv2.flip(frame, 1)
-                    results = pose.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
-
-                    if results.pose_landmarks:
+                    frame_started = time.perf_counter()
+                    # Decode the image and run MediaPipe on the session's inference worker,
+                    # or take the landmarks a landmark_data message already carries
+                    landmarks, timings = await session.landmarks_for(data)
+                    session.metrics.record_timings(timings)
+                    streaming_dtw = session.streaming_dtw
+
+                    if landmarks is not None:
                         # Calculate relative angles between body landmarks
-                        relative_angles = calculate_relative_angles(results.pose_landmarks.landmark)
+                        with session.metrics.stage("angles"):
+                            relative_angles = calculate_relative_angles_array(landmarks)
                         
-                        # Buffer the player's pose for DTW
-                        player_pose_sequence.append(relative_angles)
-                        frame_numbers.append(current_frame_number)
-                        
-                        mp.solutions.drawing_utils.draw_landmarks(
-                            frame, 
-                            results.pose_landmarks, 
-                            mp.solutions.pose.POSE_CONNECTIONS,
-                            landmark_drawing_spec=mp.solutions.drawing_styles.get_default_pose_landmarks_style()
-                        )
-                        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                        filename = f"testImg/annotated_frame_{current_frame_number}_{timestamp}.jpg"
-                        # cv2.imwrite(filename, frame)
-
-                        if len(player_pose_sequence) == 1:
-                            start_player_frame = current_frame_number # Player's first frame
-
-                        # Keep only the last 30 frames in the buffer
-                        if len(player_pose_sequence) > buffer_size:
-                            player_pose_sequence.pop(0)  # Keep buffer size to 30 frames
+                        session.frame_numbers.append(current_frame_number)
 
-                        # Perform DTW comparison after collecting 30 frames
-                        if len(player_pose_sequence) == buffer_size:
-
-                            
-                            print(f"frames: {frame_numbers}")
-                            frame_numbers.clear()
-                            end_player_frame = current_frame_number # Player's last frame
-                            
-                            print(f"SHOULD Start at {start_player_frame} Ends at {end_player_frame}")
-
-                            # Get the sliding window range for the reference sequence
-                            start_reference_frame = max(0, start_player_frame - offset)
-                            normalized_player_sequence = [normalize_angles(frame) for frame in player_pose_sequence]
-                            end_reference_frame = min(len(normalized_reference_sequence), current_frame_number + offset)
-
-                            # Extract the reference frames for the sliding window
-                            reference_window = normalized_reference_sequence[start_reference_frame:end_reference_frame]
-                            # print(reference_window[0])
-                            # print(normalized_player_sequence[0])
-
-                            distance, path = fastdtw(normalized_player_sequence, reference_window, dist=mae_distance)
-                            print(f"dtw_distance: {distance}")
-                            distances.append(distance)
-
-                            score = max(0, 1 - (distance / len(path)))  # Normalize by path length to get average error
-                            print(f"normalized score: {score}")
-
-
-                            # Send DTW result back to Unity
-                            # await websocket.send(json.dumps({"dtw_distance": distance}))
-
-                            # Send DTW score back to Unity
-                            await websocket.send(json.dumps({"dtw_score": score}))
-
-                            # Clear the buffer after sending the DTW result
-                            player_pose_sequence.clear()
+                        # Extend the DTW alignment by one row and send the running score back to Unity;
+                        # the frame number lets a client match replies to frames when some were dropped
+                        with session.metrics.stage("dtw"):
+                            score = streaming_dtw.update(normalize_angles(relative_angles), current_frame_number)
+                        with session.metrics.stage("send"):
+                            await websocket.send(json.dumps({"dtw_score": score, "dropped": session.intake.dropped, "frame_number": current_frame_number}))
 
                     else:
-                        await websocket.send(json.dumps({"error": "No pose detected"}))
-                        player_pose_sequence.append([0] * 8)
+                        with session.metrics.stage("send"):
+                            await websocket.send(json.dumps({"error": "No pose detected", "dropped": session.intake.dropped, "frame_number": current_frame_number}))
+                        with session.metrics.stage("dtw"):
+                            streaming_dtw.update([0] * 8, current_frame_number)
+
+                    # Start a new alignment every 30 frames, like the old batch window; frames
+                    # without a pose count too, or a window ending on one would never restart
+                    if streaming_dtw.frames >= buffer_size:
+                        print(f"frames: {session.frame_numbers}")
+                        session.frame_numbers.clear()
+                        print(f"dtw_distance: {streaming_dtw.distance}")
+                        session.distances.append(streaming_dtw.distance)
+                        print(f"normalized score: {streaming_dtw.score}")
+                        streaming_dtw.reset()
+                    session.metrics.frame_done(landmarks is not None, frame_started)
                 elif(dataType == "song_selection"):
-                    print("total dtwdistance calculated: ", len(distances))
+                    print("total dtwdistance calculated: ", len(session.distances))
                     print("------------------------")
                     app_path = data["app_path"]
                     selected_song = data["song_name"]
-                    reference_pose_sequence.clear()
-                    distances.clear()
-                    set_current_song(selected_song,app_path)
+                    session.distances.clear()
+                    session.set_current_song(reference_cache, selected_song, app_path)
                     print(f"Player selected {selected_song}")
-                    frame_numbers.clear()
-                    player_pose_sequence.clear()
-                    
-                    normalized_reference_sequence = [normalize_angles(frame) for frame in reference_pose_sequence]
+                    session.frame_numbers.clear()
+                elif(dataType == "cache_stats"):
+                    await websocket.send(json.dumps({"cache_stats": reference_cache.stats()}))
+                elif(dataType == "stats"):
+                    # this session's stage latencies and rates, plus every session's with "all": true
+                    stats = {"session": session.stats()}
+                    if data.get("all", False):
+                        stats["server"] = server_stats(inference, reference_cache)
+                    await websocket.send(json.dumps({"stats": stats}))
 
 
             except Exception as e:
                 await websocket.send(json.dumps({"error": str(e)}))
                 traceback.print_exc()
-                player_pose_sequence.clear()
+                if session.streaming_dtw is not None:
+                    session.streaming_dtw.reset()
 
     except websockets.exceptions.ConnectionClosed:
         print("WebSocket connection closed")
     finally:
+        active_sessions.discard(session)
+        await session.close()
         if not websocket.closed:
             await websocket.close()
             print(f"WebSocket connection properly closed from client {websocket.remote_address}.")
 
 async def main():
-    server = await websockets.serve(process_frame_task, "localhost", 8139)
-    print("Server started on ws://localhost:8139")
+    global inference
+    inference = InferenceExecutor(create_pose, mode=inference_mode, workers=inference_workers, max_pending=inference_max_pending,
+                                  input_max_side=get_pose_profile(pose_profile).input_max_side, roi_margin=roi_margin)
+    server = await websockets.serve(process_frame_task, "localhost", port)
+    print(f"Server started on ws://localhost:{port}")
+    if metrics_port is not None:
+        await start_metrics_server(lambda: server_stats(inference, reference_cache), metrics_port)
 
-
-    await server.wait_closed()
+    try:
+        await server.wait_closed()
+    finally:
+        inference.shutdown()
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
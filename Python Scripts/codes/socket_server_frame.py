@@ -1,164 +1,135 @@
-import base64
-import cv2
-import mediapipe as mp
-import numpy as np
 import asyncio
 import websockets
 import json
-import sys
+import time
 import traceback
-from datetime import datetime
+from pose_angles import calculate_relative_angles_array
+from pose_reference import ReferenceCache
+from pose_matching import match_window
+from server_metrics import start_metrics_server
+from server_session import ScoringSession, active_sessions, server_stats
+from server_inference import InferenceExecutor
+from pose_profiles import create_profile_pose, get_pose_profile
 
-reference_pose_sequence = []
-correctness_sequence = []
 window_size = 8
 
-current_song = ""
-current_app_path = ""
+# each player frame is compared with reference frames [frame - before, frame + after)
+match_frames_before = 12
+match_frames_after = 4
+# per-angle differences are capped at this value before averaging
+difference_clip = 1.0
 
-pose = mp.solutions.pose.Pose(
-    static_image_mode=True,
-    min_detection_confidence=0.8,
-    min_tracking_confidence=0.8,
-    model_complexity=1,
-    enable_segmentation=True)
+# loaded songs stay in memory so replaying or re-selecting a song skips the disk
+reference_cache = ReferenceCache(max_entries=8, max_bytes=64 * 1024 * 1024)
 
-def load_reference_poses(json_file_path):
-    global reference_pose_sequence
+# MediaPipe runs off the event loop on a "thread" or "process" pool; each session keeps its own Pose on one worker
+inference_mode = "thread"
+inference_workers = 2
+# frames allowed in flight at once before message readers wait
+inference_max_pending = 8
+# frames waiting per session before the oldest is dropped, and how old (ms) a frame may get before it is skipped
+intake_max_frames = 1
+frame_latency_budget_ms = 500
+inference = None
 
-    # Open and load the JSON file
-    with open(json_file_path, 'r') as file:
-        data = json.load(file)
+# MediaPipe model settings by name, see pose_profiles.py (bench_pose_profiles.py compares them)
+pose_profile = "static"
+# crop frames to the player's last pose plus this fraction of its size (None = always the full frame)
+roi_margin = None
 
-        # Extract the relative angles from each frame and store them in the reference_pose_sequence
-        for frame_data in data:
-            # Assuming the JSON contains a list of frames
-            relative_angles = list(frame_data['relative_angles'].values())  # Convert dict values to a list
-            reference_pose_sequence.append(relative_angles)
+# the Unity client connects to ws://localhost:8139
+port = 8139
 
-        print("Reference poses loaded successfully!")
-
-def set_current_song(selected_song, app_path):
-    global current_song, current_app_path
-    current_song = selected_song
-    current_app_path = app_path
-    # Call the function and pass the path to JSON file
-    load_reference_poses(current_app_path + "/PoseFiles/" + f"{current_song}.json") # production  
-
-def calculate_relative_angles(landmarks):
-    def calculate_relative_angle(a, b, c):
-        ba = np.array([a.x - b.x, a.y - b.y])
-        bc = np.array([c.x - b.x, c.y - b.y])
-
-        cosine_angle = np.dot(ba, bc) / (np.linalg.norm(ba) * np.linalg.norm(bc))
-        angle = np.arccos(np.clip(cosine_angle, -1.0, 1.0))
-        return angle
-
-    landmark_triplets = [
-        (11, 13, 15), (12, 14, 16),
-        (13, 11, 23), (11, 23, 25), (23, 25, 27),
-        (14, 12, 24), (12, 24, 26), (24, 26, 28)    
-    ]
-
-    relative_angles = []
-
-    for a, b, c in landmark_triplets:
-        angle = calculate_relative_angle(landmarks[a], landmarks[b], landmarks[c])
-        relative_angles.append(angle)
-
-    return relative_angles
+# serve per-session latency / throughput stats as JSON on http://localhost:{metrics_port}/stats (None = off)
+metrics_port = None
 
+def create_pose():
+    return create_profile_pose(pose_profile)
 
+class FrameSession(ScoringSession):
+    def __init__(self, websocket, inference, intake_max_frames=1, latency_budget_ms=None):
+        super().__init__(websocket, inference, intake_max_frames, latency_budget_ms)
+        self.correctness_sequence = []
 
 async def process_frame(websocket, path):
-    global correctness_sequence
+    # every connection gets its own tracker and buffers, so clients can't corrupt each other
+    session = FrameSession(websocket, inference, intake_max_frames, frame_latency_budget_ms)
+    active_sessions.add(session)
 
     try:
-        async for message in websocket:
+        # a reader task fills the session's intake; stale frames are coalesced so we always score the newest
+        async for data, waited_ms in session.messages():
             try:
-                data = json.loads(message)
+                if isinstance(data, Exception):
+                    raise data
                 dataType = data['type']
-                if(dataType == "frame_data"):
+                if(dataType == "frame_data" or dataType == "landmark_data"):
                     frame_number = data['frame_number']
-                    img_data = data['image_data']
                     print(f"processing frame#{frame_number}")
-
-                    # Decode the base64 image
-                    img_data = base64.b64decode(img_data)
-                    nparr = np.frombuffer(img_data, np.uint8)
-                    frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-                    flipWebcam = data["flip"]
+                    flipWebcam = data.get("flip", False)
                     print(f"flipWebcam {flipWebcam}")
-                    if (flipWebcam):
-                        frame = cv2.flip(frame, 1)
+                    frame_started = time.perf_counter()
 
-
-                    # Process the frame with MediaPipe
-                    results = pose.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+                    # Decode the image and run MediaPipe on the session's inference worker,
+                    # or take the landmarks a landmark_data message already carries
+                    landmarks, timings = await session.landmarks_for(data)
+                    session.metrics.record_timings(timings)
                     
                     # Extract pose landmarks
-                    if results.pose_landmarks:
-                        """
-                        # Draw pose landmarks on the frame
-                        mp.solutions.drawing_utils.draw_landmarks(
-                            frame, 
-                            results.pose_landmarks, 
-                            mp.solutions.pose.POSE_CONNECTIONS,
-                            landmark_drawing_spec=mp.solutions.drawing_styles.get_default_pose_landmarks_style()
-                        )
-                        
-                        # Save the annotated frame
-                        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                        filename = f"gameplay2/annotated_frame_{frame_number}_{timestamp}.jpg"
-                        cv2.imwrite(filename, frame)
-                        """
-
-                        current_player_pose = calculate_relative_angles(results.pose_landmarks.landmark)
+                    if landmarks is not None:
+                        with session.metrics.stage("angles"):
+                            current_player_pose = calculate_relative_angles_array(landmarks)
                         print(current_player_pose)
                         json_data = {}
                         # json_data["relative_angles"] = {f"R{i}": angle for i, angle in enumerate(arr_of_rel_angles)}
 
 
                         
-                        start_reference_frame = max([frame_number - 12, 0])
-                        end_reference_frame = min([frame_number + 4, len(reference_pose_sequence)-1])
-                        reference_window = reference_pose_sequence[start_reference_frame:end_reference_frame]
-                        print(f"start{start_reference_frame} end{end_reference_frame}")
                         print(f"attempt to compare ref {frame_number}")
-
-                        frame_correctness_list = []
-                        for reference_pose in reference_window:
-                            differences = []
-
-                            for i in range(len(reference_pose)):
-                                normalized_difference = min(abs(reference_pose[i] - current_player_pose[i]) , 1)
-                                differences.append(normalized_difference)
-
-                            correctness = max(0, 1 - (sum(differences) / len(differences)))
-                            frame_correctness_list.append(correctness)
-                        current_frame_correctness = max(frame_correctness_list)
+                        with session.metrics.stage("match"):
+                            current_frame_correctness, best_matching_frame = match_window(
+                                session.reference_pose_sequence,
+                                current_player_pose,
+                                frame_number,
+                                frames_before=match_frames_before,
+                                frames_after=match_frames_after,
+                                difference_clip=difference_clip)
                         print(f"Current Frame correctness: {current_frame_correctness}")
-                        print(f"Best matching frame is: {start_reference_frame + frame_correctness_list.index(current_frame_correctness)}")
-                        correctness_sequence.append(current_frame_correctness)
+                        print(f"Best matching frame is: {best_matching_frame}")
+                        session.correctness_sequence.append(current_frame_correctness)
                         
-                        if(len(correctness_sequence)==3):
-                            print(f"Max of correctness sequence (3): {max(correctness_sequence)}")
-                            correctness_sequence.clear()
+                        if(len(session.correctness_sequence)==3):
+                            print(f"Max of correctness sequence (3): {max(session.correctness_sequence)}")
+                            session.correctness_sequence.clear()
                         
                         json_data["correctness"] = current_frame_correctness
-                        await websocket.send(json.dumps(json_data))
+                        # frames skipped so far because newer ones arrived or they outlived the latency budget
+                        json_data["dropped"] = session.intake.dropped
+                        # lets a client match replies to frames when some were dropped (Unity ignores it)
+                        json_data["frame_number"] = frame_number
+                        with session.metrics.stage("send"):
+                            await websocket.send(json.dumps(json_data))
                         # print(f"Successfully sent frame#{frame_number}'s data")
                     else:
                         print("No pose detected")
-                        await websocket.send(json.dumps({"correctness":0.0}))
+                        with session.metrics.stage("send"):
+                            await websocket.send(json.dumps({"correctness":0.0, "dropped": session.intake.dropped, "frame_number": frame_number}))
+                    session.metrics.frame_done(landmarks is not None, frame_started)
                 elif(dataType == "song_selection"):
                     print("------------------------")
                     app_path = data["app_path"]
                     selected_song = data["song_name"]
-                    reference_pose_sequence.clear()
-                    set_current_song(selected_song,app_path)
-                    correctness_sequence.clear()
+                    session.set_current_song(reference_cache, selected_song, app_path)
+                    session.correctness_sequence.clear()
                     print(f"Player selected {selected_song}")
+                elif(dataType == "cache_stats"):
+                    await websocket.send(json.dumps({"cache_stats": reference_cache.stats()}))
+                elif(dataType == "stats"):
+                    # this session's stage latencies and rates, plus every session's with "all": true
+                    stats = {"session": session.stats()}
+                    if data.get("all", False):
+                        stats["server"] = server_stats(inference, reference_cache)
+                    await websocket.send(json.dumps({"stats": stats}))
             except asyncio.exceptions.IncompleteReadError:
                 print("Incomplete read error occurred. The client might have disconnected.")
                 break
@@ -168,11 +139,22 @@ async def process_frame(websocket, path):
                 await websocket.send(json.dumps({"error": str(e)}))
     except websockets.exceptions.ConnectionClosed:
         print("WebSocket connection closed")
+    finally:
+        active_sessions.discard(session)
+        await session.close()
 
 async def main():
-    server = await websockets.serve(process_frame, "localhost", 8139)
-    print("Server started on ws://localhost:8139")
-    await server.wait_closed()
+    global inference
+    inference = InferenceExecutor(create_pose, mode=inference_mode, workers=inference_workers, max_pending=inference_max_pending,
+                                  input_max_side=get_pose_profile(pose_profile).input_max_side, roi_margin=roi_margin)
+    server = await websockets.serve(process_frame, "localhost", port)
+    print(f"Server started on ws://localhost:{port}")
+    if metrics_port is not None:
+        await start_metrics_server(lambda: server_stats(inference, reference_cache), metrics_port)
+    try:
+        await server.wait_closed()
+    finally:
+        inference.shutdown()
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file